@@ -0,0 +1,41 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode records of 10 and 30 fields built in the applicative style,
+`succeed(f) * d1 * ... @ dn`, and with `mapn(f, d1, ..., dn)`.
+
+    PYTHONPATH=. python bench/bench_applicative.py
+'''
+import timeit
+
+from functools import reduce
+
+from jazzml import *
+
+
+def record(*values):
+    return values
+
+
+def bench(decoder, doc):
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=20000, repeat=5)) / 20000
+
+
+def main():
+    print(f"{'fields':<8}{'applicative':>14}{'mapn':>14}")
+    for n in (10, 30):
+        fields = [field('f%d' % i, Int) for i in range(n)]
+        doc = {'f%d' % i: i for i in range(n)}
+        chain = reduce(lambda f, d: f * d, fields[:-1], succeed(record))
+        applicative = chain @ fields[-1]
+        times = [bench(applicative, doc), bench(mapn(record, *fields), doc)]
+        print(f'{n:<8}' + ''.join(f'{t * 1e6:>12.2f}us' for t in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Compare the available yaml and json backends.
+
+    PYTHONPATH=. python bench/bench_backends.py
+'''
+import json
+import timeit
+
+import yaml
+
+from jazzml import *
+
+
+def records(n):
+    return [{'id': i, 'name': f'item-{i}', 'price': i * 0.5,
+             'tags': ['a', 'b', 'c'], 'active': i % 2 == 0,
+             'owner': {'name': 'someone', 'email': 'someone@example.com'}}
+            for i in range(n)]
+
+
+DOCS = [
+    ('small', records(1)),
+    ('medium', records(100)),
+    ('large', records(5000)),
+]
+
+
+def bench(f, number):
+    return min(timeit.repeat(f, number=number, repeat=3)) / number
+
+
+def main():
+    for fmt, names, dump, parse in [
+            ('yaml', yaml_backends(), yaml.dump, parse_yaml),
+            ('json', json_backends(), json.dumps, parse_json)]:
+        print(f'{fmt}:')
+        print(f"  {'backend':<14}" + ''.join(f'{n:>14}' for n, _ in DOCS))
+        for backend in names:
+            row = f'  {backend:<14}'
+            for name, value in DOCS:
+                doc = dump(value).encode('utf-8')
+                number = 2 if name == 'large' else 50
+                elapsed = bench(lambda: parse(doc, noop, backend=backend),
+                                number)
+                row += f'{elapsed * 1e3:>12.3f}ms'
+            print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode a time series of a million records: one object per record versus
+`Columns`. Reports time and the tracemalloc peak memory of the decoding
+(the loaded document excluded).
+
+    PYTHONPATH=. python bench/bench_columns.py
+'''
+import time
+import tracemalloc
+
+from collections import namedtuple
+
+from jazzml import *
+from jazzml import compile
+
+
+Sample = namedtuple('Sample', 't x y label')
+
+N = 1000000
+
+rows = List(mapn(Sample, field('t', Float), field('x', Int),
+                 field('y', Float), field('label', Str)))
+
+columns = Columns({'t': Float, 'x': Int, 'y': Float, 'label': Str})
+
+
+def measure(decoder, doc):
+    start = time.perf_counter()
+    decoder.at([], doc)
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows down allocations: time and memory are measured
+    # in separate runs.
+    tracemalloc.start()
+    value = decoder.at([], doc)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return elapsed, peak
+
+
+def main():
+    labels = ['a', 'b', 'c']
+    doc = [{'t': i * 0.1, 'x': i, 'y': -i * 0.5, 'label': labels[i % 3]}
+           for i in range(N)]
+    print(f"{'decoder':<16}{'time':>10}{'memory':>12}")
+    for name, decoder in [('List(mapn)', rows),
+                          ('compiled', compile(rows)),
+                          ('Columns', columns)]:
+        elapsed, peak = measure(decoder, doc)
+        print(f'{name:<16}{elapsed * 1e3:>8.0f}ms{peak / 2**20:>10.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Compare the interpreted and the compiled versions of a few Decoders.
+
+    PYTHONPATH=. python bench/bench_compile.py
+'''
+import timeit
+
+from collections import namedtuple
+
+from jazzml import *
+from jazzml import compile
+
+
+mkPoint = namedtuple('Point', 'x y')
+mkShape = namedtuple('Shape', 'name points color')
+
+point = mapn(mkPoint, field('x', Int), field('y', Int))
+
+shape = mapn(mkShape,
+             field('name', Str),
+             field('points', List(point)),
+             optional_field('color', one_of([this_str('red'),
+                                             this_str('blue')]), None))
+
+CASES = [
+    ('point', point, {'x': 1, 'y': 2}),
+    ('shape', shape, {'name': 'poly', 'color': 'blue',
+                      'points': [{'x': i, 'y': -i} for i in range(10)]}),
+    ('records', List(point), [{'x': i, 'y': -i} for i in range(1000)]),
+]
+
+
+def bench(decoder, doc, number):
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=number, repeat=5)) / number
+
+
+def main():
+    print(f"{'case':<10}{'interpreted':>14}{'compiled':>14}{'speedup':>10}")
+    for name, decoder, doc in CASES:
+        number = 100 if name == 'records' else 20000
+        t_interp = bench(decoder, doc, number)
+        t_comp = bench(compile(decoder), doc, number)
+        print(f'{name:<10}{t_interp * 1e6:>12.2f}us{t_comp * 1e6:>12.2f}us'
+              f'{t_interp / t_comp:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
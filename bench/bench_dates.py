@@ -0,0 +1,53 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode 100000 dates: with `strptime`, with the parser compiled by `date()`,
+and with its cache on timestamps repeated (1000 distinct values).
+
+    PYTHONPATH=. python bench/bench_dates.py
+'''
+import datetime as dt
+import timeit
+
+from jazzml import *
+
+
+N = 100000
+
+
+def strptime_date(the_format):
+    # The former `date()`: strptime for every value.
+    def decode(path, v):
+        try:
+            return StatusOk(dt.datetime.strptime(v, the_format))
+        except ValueError:
+            return StatusBadType(path, str, v)
+
+    return Decoder(decode)
+
+
+def bench(decoder, doc):
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=1, repeat=3))
+
+
+def main():
+    start = dt.datetime(2024, 1, 1)
+    print(f"{'format':<22}{'strptime':>12}{'compiled':>12}{'cached':>12}")
+    for the_format in ['%d-%m-%Y', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y %H:%M',
+                       '%b %d %Y']:
+        doc = [(start + dt.timedelta(minutes=i % 1000)).strftime(the_format)
+               for i in range(N)]
+        times = [bench(List(strptime_date(the_format)), doc),
+                 bench(List(date(the_format)), doc),
+                 bench(List(date(the_format, cache=1024)), doc)]
+        print(f'{the_format:<22}'
+              + ''.join(f'{t * 1e3:>10.1f}ms' for t in times))
+
+
+if __name__ == '__main__':
+    main()
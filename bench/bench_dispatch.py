@@ -0,0 +1,58 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode messages of 40 types, with `one_of` (dispatched on the 'type'
+field), `tagged` and a `one_of` whose alternatives are not tagged and are
+therefore tried one by one.
+
+    PYTHONPATH=. python bench/bench_dispatch.py
+'''
+import timeit
+
+from jazzml import *
+from jazzml import compile
+
+
+KINDS = ['message{i}'.format(i=i) for i in range(40)]
+
+
+def message(kind):
+    return mapn(lambda kind, x, y: (kind, x, y),
+                field('type', this_str(kind)),
+                field('x', Int),
+                field('y', Str))
+
+
+def untagged(kind):
+    # The same Decoder, hidden from the dispatch.
+    return mapn(lambda kind, x, y: (kind, x, y),
+                field('type', Decoder(this_str(kind).at)),
+                field('x', Int),
+                field('y', Str))
+
+
+CASES = [
+    ('one_of', one_of([message(k) for k in KINDS])),
+    ('tagged', tagged('type', {k: message(k) for k in KINDS})),
+    ('sequential', one_of([untagged(k) for k in KINDS])),
+]
+
+DOCS = [{'type': k, 'x': i, 'y': k} for i, k in enumerate(KINDS)] * 25
+
+
+def main():
+    print(f"{'case':<12}{'interpreted':>14}{'compiled':>14}")
+    for name, decoder in CASES:
+        decoders = List(decoder), compile(List(decoder))
+        times = [min(timeit.repeat(lambda: d.at([], DOCS),
+                                   number=20, repeat=5)) / 20
+                 for d in decoders]
+        print(f'{name:<12}' + ''.join(f'{t * 1e3:>12.2f}ms' for t in times))
+
+
+if __name__ == '__main__':
+    main()
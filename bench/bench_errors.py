@@ -0,0 +1,63 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Report the 100 mistakes of a configuration of 10000 items: fixing them
+one at a time, one decoding per mistake, versus collecting all of them in
+a single decoding (`max_errors=None`).
+
+    PYTHONPATH=. python bench/bench_errors.py
+'''
+import json
+import time
+
+from jazzml import *
+
+
+item = mapn(lambda *args: args, field('name', Str), field('size', Int),
+            optional_field('tags', List(Str), []))
+
+decoder = field('items', List(item))
+
+
+def document():
+    items = [{'name': 'item-%d' % i, 'size': i, 'tags': ['a', 'b']}
+             for i in range(10000)]
+    for i in range(0, 10000, 100):
+        items[i]['size'] = 'big'
+    return {'items': items}
+
+
+def one_at_a_time(doc):
+    errors = 0
+    while True:
+        try:
+            parse_json(json.dumps(doc), decoder)
+            return errors
+        except DecodeError as e:
+            errors += 1
+            _, i, _ = e.errors[0].path()
+            doc['items'][i]['size'] = 0
+
+
+def all_at_once(doc):
+    try:
+        parse_json(json.dumps(doc), decoder, max_errors=None)
+    except DecodeError as e:
+        return len(e.errors)
+
+
+def main():
+    for name, f in [('one at a time', one_at_a_time),
+                    ('all at once', all_at_once)]:
+        start = time.perf_counter()
+        errors = f(document())
+        elapsed = time.perf_counter() - start
+        print(f'{name:<16}{errors:>5} errors{elapsed * 1e3:>10.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Extract a few fields from a large document: regular parsing versus event
+driven parsing. Reports time and tracemalloc peak memory.
+
+    PYTHONPATH=. python bench/bench_events.py
+'''
+import io
+import json
+import time
+import tracemalloc
+
+import yaml
+
+from jazzml import *
+
+
+def document(n):
+    return {
+        'version': 3,
+        'header': {'name': 'payload', 'owner': 'someone'},
+        'records': [{'id': i, 'name': f'record-{i}', 'values': [i, i + 1.5],
+                     'meta': {'a': 'x' * 20, 'b': None}} for i in range(n)],
+    }
+
+
+decoder = mapn(lambda v, n: (v, n),
+               field('version', Int),
+               field('header', field('name', Str)))
+
+
+def measure(f):
+    start = time.perf_counter()
+    f()
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows down allocations: time and memory are measured
+    # in separate runs.
+    tracemalloc.start()
+    f()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    json_doc = json.dumps(document(50000)).encode('utf-8')
+    yaml_doc = yaml.dump(document(5000))
+    cases = [
+        ('json (%d kB)' % (len(json_doc) // 1024),
+         lambda: parse_json(json_doc, decoder),
+         lambda: parse_json_events(io.BytesIO(json_doc), decoder)),
+        ('yaml (%d kB)' % (len(yaml_doc) // 1024),
+         lambda: parse_yaml(yaml_doc, decoder),
+         lambda: parse_yaml_events(yaml_doc, decoder)),
+    ]
+    print(f"{'document':<18}{'parse':>22}{'events':>22}")
+    for name, full, events in cases:
+        t_full, m_full = measure(full)
+        t_events, m_events = measure(events)
+        print(f'{name:<18}{t_full * 1e3:>10.1f}ms {m_full / 2**20:>7.1f}MB'
+              f'{t_events * 1e3:>10.1f}ms {m_events / 2**20:>7.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
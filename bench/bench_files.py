@@ -0,0 +1,66 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Read a routing table of 2000 entries again and again: `parse_yaml` on the
+content of the file, `parse_yaml_file` on a cold cache (new process) with
+and without a disk cache, and on a warm cache.
+
+    PYTHONPATH=. python bench/bench_files.py
+'''
+import os
+import tempfile
+import time
+
+import yaml
+
+from jazzml import *
+
+
+route = mapn(lambda *args: args, field('path', Str), field('target', Str),
+             optional_field('weight', Int, 1))
+
+decoder = field('routes', List(route))
+
+
+def measure(f, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        f()
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.yaml')
+        with open(path, 'w') as handle:
+            yaml.dump({'routes': [{'path': '/api/%d' % i,
+                                   'target': 'service-%d' % (i % 7),
+                                   'weight': i % 3}
+                                  for i in range(2000)]}, handle)
+        directory = os.path.join(tmp, 'cache')
+        parse_yaml_file(path, decoder, cache=FileCache(directory=directory))
+
+        def read():
+            with open(path, 'rb') as handle:
+                return parse_yaml(handle.read(), decoder)
+
+        warm = FileCache()
+        parse_yaml_file(path, decoder, cache=warm)
+        cases = [
+            ('parse_yaml', read),
+            ('cold', lambda: parse_yaml_file(path, decoder,
+                                             cache=FileCache())),
+            ('cold + disk', lambda: parse_yaml_file(
+                path, decoder, cache=FileCache(directory=directory))),
+            ('warm', lambda: parse_yaml_file(path, decoder, cache=warm)),
+        ]
+        for name, f in cases:
+            print(f'{name:<14}{measure(f, 20) * 1e3:>10.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode 10000 large payloads (40 scalar fields and a list of 20 lines) and
+read 2 of their fields: decoded completely by `mapn`, or on demand by
+`lazy_record`.
+
+    PYTHONPATH=. python bench/bench_lazy_record.py
+'''
+import timeit
+
+from jazzml import *
+
+
+def record(**fields):
+    return fields
+
+
+def main():
+    line = mapn(lambda sku, quantity: (sku, quantity), field('sku', Str),
+                field('quantity', Int))
+    decoders = {'f%d' % i: field('f%d' % i, Int) for i in range(40)}
+    decoders['lines'] = field('lines', List(line))
+    doc = [dict({'f%d' % i: i for i in range(40)},
+                lines=[{'sku': 'a', 'quantity': 1}] * 20)
+           for _ in range(10000)]
+
+    eager = List(mapn(lambda *values: dict(zip(decoders, values)),
+                      *decoders.values()))
+    lazy = List(lazy_record(record, decoders))
+
+    def read_eager():
+        return [(r['f0'], r['f1']) for r in eager.at([], doc).value]
+
+    def read_lazy():
+        return [(r.f0, r.f1) for r in lazy.at([], doc).value]
+
+    for name, f in [('mapn', read_eager), ('lazy_record', read_lazy)]:
+        t = min(timeit.repeat(f, number=1, repeat=5))
+        print(f'{name:<14}{t * 1e3:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
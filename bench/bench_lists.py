@@ -0,0 +1,51 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode lists of 10^6 primitive values: element by element (the elements
+decoded by a Decoder that `List` does not recognize) versus the single
+pass check of the primitive Decoders.
+
+    PYTHONPATH=. python bench/bench_lists.py
+'''
+import timeit
+
+from jazzml import *
+
+
+N = 1000000
+
+
+def opaque(decoder):
+    # The same Decoder, hidden from `List`.
+    return Decoder(decoder.at)
+
+
+CASES = [
+    ('Int', Int, list(range(N)), 'q'),
+    ('Float', Float, [i * 0.5 for i in range(N)], 'd'),
+    ('Str', Str, [str(i % 100) for i in range(N)], None),
+    ('Bool', Bool, [i % 2 == 0 for i in range(N)], None),
+]
+
+
+def bench(decoder, doc):
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=3, repeat=3)) / 3
+
+
+def main():
+    print(f"{'elements':<10}{'per element':>14}{'single pass':>14}"
+          f"{'array':>14}")
+    for name, decoder, doc, typecode in CASES:
+        times = [bench(List(opaque(decoder)), doc), bench(List(decoder), doc)]
+        if typecode is not None:
+            times.append(bench(List(decoder, typecode), doc))
+        print(f'{name:<10}' + ''.join(f'{t * 1e3:>12.1f}ms' for t in times))
+
+
+if __name__ == '__main__':
+    main()
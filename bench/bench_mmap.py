@@ -0,0 +1,90 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode a file of more than 100 MB: read into a str or bytes and parsed,
+versus given by its path (mapped in memory). Reports the tracemalloc peak,
+which includes the loaded document.
+
+    PYTHONPATH=. python bench/bench_mmap.py [size in MB] [--yaml]
+'''
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from jazzml import *
+
+
+decoder = field('records', List(field('id', Int)))
+
+
+def write(path, size):
+    # A few long values per record: the input is large compared to the
+    # loaded document.
+    record = {'id': 0, 'text': 'x' * 2000, 'other': 'y' * 2000}
+    line = json.dumps(record)
+    count = size * 2 ** 20 // len(line)
+    with open(path, 'w') as handle:
+        handle.write('{"records": [')
+        handle.write(','.join(line.replace('"id": 0', '"id": %d' % i)
+                              for i in range(count)))
+        handle.write(']}')
+
+
+def measure(f):
+    tracemalloc.start()
+    start = time.perf_counter()
+    f()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'doc.json')
+        write(path, size)
+        print(f'{os.path.getsize(path) / 2**20:.0f} MB')
+
+        def read_text():
+            with open(path, encoding='utf-8') as handle:
+                return handle.read()
+
+        def read_bytes():
+            with open(path, 'rb') as handle:
+                return handle.read()
+
+        cases = []
+        for backend in json_backends():
+            cases += [
+                (f'json {backend}, str',
+                 lambda b=backend: parse_json(read_text(), decoder, b)),
+                (f'json {backend}, bytes',
+                 lambda b=backend: parse_json(read_bytes(), decoder, b)),
+                (f'json {backend}, path',
+                 lambda b=backend: parse_json(pathlib.Path(path), decoder,
+                                              b)),
+            ]
+        if '--yaml' in sys.argv:
+            cases += [
+                ('yaml, bytes',
+                 lambda: parse_yaml(read_bytes(), decoder)),
+                ('yaml, path',
+                 lambda: parse_yaml(pathlib.Path(path), decoder)),
+            ]
+        for name, f in cases:
+            elapsed, peak = measure(f)
+            print(f'{name:<22}{elapsed:>8.2f}s{peak / 2**20:>10.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode a list of 200000 records with `List` and with `ParallelList` on
+1, 2, 4 and 8 threads, and report the speedup. The threads decode at the
+same time on a free-threaded python build (python3.13t and later) only:
+with the GIL, the benchmark measures the overhead of the pool.
+
+    PYTHONPATH=. python bench/bench_parallel_list.py [--chunk 1024]
+'''
+import argparse
+import os
+import sys
+import timeit
+
+from jazzml import *
+
+
+def values(*args):
+    return args
+
+
+def bench(decoder, doc):
+    return min(timeit.repeat(lambda: decoder.at([], doc), number=1,
+                             repeat=5))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunk', type=int, default=1024)
+    args = parser.parse_args()
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    gil = is_gil_enabled is None or is_gil_enabled()
+    print('python {v}, GIL {g}, {n} CPUs'.format(
+        v=sys.version.split()[0], g='enabled' if gil else 'disabled',
+        n=os.cpu_count()))
+
+    item = record(values, id=Int, name=Str, price=Float,
+                  tags=List(Str), parent=(nullable(Int, None), None))
+    doc = [{'id': i, 'name': 'item%d' % i, 'price': i * 0.5,
+            'tags': ['a', 'b'], 'parent': i // 2 or None}
+           for i in range(200000)]
+
+    serial = bench(List(item), doc)
+    print(f"{'threads':<10}{'time':>12}{'speedup':>10}")
+    print(f"{'List':<10}{serial * 1e3:>10.1f}ms{1:>10.2f}")
+    for threads in (1, 2, 4, 8):
+        decoder = ParallelList(item, workers=threads, chunk=args.chunk,
+                               serial_on_gil=False)
+        t = bench(decoder, doc)
+        print(f'{threads:<10}{t * 1e3:>10.1f}ms{serial / t:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode a list of 10000 orders: outside of `profiling()` (with named
+Decoders), inside it, and the decoding function called directly, which
+`Decoder.at()` adds nothing to when not profiling. Then print the report.
+
+    PYTHONPATH=. python bench/bench_profile.py
+'''
+import timeit
+
+from jazzml import *
+
+
+def order(*values):
+    return values
+
+
+def main():
+    line = mapn(order, field('sku', Str), field('quantity', Int),
+                field('price', Float)).named('order.lines')
+    decoder = List(mapn(order, field('id', Int), field('customer', Str),
+                        field('lines', List(line)))).named('orders')
+    doc = [{'id': i, 'customer': 'c%d' % i,
+            'lines': [{'sku': 'a', 'quantity': 1, 'price': 2.5}] * 5}
+           for i in range(10000)]
+
+    def bench(f):
+        return min(timeit.repeat(f, number=5, repeat=5)) / 5
+
+    direct = bench(lambda: decoder._decode((), doc))
+    disabled = bench(lambda: decoder.at([], doc))
+    with profiling() as profile:
+        enabled = bench(lambda: decoder.at([], doc))
+
+    print(f"{'direct':<12}{direct * 1e3:>10.1f}ms")
+    print(f"{'disabled':<12}{disabled * 1e3:>10.1f}ms")
+    print(f"{'profiling':<12}{enabled * 1e3:>10.1f}ms")
+    print()
+    print(profile.report(5))
+
+
+if __name__ == '__main__':
+    main()
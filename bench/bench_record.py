@@ -0,0 +1,49 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode 10000 records of 10 and 60 fields (a sixth of them optional):
+with `mapn(field(...), optional_field(...), ...)`, with `record()`, with
+`record(..., strict=True)` and compiled.
+
+    PYTHONPATH=. python bench/bench_record.py
+'''
+import timeit
+
+from jazzml import *
+from jazzml import compile
+
+
+def values(*args):
+    return args
+
+
+def bench(decoder, doc):
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=1, repeat=5))
+
+
+def main():
+    print(f"{'fields':<8}{'mapn':>12}{'record':>12}{'strict':>12}"
+          f"{'compiled':>12}")
+    for n in (10, 60):
+        kinds = [Int, Str, Float]
+        fields = {'f%d' % i: kinds[i % 3] if i % 6 else (kinds[i % 3], None)
+                  for i in range(n)}
+        doc = [{'f%d' % i: [i, 's', 0.5][i % 3] for i in range(n)}
+               for _ in range(10000)]
+        mapn_decoder = mapn(values, *[
+            optional_field(name, d[0], d[1]) if isinstance(d, tuple)
+            else field(name, d) for name, d in fields.items()])
+        decoders = [mapn_decoder, record(values, fields),
+                    record(values, fields, strict=True),
+                    compile(record(values, fields))]
+        print(f'{n:<8}' + ''.join(f'{bench(List(d), doc) * 1e3:>10.1f}ms'
+                                  for d in decoders))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Decode deep and wide trees and report the cost per node of:
+
+- rebuild: a Decoder graph rebuilt at every node, which is what `lazy`
+  used to do,
+- lazy: a memoized `lazy`,
+- recursive: a `recursive` Decoder, interpreted and compiled.
+
+    PYTHONPATH=. python bench/bench_recursive.py
+'''
+import sys
+import timeit
+
+from jazzml import *
+from jazzml import compile
+
+
+def node(children):
+    return mapn(lambda value, children: (value, children),
+                field('value', Int),
+                optional_field('children', List(children), []))
+
+
+def rebuilt():
+    return node(succeed(None).then(lambda _: rebuilt()))
+
+
+def lazy_tree():
+    return node(lazy(lazy_tree))
+
+
+tree = recursive(node)
+
+CASES = [
+    ('rebuild', rebuilt()),
+    ('lazy', lazy_tree()),
+    ('recursive', tree),
+    ('compiled', compile(tree)),
+]
+
+
+def deep(n):
+    doc = {'value': 0}
+    for i in range(1, n):
+        doc = {'value': i, 'children': [doc]}
+    return doc
+
+
+def wide(n):
+    return {'value': 0, 'children': [{'value': i} for i in range(1, n)]}
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    docs = [(f'{shape}-{n}', make(n))
+            for shape, make in (('deep', deep), ('wide', wide))
+            for n in (100, 1000, 5000)]
+    print(f"{'doc':<12}" + ''.join(f'{name:>12}' for name, _ in CASES)
+          + '   (us per node)')
+    for name, doc in docs:
+        n = int(name.split('-')[1])
+        times = [min(timeit.repeat(lambda: d.at([], doc), number=5,
+                                   repeat=3)) / 5 / n
+                 for _, d in CASES]
+        print(f'{name:<12}' + ''.join(f'{t * 1e6:>12.2f}' for t in times))
+
+
+if __name__ == '__main__':
+    main()
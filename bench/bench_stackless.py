@@ -0,0 +1,70 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Compare a recursive Decoder with its `stackless` versions, on shallow
+documents and on documents too deep for the recursive Decoder.
+
+    PYTHONPATH=. python bench/bench_stackless.py
+'''
+import timeit
+
+from collections import namedtuple
+
+from jazzml import *
+
+
+mkPoint = namedtuple('Point', 'x y')
+
+point = mapn(mkPoint, field('x', Int), field('y', Int))
+
+
+def node(children):
+    return mapn(lambda value, children: (value, children),
+                field('value', Int),
+                optional_field('children', List(children), []))
+
+
+tree = recursive(node)
+
+
+def deep(n):
+    doc = {'value': 0}
+    for i in range(1, n):
+        doc = {'value': i, 'children': [doc]}
+    return doc
+
+
+CASES = [
+    ('points', List(point), [{'x': i, 'y': -i} for i in range(1000)]),
+    ('tree-100', tree, deep(100)),
+    ('tree-10000', tree, deep(10000)),
+]
+
+
+def bench(decoder, doc):
+    try:
+        decoder.at([], doc)
+    except RecursionError:
+        return None
+    return min(timeit.repeat(lambda: decoder.at([], doc),
+                             number=10, repeat=5)) / 10
+
+
+def main():
+    columns = ['recursive', 'hybrid', 'stackless']
+    print(f"{'case':<12}" + ''.join(f'{c:>14}' for c in columns))
+    for name, decoder, doc in CASES:
+        decoders = [decoder, stackless(decoder),
+                    stackless(decoder, hybrid=False)]
+        times = [bench(d, doc) for d in decoders]
+        print(f'{name:<12}' + ''.join(
+            f'{"RecursionError":>14}' if t is None else f'{t * 1e3:>12.3f}ms'
+            for t in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Accept or reject documents: full decoding versus `validate`.
+
+    PYTHONPATH=. python bench/bench_validate.py
+'''
+import timeit
+
+from collections import namedtuple
+
+from jazzml import *
+
+
+Order = namedtuple('Order', 'id customer lines status')
+Line = namedtuple('Line', 'sku quantity price')
+
+line = succeed(Line) * field('sku', Str) * field('quantity', Int) \
+    @ field('price', Float)
+
+order = mapn(Order,
+             field('id', Int),
+             field('customer', mapn(lambda name, email: (name, email),
+                                    field('name', Str),
+                                    field('email', Str))),
+             field('lines', List(line)),
+             field('status', one_of([this_str('open'),
+                                     this_str('closed')])))
+
+DOC = [{'id': i, 'customer': {'name': 'name', 'email': 'mail'},
+        'lines': [{'sku': 'sku-%d' % j, 'quantity': j, 'price': 1.5}
+                  for j in range(10)],
+        'status': 'open'} for i in range(1000)]
+
+
+def bench(f):
+    return min(timeit.repeat(f, number=10, repeat=5)) / 10
+
+
+def main():
+    decoder = List(order)
+    t_decode = bench(lambda: decoder.at([], DOC))
+    t_validate = bench(lambda: validate(DOC, decoder))
+    print(f'decode   {t_decode * 1e3:8.2f}ms')
+    print(f'validate {t_validate * 1e3:8.2f}ms'
+          f'  ({t_decode / t_validate:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+The benchmark suite: synthetic documents of every shape, decoded from the
+loaded value, and parsed by `parse_json` and `parse_yaml`. Every case
+reports its throughput, latency percentiles and peak memory (tracemalloc).
+
+    PYTHONPATH=. python bench/suite.py run [-o results.json] [--quick]
+                                           [-k substring]
+    PYTHONPATH=. python bench/suite.py compare old.json new.json
+                                               [--threshold 0.1]
+
+`compare` flags the cases whose median latency or peak memory grew by more
+than the threshold (10% by default) and then exits with status 1.
+'''
+import argparse
+import datetime as dt
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from collections import namedtuple
+
+import yaml
+
+from jazzml import *
+
+
+Case = namedtuple('Case', 'name decoder document items')
+
+
+def record(*values):
+    return values
+
+
+def node(value, children):
+    return (value, children)
+
+
+# Document generators
+# -------------------
+
+def wide_records():
+    '''1000 records of 60 fields.'''
+    decoders = []
+    for i in range(20):
+        decoders += [field('i%d' % i, Int), field('s%d' % i, Str),
+                     field('f%d' % i, Float)]
+    doc = [{key: value
+            for i in range(20)
+            for key, value in (('i%d' % i, n * i), ('s%d' % i, 'v%d' % n),
+                               ('f%d' % i, n * 0.5))}
+           for n in range(1000)]
+    return Case('wide_records', List(mapn(record, *decoders)), doc, 1000)
+
+
+def deep_nesting():
+    '''50 chains of 150 nested objects.'''
+    chain = recursive(lambda chain: mapn(
+        node, field('value', Int), optional_field('next', nullable(chain,
+                                                                   None),
+                                                  None)))
+    doc = []
+    for n in range(50):
+        value = None
+        for i in range(150):
+            value = {'value': i, 'next': value}
+        doc.append(value)
+    return Case('deep_nesting', List(chain), doc, 50 * 150)
+
+
+def primitive_lists():
+    '''Lists of 50000 integers, floats, strings and booleans.'''
+    n = 50000
+    decoder = mapn(record, field('ints', List(Int)),
+                   field('floats', List(Float)), field('strs', List(Str)),
+                   field('bools', List(Bool)))
+    doc = {'ints': list(range(n)), 'floats': [i * 0.25 for i in range(n)],
+           'strs': ['s%d' % (i % 1000) for i in range(n)],
+           'bools': [i % 3 == 0 for i in range(n)]}
+    return Case('primitive_lists', decoder, doc, 4 * n)
+
+
+def one_of_union():
+    '''5000 messages, a union of 30 kinds tagged by a field.'''
+    kinds = 30
+    message = one_of([mapn(record, field('kind', this_str('k%d' % k)),
+                           field('x%d' % k, Int), field('label', Str))
+                      for k in range(kinds)])
+    doc = [{'kind': 'k%d' % (n % kinds), 'x%d' % (n % kinds): n,
+            'label': 'm%d' % n} for n in range(5000)]
+    return Case('one_of_union', List(message), doc, 5000)
+
+
+def one_of_untagged():
+    '''5000 values of a union of 10 shapes without a tag.'''
+    shapes = 10
+    value = one_of([field('x%d' % k, Int) for k in range(shapes)])
+    doc = [{'x%d' % (n % shapes): n} for n in range(5000)]
+    return Case('one_of_untagged', List(value), doc, 5000)
+
+
+def lazy_tree():
+    '''A tree of 5461 nodes (7 levels of 4 children) built with `lazy`.'''
+    def tree():
+        return mapn(node, field('value', Int),
+                    field('children', List(lazy(tree))))
+
+    def build(depth):
+        return {'value': depth,
+                'children': [build(depth - 1) for _ in range(4)]
+                if depth else []}
+
+    return Case('lazy_tree', tree(), build(6), 5461)
+
+
+def dates():
+    '''10000 records of 3 dates.'''
+    decoder = List(mapn(record, field('created', date()),
+                        field('updated', date()),
+                        field('due', date('%Y-%m-%d'))))
+    doc = [{'created': '%02d-%02d-2021' % (n % 28 + 1, n % 12 + 1),
+            'updated': '%02d-%02d-2022' % (n % 28 + 1, n % 12 + 1),
+            'due': '2023-%02d-%02d' % (n % 12 + 1, n % 28 + 1)}
+           for n in range(10000)]
+    return Case('dates', decoder, doc, 10000)
+
+
+CASES = [wide_records, deep_nesting, primitive_lists, one_of_union,
+         one_of_untagged, lazy_tree, dates]
+
+
+# Measures
+# --------
+
+def percentile(times, p):
+    '''The nearest-rank percentile `p` of the sorted `times`.'''
+    return times[min(len(times) - 1, max(0, int(len(times) * p / 100 + .5) - 1))]
+
+
+def measure(f, repeat, size, items):
+    '''Time `repeat` calls of `f`, then measure the peak memory of one.'''
+    f()
+    gc.collect()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    times.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    f()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = percentile(times, 50)
+    return {
+        'repeat': repeat,
+        'p50_ms': median * 1e3,
+        'p90_ms': percentile(times, 90) * 1e3,
+        'p99_ms': percentile(times, 99) * 1e3,
+        'mb_per_s': size / median / 1e6,
+        'items_per_s': items / median,
+        'peak_mb': peak / 2 ** 20,
+    }
+
+
+def run(args):
+    repeat = 3 if args.quick else 15
+    results = {}
+    for make in CASES:
+        case = make()
+        text = json.dumps(case.document)
+        yaml_text = yaml.dump(case.document, Dumper=getattr(
+            yaml, 'CSafeDumper', yaml.SafeDumper))
+        modes = [
+            ('decode', len(text), lambda: case.decoder.at([], case.document)),
+            ('parse_json', len(text), lambda: parse_json(text, case.decoder)),
+            ('parse_yaml', len(yaml_text),
+             lambda: parse_yaml(yaml_text, case.decoder)),
+        ]
+        for mode, size, f in modes:
+            name = '{c}/{m}'.format(c=case.name, m=mode)
+            if args.k and args.k not in name:
+                continue
+            # yaml is an order of magnitude slower to load.
+            n = max(3, repeat // 3) if mode == 'parse_yaml' else repeat
+            r = results[name] = measure(f, n, size, case.items)
+            print(f"{name:<28}{r['p50_ms']:>10.2f}ms{r['p90_ms']:>10.2f}ms"
+                  f"{r['mb_per_s']:>9.1f}MB/s{r['peak_mb']:>9.1f}MB",
+                  flush=True)
+
+    report = {
+        'meta': {
+            'date': dt.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'yaml_backends': yaml_backends(),
+            'json_backends': json_backends(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+            handle.write('\n')
+
+
+def compare(args):
+    with open(args.old) as handle:
+        old = json.load(handle)['results']
+    with open(args.new) as handle:
+        new = json.load(handle)['results']
+
+    limit = 1 + args.threshold
+    regressions = 0
+    print(f"{'case':<28}{'p50':>10}{'peak':>10}")
+    for name in sorted(old.keys() & new.keys()):
+        time_ratio = new[name]['p50_ms'] / old[name]['p50_ms']
+        memory_ratio = (new[name]['peak_mb'] / old[name]['peak_mb']
+                        if old[name]['peak_mb'] else 1.0)
+        flags = [what for what, ratio in (('time', time_ratio),
+                                          ('memory', memory_ratio))
+                 if ratio > limit]
+        regressions += bool(flags)
+        print(f'{name:<28}{time_ratio - 1:>+10.1%}{memory_ratio - 1:>+10.1%}'
+              + ('  REGRESSION ({f})'.format(f=', '.join(flags))
+                 if flags else ''))
+    for name in sorted(old.keys() ^ new.keys()):
+        print(f"{name:<28}  only in {'old' if name in old else 'new'}")
+    if regressions:
+        print(f'{regressions} regression(s) above {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', help='the JSON results file')
+    run_parser.add_argument('--quick', action='store_true',
+                            help='fewer repetitions')
+    run_parser.add_argument('-k', help='only the cases containing K')
+
+    compare_parser = commands.add_parser(
+        'compare', help='compare two results files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='the tolerated slowdown (0.1: 10%%)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
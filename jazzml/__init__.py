@@ -11,3 +11,48 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 from .jazzml import *
 
+from .compiler import compile
+from .stackless import stackless
+from .columns import Columns
+from .validate import validate
+from .backends import (register_yaml_backend, register_json_backend,
+                       set_yaml_backend, set_json_backend,
+                       yaml_backends, json_backends)
+from .stream import DocumentError, iter_yaml, iter_jsonl
+from .events import (parse_yaml_events, parse_json_events,
+                     iter_yaml_events, iter_json_events)
+from .parallel import decode_many, ParallelList
+from .derive import derive
+from .astream import adecode_stream
+from .profile import NodeStats, Profile, profiling
+from .files import (FileCache, CacheInfo, default_file_cache,
+                    parse_yaml_file, parse_json_file)
+
+
+# `compile` is left out: `from jazzml import *` would hide the builtin. It
+# is imported by name: `from jazzml import compile`.
+__all__ = [
+    # Decoders and combinators
+    'Decoder', 'Int', 'Str', 'Bool', 'Float', 'Real', 'noop',
+    'fail', 'succeed', 'this_str', 'date', 'nullable', 'null', 'field',
+    'optional_field', 'List', 'one_of', 'tagged', 'mapn', 'record', 'lazy',
+    'recursive', 'susp', 'lazy_record', 'derive',
+    'stackless', 'Columns', 'ParallelList',
+    # Statuses and errors
+    'Status', 'StatusOk', 'StatusMissingField', 'StatusUnknownField',
+    'StatusBadType', 'StatusBadValue', 'StatusOneOfNoDecoder',
+    'StatusUnknownTag', 'StatusTagFailed', 'StatusNok', 'DecodeError',
+    'DocumentError',
+    # Parsing
+    'parse_yaml', 'parse_json', 'validate',
+    'parse_yaml_events', 'parse_json_events', 'iter_yaml_events',
+    'iter_json_events', 'iter_yaml', 'iter_jsonl', 'decode_many',
+    'adecode_stream',
+    'FileCache', 'CacheInfo', 'default_file_cache', 'parse_yaml_file',
+    'parse_json_file',
+    # Backends
+    'register_yaml_backend', 'register_json_backend', 'set_yaml_backend',
+    'set_json_backend', 'yaml_backends', 'json_backends',
+    # Profiling
+    'NodeStats', 'Profile', 'profiling',
+]
@@ -0,0 +1,251 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import abc
+import asyncio
+
+from collections import deque
+from concurrent.futures import Executor
+
+from typing import Any, Text
+
+import typing as t
+
+import yaml
+
+from .jazzml import Decoder, a
+from .parallel import _loader
+from .stream import DocumentError, _decode_document
+
+
+# The number of bytes read at once from the stream.
+_READ_SIZE = 2 ** 16
+
+# A framed document: its index in the stream, the line where it starts and
+# its text.
+Frame = t.Tuple[int, int, bytes]
+
+
+class _Framer(abc.ABC):
+    '''Split the bytes read from a stream into lines and documents.'''
+
+    def __init__(self) -> None:
+        # The pieces of the line not terminated yet.
+        self.rest: t.List[bytes] = []
+        self.line = 0
+        self.document = 0
+
+    def feed(self, chunk: bytes) -> t.List[Frame]:
+        '''The documents completed by `chunk`.'''
+        frames: t.List[Frame] = []
+        start = 0
+        # Only the new chunk is searched: a long line is not scanned again
+        # by every read.
+        end = chunk.find(b'\n')
+        while end >= 0:
+            if self.rest:
+                self.rest.append(chunk[start:end])
+                text = b''.join(self.rest)
+                self.rest = []
+            else:
+                text = chunk[start:end]
+            self.line += 1
+            self.add_line(text, frames)
+            start = end + 1
+            end = chunk.find(b'\n', start)
+        if start < len(chunk):
+            self.rest.append(chunk[start:])
+        return frames
+
+    def close(self) -> t.List[Frame]:
+        '''The documents left at the end of the stream.'''
+        frames: t.List[Frame] = []
+        if self.rest:
+            self.line += 1
+            self.add_line(b''.join(self.rest), frames)
+            self.rest = []
+        self.end(frames)
+        return frames
+
+    def frame(self, line: int, text: bytes, frames: t.List[Frame]) -> None:
+        frames.append((self.document, line, text))
+        self.document += 1
+
+    @abc.abstractmethod
+    def add_line(self, text: bytes, frames: t.List[Frame]) -> None:
+        '''Add a line of the stream, without its line end, appending the
+        documents it completes to `frames`.'''
+
+    def end(self, frames: t.List[Frame]) -> None:
+        pass
+
+
+class _JsonFramer(_Framer):
+    '''One json document per line, blank lines being ignored.'''
+
+    def add_line(self, text: bytes, frames: t.List[Frame]) -> None:
+        if text.strip():
+            self.frame(self.line, text, frames)
+
+
+class _YamlFramer(_Framer):
+    '''The documents of a yaml stream, separated by the markers `---` and
+    `...` at the start of a line.'''
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: t.List[bytes] = []
+        # Whether the current document has a start marker or content.
+        self.started = False
+        self.start: t.Optional[int] = None
+
+    def add_line(self, text: bytes, frames: t.List[Frame]) -> None:
+        if text.startswith(b'---') and text[3:4] in (b'', b' ', b'\t', b'\r'):
+            self.end(frames)
+            self.lines.append(text)
+            self.started = True
+            # If the marker is alone, the document starts on the line of
+            # its content.
+            content = text[3:].strip()
+            bare = not content or content.startswith(b'#')
+            self.start = None if bare else self.line
+        elif text.rstrip() == b'...':
+            self.end(frames)
+        else:
+            self.lines.append(text)
+            stripped = text.strip()
+            if (self.start is None and stripped
+                    and not stripped.startswith((b'#', b'%'))):
+                self.started = True
+                self.start = self.line
+
+    def end(self, frames: t.List[Frame]) -> None:
+        if self.started:
+            start = self.start if self.start is not None else self.line
+            self.frame(start, b'\n'.join(self.lines), frames)
+            self.lines = []
+        # Otherwise, the directives and comments before the marker are
+        # kept.
+        self.started = False
+        self.start = None
+
+
+def _decode_batch(decoder: Decoder[a], load: t.Callable[[Any], Any],
+                  batch: t.List[Frame]) -> t.List[Any]:
+    '''Load and decode a batch of documents.
+
+    Returns their values or DocumentErrors.
+    '''
+    results = []
+    for document, line, text in batch:
+        try:
+            value = load(text)
+        except (ValueError, yaml.YAMLError) as e:
+            results.append(DocumentError(document, line, str(e)))
+        else:
+            results.append(_decode_document(decoder, document, line, value))
+    return results
+
+
+async def adecode_stream(reader: asyncio.StreamReader,
+                         decoder: Decoder[a],
+                         fmt: Text = 'json',
+                         executor: t.Optional[Executor] = None,
+                         batch_size: int = 64,
+                         max_pending: int = 4,
+                         errors: t.Optional[t.List[DocumentError]] = None,
+                         backend: t.Optional[Text] = None
+                         ) -> t.AsyncIterator[a]:
+    '''
+    Decode the documents read from an asyncio stream, without blocking the
+    event loop::
+
+        async for value in adecode_stream(reader, decoder, fmt='yaml'):
+            ...
+
+    The documents are framed as they are read, then loaded and decoded by
+    batches in `executor`. At most `max_pending` batches are decoded or
+    waiting to be yielded: when they are not consumed fast enough, the
+    stream is not read any more, which lets the transport apply
+    backpressure to the sender.
+
+    A batch is sent to the executor when it is full or when no more data
+    is available yet, so a slow stream does not delay its documents.
+
+    Raises:
+     DocumentError: if a document cannot be loaded or decoded and `errors`
+        is None.
+
+    Args:
+        reader: The stream.
+        decoder: The Decoder applied to every document.
+        fmt: The format of the stream: 'json' (JSON Lines: one json
+            document per line, blank lines being ignored) or 'yaml' (a
+            multi-document yaml stream).
+        executor: The executor that loads and decodes the documents, by
+            default the default executor of the event loop. With a process
+            pool, the Decoder must be picklable: it is sent with every
+            batch.
+        batch_size: The maximum number of documents sent at once to
+            `executor`.
+        max_pending: The maximum number of batches in flight.
+        errors: If given, the documents that cannot be loaded or decoded
+            are skipped and their DocumentError is appended to this list.
+        backend: The name of the yaml/json backend.
+
+    Returns:
+        An asynchronous iterator over the values yielded by `decoder`, in
+        the order of the stream.
+    '''
+    load = _loader(fmt, backend)
+    framer: _Framer = _YamlFramer() if fmt == 'yaml' else _JsonFramer()
+    loop = asyncio.get_running_loop()
+
+    # The framed documents not yet sent, and the batches in flight.
+    ready: t.Deque[Frame] = deque()
+    pending: t.Deque[asyncio.Future] = deque()
+    read: t.Optional[asyncio.Future] = None
+    eof = False
+
+    try:
+        while True:
+            while ready and len(pending) < max_pending:
+                batch = [ready.popleft()
+                         for _ in range(min(batch_size, len(ready)))]
+                pending.append(loop.run_in_executor(
+                    executor, _decode_batch, decoder, load, batch))
+            if (read is None and not eof and not ready
+                    and len(pending) < max_pending):
+                read = asyncio.ensure_future(reader.read(_READ_SIZE))
+
+            waiting = [f for f in (read, pending[0] if pending else None)
+                       if f is not None]
+            if not waiting:
+                return
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if pending and pending[0].done():
+                for r in pending.popleft().result():
+                    if isinstance(r, DocumentError):
+                        if errors is None:
+                            raise r
+                        errors.append(r)
+                    else:
+                        yield r
+            if read is not None and read.done():
+                chunk = read.result()
+                read = None
+                if chunk:
+                    ready.extend(framer.feed(chunk))
+                else:
+                    eof = True
+                    ready.extend(framer.close())
+    finally:
+        if read is not None:
+            read.cancel()
+        for f in pending:
+            f.cancel()
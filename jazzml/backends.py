@@ -0,0 +1,322 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+from typing import Callable, Any, Text, Type
+
+import typing as t
+
+import contextlib
+import json
+import mmap
+import os
+
+import yaml
+
+
+Loader = Callable[[Any], Any]
+'''A backend: a function that turns a document (str, bytes or a file
+object) into python values.
+'''
+
+Documents = Callable[[Any], t.Iterator[t.Tuple[t.Optional[int], Any]]]
+'''A streaming backend: a function that lazily turns a stream of documents
+into the pairs (line of the document, python values).
+'''
+
+
+class _Registry:
+    '''The loaders available for one document format.
+
+    The default loader is the first available one in order of preference,
+    unless it has been explicitly chosen with `use()`.
+    '''
+
+    def __init__(self, fmt: Text) -> None:
+        self.fmt = fmt
+        self.loaders: t.Dict[Text, Loader] = {}
+        self.streams: t.Dict[Text, Documents] = {}
+        self.preference: t.List[Text] = []
+        self.chosen: t.Optional[Text] = None
+        self.buffers: t.Set[Text] = set()
+
+    def register(self, name: Text, load: Loader, preferred: bool,
+                 documents: t.Optional[Documents] = None,
+                 buffers: bool = False) -> None:
+        self.loaders[name] = load
+        if buffers:
+            self.buffers.add(name)
+        else:
+            self.buffers.discard(name)
+        if documents is not None:
+            self.streams[name] = documents
+        else:
+            self.streams.pop(name, None)
+        if name in self.preference:
+            self.preference.remove(name)
+        if preferred:
+            self.preference.insert(0, name)
+        else:
+            self.preference.append(name)
+
+    def use(self, name: t.Optional[Text]) -> None:
+        if name is not None:
+            self.get(name)
+        self.chosen = name
+
+    def default(self) -> Text:
+        if self.chosen is not None:
+            return self.chosen
+        return self.preference[0]
+
+    def get(self, name: t.Optional[Text] = None) -> Loader:
+        if name is None:
+            name = self.default()
+        try:
+            return self.loaders[name]
+        except KeyError:
+            raise ValueError(
+                "Unknown {f} backend '{n}', available backends: {a}"
+                .format(f=self.fmt, n=name, a=self.preference)) from None
+
+    def takes_buffers(self, name: t.Optional[Text] = None) -> bool:
+        '''Whether the loader accepts memoryviews.'''
+        self.get(name)
+        return (name or self.default()) in self.buffers
+
+    def get_documents(self, name: t.Optional[Text] = None) -> Documents:
+        if name is None:
+            name = self.default()
+        self.get(name)
+        try:
+            return self.streams[name]
+        except KeyError:
+            raise ValueError(
+                "The {f} backend '{n}' cannot read a stream of documents"
+                .format(f=self.fmt, n=name)) from None
+
+
+_yaml = _Registry('yaml')
+_json = _Registry('json')
+
+
+def register_yaml_backend(name: Text, load: Loader,
+                          preferred: bool = False,
+                          documents: t.Optional[Documents] = None) -> None:
+    '''Register a yaml loader.
+
+    Args:
+        name: The name of the backend.
+        load: A function that loads a yaml document (str, bytes or file).
+        preferred: If True, the backend becomes the default one unless
+            another backend has been chosen with `set_yaml_backend()`.
+        documents: An optional function that lazily loads the documents
+            of a multi-document stream, used by `iter_yaml()`.
+    '''
+    _yaml.register(name, load, preferred, documents)
+
+
+def register_json_backend(name: Text, load: Loader,
+                          preferred: bool = False,
+                          buffers: bool = False) -> None:
+    '''Register a json loader.
+
+    Args:
+        name: The name of the backend.
+        load: A function that loads a json document (str or bytes).
+        preferred: If True, the backend becomes the default one unless
+            another backend has been chosen with `set_json_backend()`.
+        buffers: True if `load` also accepts a memoryview, which lets a
+            mapped file be loaded without a copy. Otherwise, it is given
+            a str decoded from the file.
+    '''
+    _json.register(name, load, preferred, buffers=buffers)
+
+
+def set_yaml_backend(name: t.Optional[Text]) -> None:
+    '''Choose the yaml backend used by default.
+
+    Args:
+        name: The name of a registered backend, or None to go back to the
+            fastest available backend.
+    '''
+    _yaml.use(name)
+
+
+def set_json_backend(name: t.Optional[Text]) -> None:
+    '''Choose the json backend used by default.
+
+    Args:
+        name: The name of a registered backend, or None to go back to the
+            fastest available backend.
+    '''
+    _json.use(name)
+
+
+def yaml_backends() -> t.List[Text]:
+    '''The names of the available yaml backends, fastest first.'''
+    return list(_yaml.preference)
+
+
+def json_backends() -> t.List[Text]:
+    '''The names of the available json backends, fastest first.'''
+    return list(_json.preference)
+
+
+def yaml_backend(name: t.Optional[Text] = None) -> Loader:
+    '''The yaml loader named `name`, or the default one.'''
+    return _yaml.get(name)
+
+
+def json_backend(name: t.Optional[Text] = None) -> Loader:
+    '''The json loader named `name`, or the default one.'''
+    return _json.get(name)
+
+
+def yaml_documents_backend(name: t.Optional[Text] = None) -> Documents:
+    '''The streaming yaml loader named `name`, or the default one.'''
+    return _yaml.get_documents(name)
+
+
+# Loading files and buffers
+# -------------------------
+#
+# A file is mapped in memory instead of being read, and a buffer (the
+# mapped file, a memoryview, a bytearray) is given to the loader without
+# building a bytes or str copy of the whole document when the loader
+# allows it:
+#
+# - the yaml loaders read it by chunks, as a file,
+# - the json loaders registered with `buffers=True` read it directly, the
+#   others are given the decoded str.
+
+Buffer = (memoryview, bytearray, mmap.mmap)
+
+
+class _BufferReader:
+    '''A binary file reading a buffer without copying it whole.'''
+
+    def __init__(self, buffer: Any) -> None:
+        self.buffer = memoryview(buffer)
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        start = self.position
+        end = len(self.buffer) if size < 0 else start + size
+        self.position = min(end, len(self.buffer))
+        return self.buffer[start:end].tobytes()
+
+
+@contextlib.contextmanager
+def mapped(path: 'os.PathLike[str]') -> t.Iterator[Any]:
+    '''The content of the file `path`, mapped in memory.
+
+    The file must not be truncated while it is mapped, which kills the
+    process (SIGBUS): a file rewritten while it is read must be replaced
+    by an atomic rename.
+    '''
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            # Empty files cannot be mapped.
+            yield b''
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def load_yaml(doc: Any, name: t.Optional[Text] = None) -> Any:
+    '''Load a yaml document: a str, bytes, a text or binary file, a buffer
+    or the path (os.PathLike) of a file.'''
+    if isinstance(doc, os.PathLike):
+        with mapped(doc) as buffer:
+            return load_yaml(buffer, name)
+    load = _yaml.get(name)
+    if isinstance(doc, Buffer):
+        reader = _BufferReader(doc)
+        try:
+            return load(reader)
+        finally:
+            reader.buffer.release()
+    return load(doc)
+
+
+def load_json(doc: Any, name: t.Optional[Text] = None) -> Any:
+    '''Load a json document: a str, bytes, a buffer or the path
+    (os.PathLike) of a file.'''
+    if isinstance(doc, os.PathLike):
+        with mapped(doc) as buffer:
+            return load_json(buffer, name)
+    load = _json.get(name)
+    if isinstance(doc, Buffer):
+        with memoryview(doc) as view:
+            if _json.takes_buffers(name):
+                return load(view)
+            encoding = json.detect_encoding(view[:4].tobytes())
+            return load(str(view, encoding, 'surrogatepass'))
+    return load(doc)
+
+
+def _yaml_documents(loader_class: Type) -> Documents:
+    '''A streaming backend built on a PyYAML Loader class.
+
+    Like `yaml.load_all()`, documents are composed and constructed one at
+    a time. The node of each document also gives its line.
+    '''
+    def documents(stream):
+        loader = loader_class(stream)
+        try:
+            while loader.check_node():
+                node = loader.get_node()
+                line = node.start_mark.line + 1 if node is not None else None
+                yield line, loader.construct_document(node)
+        finally:
+            loader.dispose()
+
+    return documents
+
+
+# yaml: the libyaml based loaders are several times faster than the pure
+# python ones. `FullLoader` remains the reference behaviour.
+
+register_yaml_backend('pyyaml',
+                      lambda doc: yaml.load(doc, Loader=yaml.FullLoader),
+                      documents=_yaml_documents(yaml.FullLoader))
+register_yaml_backend('pyyaml-safe',
+                      lambda doc: yaml.load(doc, Loader=yaml.SafeLoader),
+                      documents=_yaml_documents(yaml.SafeLoader))
+
+if getattr(yaml, '__with_libyaml__', False):
+    register_yaml_backend('libyaml-safe',
+                          lambda doc: yaml.load(doc, Loader=yaml.CSafeLoader),
+                          preferred=True,
+                          documents=_yaml_documents(yaml.CSafeLoader))
+    register_yaml_backend('libyaml',
+                          lambda doc: yaml.load(doc, Loader=yaml.CFullLoader),
+                          preferred=True,
+                          documents=_yaml_documents(yaml.CFullLoader))
+
+
+# json: the standard library loader already relies on a C scanner. orjson
+# is registered when installed but is not the default: it silently turns
+# integers that do not fit in 64 bits into floats. The documents it
+# rejects (NaN, Infinity) are handed over to the standard library.
+
+register_json_backend('json', json.loads)
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    def _orjson_loads(doc: Any) -> Any:
+        try:
+            return orjson.loads(doc)
+        except orjson.JSONDecodeError:
+            if isinstance(doc, memoryview):
+                doc = doc.tobytes()
+            return json.loads(doc)
+
+    register_json_backend('orjson', _orjson_loads, buffers=True)
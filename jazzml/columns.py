@@ -0,0 +1,131 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+from array import array
+from operator import itemgetter
+
+import typing as t
+from typing import Any, Text
+
+from .jazzml import (Decoder, Status, StatusBadType, StatusMissingField,
+                     _TYPE_CHECKS)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# The numpy dtypes and array.array typecodes of the numeric columns.
+_DTYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool'}
+_TYPECODES = {'int': 'q', 'float': 'd'}
+
+
+def _column(kind: t.Optional[Text], values: t.List[Any]) -> Any:
+    '''Pack the checked values of a column decoded by a Decoder of `kind`.
+
+    Numeric columns become numpy arrays, or `array.array` when numpy is not
+    installed. The values that do not fit (integers larger than 64 bits)
+    and the other columns stay in a list.
+    '''
+    try:
+        if np is not None and kind in _DTYPES:
+            return np.array(values, dtype=_DTYPES[kind])
+        if kind in _TYPECODES:
+            return array(_TYPECODES[kind], values)
+    except OverflowError:
+        pass
+    return values
+
+
+def _first_failure(decode: t.Callable[[Any, Any], Any], path: Any,
+                   name: Text, rows: t.List[Any],
+                   end: int) -> t.Optional[t.Tuple[int, Status]]:
+    '''The index and failing Status of the first row before `end` whose
+    field `name` cannot be decoded.'''
+    for i in range(end):
+        row = rows[i]
+        if not isinstance(row, dict):
+            return i, StatusBadType((path, i), 'dict', row)
+        if name not in row:
+            return i, StatusMissingField((path, i), name)
+        r = decode(((path, i), name), row[name])
+        if isinstance(r, Status):
+            return i, r
+    return None
+
+
+def Columns(columns: t.Dict[Text, Decoder[Any]]
+            ) -> Decoder[t.Dict[Text, Any]]:
+    '''Decode a list of homogeneous records (objects) into columns.
+
+    Instead of one python object per record, the result is a dictionary
+    holding, for every field, the column of its decoded values::
+
+        Columns({'t': Float, 'x': Int, 'label': Str}).at([], [
+            {'t': 0.5, 'x': 1, 'label': 'a'},
+            {'t': 1.5, 'x': 2, 'label': 'b'}])
+
+        -> {'t': array([0.5, 1.5]), 'x': array([1, 2]), 'label': ['a', 'b']}
+
+    The columns decoded by `Int`, `Float` and `Bool` are numpy arrays (or
+    `array.array` when numpy is not installed, `Bool` columns then being
+    lists). The other columns are lists of the values yielded by their
+    Decoder. The values of the columns decoded by the primitive Decoders
+    are checked per distinct type rather than one by one.
+
+    Fails on the first row (in the order of the list) that is not an
+    object, misses a field or holds a value its Decoder rejects, like
+    `List(mapn(...))` would, the path giving the index of that row.
+
+    Args:
+        columns: The Decoders of the fields, by field name.
+
+    Returns:
+        A dictionary with the same keys as `columns`.
+    '''
+    fields = [(name, decoder._decode, decoder._spec[0])
+              for name, decoder in columns.items()]
+
+    def decode(path, rows):
+        if type(rows) is not list:
+            return StatusBadType(path, "list", rows)
+
+        result = {}
+        failure: t.Optional[t.Tuple[int, Status]] = None
+        for name, decode_value, kind in fields:
+            end = len(rows) if failure is None else failure[0]
+            try:
+                values = list(map(itemgetter(name),
+                                  rows if failure is None else rows[:end]))
+            except (KeyError, TypeError, IndexError):
+                failure = _first_failure(decode_value, path, name,
+                                         rows, end) or failure
+                continue
+            check = _TYPE_CHECKS.get(kind)
+            if check is not None:
+                if all(check(ty) for ty in set(map(type, values))):
+                    result[name] = _column(kind, values)
+                else:
+                    failure = _first_failure(decode_value, path, name,
+                                             rows, end) or failure
+                continue
+            decoded = []
+            for i, v in enumerate(values):
+                r = decode_value(((path, i), name), v)
+                if isinstance(r, Status):
+                    failure = (i, r)
+                    break
+                decoded.append(r)
+            else:
+                result[name] = decoded
+
+        if failure is not None:
+            return failure[1]
+        return result
+
+    return Decoder._raw(decode, ('columns', dict(columns)))
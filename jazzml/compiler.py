@@ -0,0 +1,376 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import builtins
+import math
+import numbers
+from functools import partial
+
+import typing as t
+from typing import Any
+
+from .jazzml import (Decoder, Status, StatusBadType, StatusBadValue,
+                     StatusMissingField, StatusOneOfNoDecoder, StatusNok, a,
+                     _ap_chain, _one_of_decode, _record_slots, _REQUIRED,
+                     _tagged_decode, _tag_of, _TYPE_CHECKS, _unknown_field)
+from .parallel import ParallelList
+
+
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+
+# The nesting of the code of a function past which a node gets a function
+# of its own: python limits a function to 100 levels of indentation and 20
+# nested loops.
+_MAX_DEPTH = 50
+_MAX_LOOPS = 10
+
+
+class _Body:
+    '''The lines of one generated function.'''
+
+    def __init__(self, name: str) -> None:
+        self.lines = [f'def {name}(path, v0):']
+        self.depth = 1
+        self.loops = 0
+
+    def emit(self, line: str) -> None:
+        self.lines.append('    ' * self.depth + line)
+
+
+class _Compiler:
+    '''Translate a Decoder tree into the source code of a python module.
+
+    Every node is inlined in the function of its parent, except the
+    alternatives of `one_of` and the branches of `tagged` that get a
+    function of their own since a failing alternative must not abort the
+    whole decoding, the `recursive` Decoders that get a function calling
+    itself and the nodes nested too deeply in the code of their parent. The module ends with the `trailer`: the statements
+    binding the dispatching functions built from those functions.
+    '''
+
+    def __init__(self) -> None:
+        self.bodies: t.List[_Body] = []
+        self.env: t.Dict[str, Any] = {
+            'Status': Status,
+            'StatusBadType': StatusBadType,
+            'StatusBadValue': StatusBadValue,
+            'StatusMissingField': StatusMissingField,
+            'StatusOneOfNoDecoder': StatusOneOfNoDecoder,
+            'StatusNok': StatusNok,
+            'partial': partial,
+            'Real': numbers.Real,
+            '_one_of_decode': _one_of_decode,
+            '_tagged_decode': _tagged_decode,
+            '_unknown_field': _unknown_field,
+        }
+        self.counter = 0
+        self.trailer: t.List[str] = []
+        self.knots: t.Dict[int, str] = {}
+
+    def fresh(self, prefix: str) -> str:
+        self.counter += 1
+        return f'{prefix}{self.counter}'
+
+    def const(self, value: Any) -> str:
+        # The non-finite floats have no literal: `repr()` gives 'nan',
+        # 'inf' and '-inf'.
+        if type(value) in _LITERAL_TYPES and (type(value) is not float
+                                              or math.isfinite(value)):
+            return repr(value)
+        name = self.fresh('c')
+        self.env[name] = value
+        return name
+
+    def function(self, decoder: Decoder, name: t.Optional[str] = None) -> str:
+        if name is None:
+            name = self.fresh('decode')
+        body = _Body(name)
+        self.bodies.append(body)
+        result = self.node(body, decoder, 'v0', 'path')
+        body.emit(f'return {result}')
+        return name
+
+    def node(self, body: _Body, decoder: Decoder, src: str,
+             path: str) -> str:
+        '''Emit the code decoding `src` with `decoder`.
+
+        Failures return from the generated function. On success, the
+        returned expression holds the decoded value.
+
+        `path` is the expression building the linked path of `src`. It is
+        only evaluated when a failure is reported or an opaque Decoder is
+        called, so it costs nothing on the success path.
+        '''
+        spec = decoder._spec
+        kind = spec[0] if spec is not None else None
+        emit = body.emit
+
+        if body.depth > _MAX_DEPTH or body.loops >= _MAX_LOOPS:
+            return self.call(body, self.function(decoder), src, path)
+
+        if kind in ('int', 'str', 'bool'):
+            emit(f'if type({src}) is not {kind}:')
+            emit(f"    return StatusBadType({path}, '{kind}', {src})")
+            return src
+
+        if kind == 'float':
+            emit(f'if not isinstance({src}, (float, int)):')
+            emit(f"    return StatusBadType({path}, 'float', {src})")
+            return src
+
+        if kind == 'real':
+            emit(f'if not isinstance({src}, Real):')
+            emit(f"    return StatusBadType({path}, 'real', {src})")
+            return src
+
+        if kind == 'noop':
+            return src
+
+        if kind == 'succeed':
+            return self.const(spec[1])
+
+        if kind == 'fail':
+            emit(f'return StatusNok({path}, {self.const(spec[1])})')
+            return 'None'
+
+        if kind == 'this_str':
+            expected = self.const(spec[1])
+            emit(f'if not isinstance({src}, str):')
+            emit(f'    return StatusBadType({path}, str, {src})')
+            emit(f'if {src} != {expected}:')
+            emit(f'    return StatusBadValue({path}, {expected}, {src})')
+            return src
+
+        if kind == 'date':
+            dst = self.fresh('v')
+            emit(f'if not isinstance({src}, str):')
+            emit(f'    return StatusBadType({path}, str, {src})')
+            emit('try:')
+            emit(f'    {dst} = {self.const(decoder._parse)}({src})')
+            emit('except Exception:')
+            emit(f'    return StatusBadType({path}, str, {src})')
+            return dst
+
+        if kind == 'null':
+            value = self.const(spec[1])
+            emit(f'if {src} is not None:')
+            emit(f"    return StatusBadType({path}, 'Null', {value})")
+            return value
+
+        if kind == 'nullable':
+            _, inner, default = spec
+            dst = self.fresh('v')
+            emit(f'if {src} is None:')
+            emit(f'    {dst} = {self.const(default)}')
+            emit('else:')
+            body.depth += 1
+            emit(f'{dst} = {self.node(body, inner, src, path)}')
+            body.depth -= 1
+            return dst
+
+        if kind == 'field':
+            _, name, inner = spec
+            key = self.const(name)
+            value = self.fresh('v')
+            emit(f'if {key} not in {src}:')
+            emit(f'    return StatusMissingField({path}, {key})')
+            emit(f'{value} = {src}[{key}]')
+            return self.node(body, inner, value, f'({path}, {key})')
+
+        if kind == 'optional_field':
+            _, name, inner, default = spec
+            key = self.const(name)
+            value = self.fresh('v')
+            dst = self.fresh('v')
+            emit(f'if {key} in {src}:')
+            body.depth += 1
+            emit(f'{value} = {src}[{key}]')
+            inner_value = self.node(body, inner, value, f'({path}, {key})')
+            emit(f'{dst} = {inner_value}')
+            body.depth -= 1
+            emit('else:')
+            emit(f'    {dst} = {self.const(default)}')
+            return dst
+
+        if kind == 'list' and (len(spec) > 2
+                               or spec[1]._spec[0] in _TYPE_CHECKS):
+            # Lists of primitive values and arrays: `List` already checks
+            # them in a single pass.
+            return self.call(body, self.const(decoder._decode), src, path)
+
+        if kind == 'list':
+            index = self.fresh('i')
+            item = self.fresh('v')
+            dst = self.fresh('v')
+            emit(f'if type({src}) is not list:')
+            emit(f'    return StatusBadType({path}, "list", {src})')
+            emit(f'{dst} = []')
+            emit(f'for {index}, {item} in enumerate({src}):')
+            body.depth += 1
+            body.loops += 1
+            inner_value = self.node(body, spec[1], item, f'({path}, {index})')
+            emit(f'{dst}.append({inner_value})')
+            body.depth -= 1
+            body.loops -= 1
+            return dst
+
+        if kind == 'mapn':
+            _, f, decoders = spec
+            args = [self.node(body, d, src, path) for d in decoders]
+            dst = self.fresh('v')
+            emit(f'{dst} = {self.const(f)}({", ".join(args)})')
+            return dst
+
+        if kind == 'record':
+            _, mk, fields, strict = spec
+            missing = self.const(_REQUIRED)
+            found = self.fresh('n')
+            emit(f'if not isinstance({src}, dict):')
+            emit(f"    return StatusBadType({path}, 'dict', {src})")
+            if strict:
+                emit(f'{found} = 0')
+            args = []
+            for name, inner, default in _record_slots(fields):
+                key = self.const(name)
+                value = self.fresh('v')
+                dst = self.fresh('v')
+                emit(f'{value} = {src}.get({key}, {missing})')
+                emit(f'if {value} is {missing}:')
+                if default is _REQUIRED:
+                    emit(f'    return StatusMissingField({path}, {key})')
+                else:
+                    emit(f'    {dst} = {self.const(default)}')
+                emit('else:')
+                body.depth += 1
+                if strict:
+                    emit(f'{found} += 1')
+                inner_value = self.node(body, inner, value,
+                                        f'({path}, {key})')
+                emit(f'{dst} = {inner_value}')
+                body.depth -= 1
+                args.append(dst)
+            if strict:
+                emit(f'if {found} != len({src}):')
+                emit(f'    return _unknown_field({path}, {src}, '
+                     f'{self.const(fields)})')
+            dst = self.fresh('v')
+            emit(f'{dst} = {self.const(mk)}({", ".join(args)})')
+            return dst
+
+        if kind == 'one_of' and any(_tag_of(d) for d in spec[1]):
+            alternatives = [self.function(d) for d in spec[1]]
+            tags = self.const([_tag_of(d) for d in spec[1]])
+            decode = self.fresh('c')
+            self.trailer.append(f'{decode} = _one_of_decode('
+                                f'[{", ".join(alternatives)}], {tags})')
+            return self.call(body, decode, src, path)
+
+        if kind == 'tagged':
+            _, name, decoders = spec
+            branches = {tag: self.function(d) for tag, d in decoders.items()}
+            tags = [self.const(tag) for tag in branches]
+            decode = self.fresh('c')
+            table = ', '.join(f'{tag}: {branch}'
+                              for tag, branch in zip(tags, branches.values()))
+            self.trailer.append(f'{decode} = _tagged_decode('
+                                f'{self.const(name)}, {{{table}}})')
+            return self.call(body, decode, src, path)
+
+        if kind == 'one_of':
+            alternatives = [self.function(d) for d in spec[1]]
+            r = self.fresh('r')
+            alt = self.fresh('f')
+            emit(f'for {alt} in ({"".join(n + ", " for n in alternatives)}):')
+            emit(f'    {r} = {alt}({path}, {src})')
+            emit(f'    if not isinstance({r}, Status):')
+            emit('        break')
+            emit('else:')
+            emit(f'    return StatusOneOfNoDecoder({path})')
+            return r
+
+        if kind in ('ap', 'ap_call'):
+            # The whole chain of `*`, ending with `@` if ap_call.
+            fdec, args = _ap_chain(spec[1])
+            fv = self.node(body, fdec, src, path)
+            avs = [self.node(body, d, src, path) for d in args + (spec[2],)]
+            dst = self.fresh('v')
+            if kind == 'ap':
+                emit(f'{dst} = partial({fv}, {", ".join(avs)})')
+            else:
+                emit(f'{dst} = {fv}({", ".join(avs)})')
+            return dst
+
+        if kind == 'then':
+            _, first, f = spec
+            fv = self.node(body, first, src, path)
+            r = self.fresh('r')
+            emit(f'{r} = {self.const(f)}({fv})._decode({path}, {src})')
+            emit(f'if isinstance({r}, Status):')
+            emit(f'    return {r}')
+            return r
+
+        if kind == 'recursive':
+            # The function of a recursive Decoder is generated once and
+            # called by its occurrences, including the ones it contains.
+            name = self.knots.get(id(decoder))
+            if name is None:
+                name = self.knots[id(decoder)] = self.fresh('decode')
+                self.function(spec[2], name)
+            return self.call(body, name, src, path)
+
+        if kind == 'parallel_list':
+            # The values are decoded by the threads of the pool: the
+            # Decoder of the values is compiled on its own.
+            parallel = ParallelList(compile(spec[1]), *spec[2:])
+            return self.call(body, self.const(parallel._decode), src, path)
+
+        # lazy, susp and user defined Decoders are opaque: call them.
+        return self.call(body, self.const(decoder._decode), src, path)
+
+    def call(self, body: _Body, decode: str, src: str, path: str) -> str:
+        '''Emit the call to the decoding function `decode`.'''
+        r = self.fresh('r')
+        body.emit(f'{r} = {decode}({path}, {src})')
+        body.emit(f'if isinstance({r}, Status):')
+        body.emit(f'    return {r}')
+        return r
+
+    def source(self) -> str:
+        return '\n\n'.join(['\n'.join(b.lines) for b in self.bodies]
+                           + ['\n'.join(self.trailer)]) + '\n'
+
+
+def compile(decoder: Decoder[a]) -> Decoder[a]:
+    '''Compile a Decoder into a single specialized python function.
+
+    The Decoder tree built by the combinators (`field`, `optional_field`,
+    `mapn`, `List`, `nullable`, `one_of`, the primitive Decoders, ...)
+    is translated into python code where every node is inlined, removing
+    the overhead of the nested calls of `Decoder.at`.
+
+    The compiled Decoder yields the same values and errors as `decoder`.
+    Decoders whose structure cannot be known in advance (`lazy`, `susp`,
+    the Decoder returned by the function given to `then()` and user
+    defined Decoders) are called as is.
+
+    It is imported by name (`from jazzml import compile`): `from jazzml
+    import *` leaves it out, not to hide the builtin `compile`.
+
+    Args:
+        decoder: The Decoder to compile.
+
+    Returns:
+        An equivalent Decoder.
+    '''
+    compiler = _Compiler()
+    name = compiler.function(decoder)
+    source = compiler.source()
+    code = builtins.compile(source, '<jazzml.compile>', 'exec')
+    exec(code, compiler.env)
+    compiled = Decoder._raw(compiler.env[name], ('compiled', decoder))
+    compiled._source = source
+    return compiled
@@ -0,0 +1,334 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import dataclasses
+import datetime as dt
+import types
+
+import typing as t
+from typing import Any, Callable, Text
+
+from .jazzml import (Decoder, Int, Str, Float, Bool, noop, date, nullable,
+                     null, this_str, List, one_of, record, recursive,
+                     _REQUIRED)
+
+
+# The Decoders derived from the classes, by class, date format and
+# strictness.
+_derived: t.Dict[t.Tuple[Any, Text, bool], Decoder[Any]] = {}
+
+_PRIMITIVES: t.Dict[Any, Decoder[Any]] = {int: Int, str: Str, float: Float,
+                                          bool: Bool}
+
+_UNIONS = tuple(u for u in (t.Union, getattr(types, 'UnionType', None))
+                if u is not None)
+
+_NONE_TYPE = type(None)
+
+
+class _Absent:
+    '''The value of the optional fields that are missing and have no
+    default value.'''
+
+    def __reduce__(self) -> Text:
+        return '_ABSENT'
+
+    def __repr__(self) -> str:
+        return '<absent>'
+
+
+_ABSENT = _Absent()
+
+
+class _Maker:
+    '''Build the instances of a class whose fields cannot all be passed
+    positionally: keyword-only fields, default factories and the optional
+    keys of a TypedDict.'''
+
+    __slots__ = ('cls', 'names', 'factories')
+
+    def __init__(self, cls: Callable[..., Any], names: t.Tuple[Text, ...],
+                 factories: t.Dict[Text, Callable[[], Any]]) -> None:
+        self.cls = cls
+        self.names = names
+        self.factories = factories
+
+    def __call__(self, *values: Any) -> Any:
+        kwargs = {}
+        for name, v in zip(self.names, values):
+            if v is _ABSENT:
+                factory = self.factories.get(name)
+                if factory is None:
+                    continue
+                v = factory()
+            kwargs[name] = v
+        return self.cls(**kwargs)
+
+    def __reduce__(self) -> Any:
+        return (_Maker, (self.cls, self.names, self.factories))
+
+
+class _Knot:
+    '''The definition given to `recursive()` for a self-referential class.
+
+    Pickled by class: the unpickled `recursive` Decoder derives the class
+    again.
+    '''
+
+    def __init__(self, cls: type, date_format: Text, strict: bool,
+                 deriver: t.Optional['_Deriver'] = None) -> None:
+        self.cls = cls
+        self.deriver = deriver or _Deriver(date_format, strict)
+
+    def __call__(self, this: Decoder[Any]) -> Decoder[Any]:
+        knots = self.deriver.knots
+        knots[self.cls] = this
+        try:
+            return self.deriver.fields(self.cls)
+        finally:
+            del knots[self.cls]
+
+    def __reduce__(self) -> Any:
+        return (_Knot, (self.cls, self.deriver.date_format,
+                        self.deriver.strict))
+
+
+class _Deriver:
+    '''Derive the Decoders of the types reachable from a class.'''
+
+    def __init__(self, date_format: Text, strict: bool) -> None:
+        self.date_format = date_format
+        self.strict = strict
+        # The `recursive` Decoders of the classes being derived, and those
+        # of them that were used by their own fields.
+        self.knots: t.Dict[type, Decoder[Any]] = {}
+        self.recursive: t.Set[type] = set()
+        # The Decoders derived by this derivation, only added to
+        # `_derived` if it succeeds.
+        self.derived: t.Dict[t.Tuple[Any, Text, bool], Decoder[Any]] = {}
+        self.type_hints: t.Dict[type, t.Dict[Text, Any]] = {}
+
+    def of_type(self, tp: Any, where: Text) -> Decoder[Any]:
+        '''The Decoder of the type `tp` of `where`.'''
+        if tp is Any or tp is object:
+            return noop
+        decoder = _PRIMITIVES.get(tp) if isinstance(tp, type) else None
+        if decoder is not None:
+            return decoder
+        if tp is dt.datetime:
+            return date(self.date_format)
+        if tp is _NONE_TYPE or tp is None:
+            return null(None)
+
+        origin, args = t.get_origin(tp), t.get_args(tp)
+        if origin in _UNIONS:
+            alternatives = [self.of_type(arg, where) for arg in args
+                            if arg is not _NONE_TYPE]
+            decoder = (alternatives[0] if len(alternatives) == 1
+                       else one_of(alternatives))
+            if len(alternatives) < len(args):
+                return nullable(decoder, None)
+            return decoder
+        if origin is list or tp is list:
+            return List(self.of_type(args[0], where + '[]') if args
+                        else noop)
+        if origin is t.Literal and all(isinstance(arg, str) for arg in args):
+            if len(args) == 1:
+                return this_str(args[0])
+            return one_of([this_str(arg) for arg in args])
+        if isinstance(tp, type) and _is_record_class(tp):
+            return self.of_class(tp)
+        raise TypeError('cannot derive a Decoder for {w}: {tp!r}'
+                        .format(w=where, tp=tp))
+
+    def of_class(self, cls: type) -> Decoder[Any]:
+        '''The Decoder of a dataclass, NamedTuple or TypedDict.'''
+        decoder = self.derived_of(cls)
+        if decoder is not None:
+            return decoder
+        knot = self.knots.get(cls)
+        if knot is not None:
+            self.recursive.add(cls)
+            return knot
+
+        # The classes it uses are derived first, so that only the cycles
+        # are derived recursively, whatever the depth of the classes.
+        for c in self.order(cls):
+            if self.derived_of(c) is None:
+                self.build(c)
+        return self.derived_of(cls)
+
+    def derived_of(self, cls: type) -> t.Optional[Decoder[Any]]:
+        key = (cls, self.date_format, self.strict)
+        decoder = _derived.get(key)
+        if decoder is None:
+            decoder = self.derived.get(key)
+        return decoder
+
+    def build(self, cls: type) -> None:
+        '''Derive the Decoder of a class.'''
+        decoder = recursive(_Knot(cls, self.date_format, self.strict, self))
+        if cls not in self.recursive:
+            # Not self-referential: no knot to go through.
+            decoder = decoder._spec[2]
+        self.derived[(cls, self.date_format, self.strict)] = decoder
+
+    def order(self, cls: type) -> t.List[type]:
+        '''The classes reachable from `cls` that are not derived yet, each
+        one after the classes it uses (except in the cycles).'''
+        visited = {cls}
+        ordered = []
+        stack = [(cls, iter(self.uses(cls)))]
+        while stack:
+            c, uses = stack[-1]
+            for used in uses:
+                if used not in visited:
+                    visited.add(used)
+                    stack.append((used, iter(self.uses(used))))
+                    break
+            else:
+                stack.pop()
+                ordered.append(c)
+        return ordered
+
+    def uses(self, cls: type) -> t.Iterator[type]:
+        '''The classes used by the fields of `cls` that are not derived
+        yet.'''
+        types = list(self.hints(cls).values())
+        while types:
+            tp = types.pop()
+            if (isinstance(tp, type) and _is_record_class(tp)
+                    and tp not in self.knots and self.derived_of(tp) is None):
+                yield tp
+            types.extend(t.get_args(tp))
+
+    def hints(self, cls: type) -> t.Dict[Text, Any]:
+        hints = self.type_hints.get(cls)
+        if hints is None:
+            hints = self.type_hints[cls] = t.get_type_hints(cls)
+        return hints
+
+    def fields(self, cls: type) -> Decoder[Any]:
+        '''The `record` Decoder of a class.'''
+        hints = self.hints(cls)
+        # Whether `cls` cannot be built by `cls(*values)`.
+        by_name = False
+        factories: t.Dict[Text, Callable[[], Any]] = {}
+        fields: t.Dict[Text, Any] = {}
+
+        if dataclasses.is_dataclass(cls):
+            for f in cls.__dataclass_fields__.values():  # type: ignore
+                tp = hints.get(f.name, Any)
+                if (not f.init or tp is t.ClassVar
+                        or t.get_origin(tp) is t.ClassVar):
+                    continue
+                if isinstance(tp, dataclasses.InitVar):
+                    tp = tp.type
+                if getattr(f, 'kw_only', False) is True:
+                    by_name = True
+                if f.default is not dataclasses.MISSING:
+                    default = f.default
+                elif f.default_factory is not dataclasses.MISSING:
+                    factories[f.name] = f.default_factory
+                    by_name = True
+                    default = _ABSENT
+                else:
+                    default = _REQUIRED
+                fields[f.name] = (self.of_type(tp, _where(cls, f.name)),
+                                  default)
+        elif _is_typeddict(cls):
+            by_name = True
+            for name, tp in hints.items():
+                default = (_REQUIRED if name in cls.__required_keys__
+                           else _ABSENT)
+                fields[name] = (self.of_type(tp, _where(cls, name)), default)
+        else:
+            defaults = getattr(cls, '_field_defaults', {})
+            for name in cls._fields:  # type: ignore
+                fields[name] = (self.of_type(hints.get(name, Any),
+                                             _where(cls, name)),
+                                defaults.get(name, _REQUIRED))
+
+        mk: Callable[..., Any] = cls
+        if by_name:
+            mk = _Maker(cls, tuple(fields), factories)
+        return record(mk, {name: d if default is _REQUIRED else (d, default)
+                           for name, (d, default) in fields.items()},
+                      strict=self.strict)
+
+
+def _is_typeddict(cls: type) -> bool:
+    return issubclass(cls, dict) and hasattr(cls, '__required_keys__')
+
+
+def _is_record_class(cls: type) -> bool:
+    '''Whether `cls` is a dataclass, a NamedTuple or a TypedDict.'''
+    return (dataclasses.is_dataclass(cls) or _is_typeddict(cls)
+            or (issubclass(cls, tuple) and hasattr(cls, '_fields')))
+
+
+def _where(cls: type, name: Text) -> Text:
+    return '{c}.{n}'.format(c=cls.__qualname__, n=name)
+
+
+def derive(cls: Any, date_format: Text = '%d-%m-%Y',
+           strict: bool = False) -> Decoder[Any]:
+    '''
+    Derive a Decoder from the type hints of a class::
+
+        @dataclass
+        class Line:
+            product: str
+            quantity: int = 1
+
+        @dataclass
+        class Order:
+            id: int
+            lines: list[Line]
+            note: Optional[str] = None
+
+        order = derive(Order)
+
+    The dataclasses, NamedTuples and TypedDicts are decoded from json/yaml
+    objects by `record()`: the function decoding their fields is generated
+    once and the class is called with the decoded values, positionally
+    when its constructor allows it. The fields with a default value (or a
+    default factory, or the keys of a TypedDict that are not required) are
+    optional. The types of the fields are mapped onto the Decoders:
+
+    - `int`, `str`, `float`, `bool`: `Int`, `Str`, `Float`, `Bool`.
+    - `datetime`: `date(date_format)`.
+    - `list[X]`: `List(X)`.
+    - `Optional[X]`: `nullable(X, None)`, a required field unless it has a
+      default value.
+    - `Union[X, Y]`: `one_of([X, Y])`.
+    - `Literal['a', 'b']`: `this_str('a')` or `one_of` the strings, which
+      makes the unions of classes with a `Literal` field tagged (see
+      `one_of`).
+    - `Any`: `noop`.
+    - The nested classes: their derived Decoder.
+
+    The self-referential classes, directly or through other classes, are
+    decoded by a `recursive` Decoder, the other ones without one.
+
+    The Decoders derived from a class are cached: deriving a class again,
+    or a class that uses it, does not read its type hints again.
+
+    Raises:
+        TypeError: if a type cannot be mapped onto a Decoder.
+        NameError: if a type hint cannot be resolved.
+
+    Args:
+        cls: The class, or a type like `list[Order]`.
+        date_format: The format of the `datetime` fields.
+        strict: If True, the objects with fields not in their class are
+            rejected (see `record`).
+    '''
+    deriver = _Deriver(date_format, strict)
+    decoder = deriver.of_type(cls, getattr(cls, '__qualname__', repr(cls)))
+    _derived.update(deriver.derived)
+    return decoder
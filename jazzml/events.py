@@ -0,0 +1,809 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+Event driven decoding.
+
+The structure of a Decoder tells which parts of a document it can read:
+the keys looked up by `field()`, the elements of a `List()`, ... That
+projection (the "shape" of the Decoder) is computed once. The document is
+then read from a stream of parser events and only the parts covered by
+the shape are built as python values, everything else is skipped. The
+Decoder finally runs on that pruned document, which gives the same
+results as a regular `parse_yaml()`/`parse_json()`, and the same failures
+at the same paths. The values quoted by the messages of the failures (the
+value read by a `StatusBadType`, ...) are the pruned values though: a
+mapping only holds the keys read by the Decoder.
+'''
+import codecs
+import json
+import re
+
+from json.decoder import scanstring
+
+from typing import IO, Any, Text, Type, Union
+
+import typing as t
+
+import yaml
+
+from yaml.events import (AliasEvent, ScalarEvent, SequenceStartEvent,
+                         SequenceEndEvent, MappingStartEvent,
+                         MappingEndEvent, StreamEndEvent)
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+
+from .jazzml import Decoder, Status, StatusBadType, a, _error, _record_slots
+
+
+class _Shape:
+    '''The parts of a value read by a Decoder.
+
+    - `whole`: the complete value is needed.
+    - `keys`: if the value is a mapping, the shapes of the needed keys.
+    - `items`: if the value is a sequence, the shape of its elements.
+    - `null`: whether the value is null is needed (`nullable()`): a scalar
+      is built, a mapping or a sequence is skipped and replaced by
+      `_PRESENT`.
+
+    A shape with none of these is not read at all and the value is skipped.
+    '''
+
+    __slots__ = ('whole', 'keys', 'items', 'null')
+
+    def __init__(self, whole: bool = False,
+                 keys: t.Optional[t.Dict[Any, '_Shape']] = None,
+                 items: t.Optional['_Shape'] = None,
+                 null: bool = False) -> None:
+        self.whole = whole
+        self.keys = keys
+        self.items = items
+        self.null = null
+
+    def nothing(self) -> bool:
+        return not (self.whole or self.null or self.keys is not None
+                    or self.items is not None)
+
+
+class _Present:
+    '''The value of the mappings and sequences that are skipped because
+    only whether they are null is read.'''
+
+    def __repr__(self) -> str:
+        return '<present>'
+
+
+_WHOLE = _Shape(whole=True)
+_NOTHING = _Shape()
+_NULL = _Shape(null=True)
+_PRESENT = _Present()
+
+
+class _Shapes:
+    '''Compute the shapes of the Decoders reachable from a Decoder.
+
+    The shape of a Decoder is made of its own parts (the key of a
+    `field()`, ...) and includes the shapes of other Decoders (the
+    alternatives of a `one_of()`, the Decoder of a `nullable()`, ...). On
+    recursive Decoders an included shape may not be complete yet: the
+    changes of the shapes are propagated to the shapes including them
+    until none changes. The shapes only grow, and the unions of shapes are
+    shared, so the computation ends.
+    '''
+
+    def __init__(self) -> None:
+        self.shapes: t.Dict[int, _Shape] = {}
+        # The shapes of the Decoders whose parts are not computed yet.
+        self.todo: t.List[t.Tuple[Decoder, _Shape]] = []
+        # The shapes to include in other shapes: (into, included).
+        self.work: t.List[t.Tuple[_Shape, _Shape]] = []
+        self.including: t.Dict[int, t.List[_Shape]] = {}
+        # The unions by the shapes they include, and the reverse.
+        self.unions: t.Dict[t.FrozenSet[int], _Shape] = {}
+        self.parts: t.Dict[int, t.Dict[int, _Shape]] = {}
+
+    def solve(self, decoder: Decoder) -> _Shape:
+        root = self.shape(decoder)
+        while self.todo or self.work:
+            if self.todo:
+                self.define(*self.todo.pop())
+                continue
+            into, shape = self.work.pop()
+            if self.merge(into, shape):
+                for s in self.including.get(id(into), ()):
+                    self.work.append((s, into))
+        return root
+
+    def shape(self, decoder: Decoder) -> _Shape:
+        s = self.shapes.get(id(decoder))
+        if s is None:
+            s = self.shapes[id(decoder)] = _Shape()
+            self.todo.append((decoder, s))
+        return s
+
+    def include(self, into: _Shape, shape: _Shape) -> None:
+        self.including.setdefault(id(shape), []).append(into)
+        self.work.append((into, shape))
+
+    def define(self, decoder: Decoder, s: _Shape) -> None:
+        spec = decoder._spec
+        kind = spec[0] if spec is not None else None
+
+        if kind in ('succeed', 'fail'):
+            pass
+        elif kind in ('field', 'optional_field'):
+            self.include(s, _Shape(keys={spec[1]: self.shape(spec[2])}))
+        elif kind == 'record' and not spec[3]:
+            self.include(s, _Shape(keys={name: self.shape(d) for name, d, _
+                                         in _record_slots(spec[2])}))
+        elif kind in ('list', 'parallel_list'):
+            self.include(s, _Shape(items=self.shape(spec[1])))
+        elif kind == 'columns':
+            self.include(s, _Shape(items=_Shape(
+                keys={name: self.shape(d) for name, d in spec[1].items()})))
+        elif kind == 'tagged':
+            self.include(s, _Shape(keys={spec[1]: _WHOLE}))
+            for d in spec[2].values():
+                self.include(s, self.shape(d))
+        elif kind == 'nullable':
+            self.include(s, _NULL)
+            self.include(s, self.shape(spec[1]))
+        elif kind in ('compiled', 'stackless'):
+            self.include(s, self.shape(spec[1]))
+        elif kind == 'recursive':
+            self.include(s, self.shape(spec[2]))
+        elif kind in ('mapn', 'one_of', 'ap', 'ap_call'):
+            if kind == 'mapn':
+                decoders = spec[2]
+            elif kind == 'one_of':
+                decoders = spec[1]
+            else:
+                decoders = spec[1:]
+            for d in decoders:
+                self.include(s, self.shape(d))
+        else:
+            # Primitive Decoders read their whole (scalar) value. The
+            # Decoders whose structure is unknown (then, lazy, susp, user
+            # defined) may read anything.
+            self.include(s, _WHOLE)
+
+    def merge(self, into: _Shape, shape: _Shape) -> bool:
+        '''Add `shape` to `into`, returns whether `into` changed.'''
+        changed = False
+        if shape.whole and not into.whole:
+            into.whole = changed = True
+        if shape.null and not into.null:
+            into.null = changed = True
+        if shape.keys is not None:
+            if into.keys is None:
+                into.keys = {}
+                changed = True
+            for k, v in shape.keys.items():
+                u = into.keys.get(k)
+                u = v if u is None else self.union(u, v)
+                if u is not into.keys.get(k):
+                    into.keys[k] = u
+                    changed = True
+        if shape.items is not None:
+            u = (shape.items if into.items is None
+                 else self.union(into.items, shape.items))
+            if u is not into.items:
+                into.items = u
+                changed = True
+        return changed
+
+    def union(self, x: _Shape, y: _Shape) -> _Shape:
+        parts = dict(self.parts.get(id(x), {id(x): x}))
+        parts.update(self.parts.get(id(y), {id(y): y}))
+        if len(parts) == len(self.parts.get(id(x), (x,))):
+            return x
+        if len(parts) == len(self.parts.get(id(y), (y,))):
+            return y
+        key = frozenset(parts)
+        u = self.unions.get(key)
+        if u is None:
+            u = self.unions[key] = _Shape()
+            self.parts[id(u)] = parts
+            for shape in parts.values():
+                self.include(u, shape)
+        return u
+
+
+def _shape_of(decoder: Decoder) -> _Shape:
+    return _Shapes().solve(decoder)
+
+
+# yaml
+# ----
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+_MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+_DEFAULT_LOADER: Type = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
+
+class _YamlReader:
+    '''Build pruned values from the events of a PyYAML Loader.
+
+    Nodes are composed from the events the same way the PyYAML Composer
+    does, and constructed by the Loader itself, so the built values are
+    identical to those of `yaml.load()`.
+    '''
+
+    def __init__(self, stream: Any, loader_class: Type) -> None:
+        self.loader = loader_class(stream)
+        self.anchors: t.Dict[Text, Any] = {}
+        self.loader.get_event()
+
+    def close(self) -> None:
+        self.loader.dispose()
+
+    def peek(self) -> Any:
+        return self.loader.peek_event()
+
+    def start_document(self) -> bool:
+        if isinstance(self.peek(), StreamEndEvent):
+            return False
+        self.loader.get_event()
+        return True
+
+    def end_document(self) -> None:
+        self.loader.get_event()
+        self.anchors = {}
+
+    def check_single_document(self) -> None:
+        event = self.peek()
+        if not isinstance(event, StreamEndEvent):
+            raise yaml.composer.ComposerError(
+                "expected a single document in the stream", None,
+                "but found another document", event.start_mark)
+
+    def compose(self, event: Any = None) -> Any:
+        loader = self.loader
+        if event is None:
+            event = loader.get_event()
+        if isinstance(event, AliasEvent):
+            if event.anchor not in self.anchors:
+                raise yaml.composer.ComposerError(
+                    None, None, "found undefined alias %r" % event.anchor,
+                    event.start_mark)
+            return self.anchors[event.anchor]
+        tag = event.tag
+        if isinstance(event, ScalarEvent):
+            if tag is None or tag == '!':
+                tag = loader.resolve(ScalarNode, event.value, event.implicit)
+            node = ScalarNode(tag, event.value, event.start_mark,
+                              event.end_mark, style=event.style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+            return node
+        if isinstance(event, SequenceStartEvent):
+            if tag is None or tag == '!':
+                tag = loader.resolve(SequenceNode, None, event.implicit)
+            node = SequenceNode(tag, [], event.start_mark, None,
+                                flow_style=event.flow_style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+            while not isinstance(loader.peek_event(), SequenceEndEvent):
+                node.value.append(self.compose())
+        else:
+            if tag is None or tag == '!':
+                tag = loader.resolve(MappingNode, None, event.implicit)
+            node = MappingNode(tag, [], event.start_mark, None,
+                               flow_style=event.flow_style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+            while not isinstance(loader.peek_event(), MappingEndEvent):
+                key = self.compose()
+                node.value.append((key, self.compose()))
+        node.end_mark = loader.get_event().end_mark
+        return node
+
+    def construct(self, node: Any) -> Any:
+        if type(node) is ScalarNode and node.tag == _STR_TAG:
+            return node.value
+        return self.loader.construct_document(node)
+
+    def skip(self) -> None:
+        '''Skip a value. Anchored nodes are still composed, an alias may
+        refer to them later on.'''
+        loader = self.loader
+        event = loader.get_event()
+        if getattr(event, 'anchor', None) is not None                   \
+                and not isinstance(event, AliasEvent):
+            self.compose(event)
+            return
+        if not isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+            return
+        depth = 1
+        while depth:
+            event = loader.get_event()
+            if isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+                if event.anchor is not None:
+                    self.compose(event)
+                else:
+                    depth += 1
+            elif isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+                depth -= 1
+            elif isinstance(event, ScalarEvent) and event.anchor is not None:
+                self.compose(event)
+
+    def _prunable(self, event: Any, node_class: Type) -> bool:
+        if event.anchor is not None:
+            return False
+        tag = event.tag
+        if tag is None or tag == '!':
+            return True
+        return tag == self.loader.resolve(node_class, None, event.implicit)
+
+    def build(self, shape: _Shape) -> Any:
+        event = self.peek()
+        if not shape.whole:
+            if isinstance(event, MappingStartEvent)                       \
+                    and shape.keys is not None                            \
+                    and self._prunable(event, MappingNode):
+                return self.mapping(shape.keys)
+            if isinstance(event, SequenceStartEvent)                      \
+                    and shape.items is not None                           \
+                    and self._prunable(event, SequenceNode):
+                return self.sequence(shape.items)
+            if shape.nothing():
+                self.skip()
+                return None
+            if shape.keys is None and shape.items is None                 \
+                    and isinstance(event, (MappingStartEvent,
+                                           SequenceStartEvent))           \
+                    and event.anchor is None:
+                self.skip()
+                return _PRESENT
+        return self.construct(self.compose())
+
+    def mapping(self, keys: t.Dict[Any, _Shape]) -> t.Dict[Any, Any]:
+        loader = self.loader
+        start = loader.get_event()
+        result = {}
+        merges = []
+        while not isinstance(loader.peek_event(), MappingEndEvent):
+            key_node = self.compose()
+            if key_node.tag == _MERGE_TAG:
+                merges.append(self.compose())
+                continue
+            key = self.construct(key_node)
+            try:
+                shape = keys.get(key)
+            except TypeError:
+                raise yaml.constructor.ConstructorError(
+                    "while constructing a mapping", start.start_mark,
+                    "found unhashable key", key_node.start_mark) from None
+            if shape is None:
+                self.skip()
+            else:
+                result[key] = self.build(shape)
+        loader.get_event()
+
+        # Merged mappings, in the order of PyYAML's `flatten_mapping()`: the
+        # explicit keys take precedence, then the last merge keys and, in
+        # the list of a merge key, the first mappings.
+        for node in reversed(merges):
+            merged = self.construct(node)
+            for m in (merged if isinstance(merged, list) else [merged]):
+                for k in keys:
+                    if k not in result and k in m:
+                        result[k] = m[k]
+        return result
+
+    def sequence(self, items: _Shape) -> t.List[Any]:
+        loader = self.loader
+        loader.get_event()
+        result = []
+        while not isinstance(loader.peek_event(), SequenceEndEvent):
+            result.append(self.build(items))
+        loader.get_event()
+        return result
+
+
+def parse_yaml_events(doc: Union[str, bytes, IO[str], IO[bytes]],
+                      decoder: Decoder[a],
+                      loader: Type = _DEFAULT_LOADER) -> a:
+    '''
+    Decode the given yaml document with the given Decoder, building only
+    the parts of the document read by the Decoder.
+
+    The document is read from the PyYAML event stream. The keys that are
+    not looked up by a `field()` and the values that are not read are
+    skipped without being built, so memory and time depend on what the
+    Decoder reads rather than on the size of the document.
+
+    Raises:
+     DecodeError: if the Decoder fails. The values quoted by its messages
+        are pruned to the parts read by the Decoder.
+
+    Args:
+        doc: The document to decode.
+        decoder: The Decoder used to decode `doc`.
+        loader: The PyYAML Loader class (libyaml based if available).
+
+    Returns:
+        The value yielded by `decoder`.
+    '''
+    reader = _YamlReader(doc, loader)
+    try:
+        value = None
+        if reader.start_document():
+            value = reader.build(_shape_of(decoder))
+            reader.end_document()
+        reader.check_single_document()
+    finally:
+        reader.close()
+    r = decoder._decode((), value)
+    if isinstance(r, Status):
+        raise _error(r)
+    return r
+
+
+def iter_yaml_events(doc: Union[str, bytes, IO[str], IO[bytes]],
+                     decoder: Decoder[a],
+                     loader: Type = _DEFAULT_LOADER) -> t.Iterator[a]:
+    '''
+    Lazily decode the elements of a yaml document that is a list.
+
+    Each element is built (see `parse_yaml_events()`), decoded and yielded
+    as soon as it has been parsed.
+
+    Raises:
+     DecodeError: if the document is not a list or if the Decoder fails
+        on an element.
+
+    Args:
+        doc: The document to decode.
+        decoder: The Decoder applied to every element of the list.
+        loader: The PyYAML Loader class (libyaml based if available).
+
+    Returns:
+        An iterator over the values yielded by `decoder`.
+    '''
+    reader = _YamlReader(doc, loader)
+    try:
+        if not reader.start_document():
+            raise _error(StatusBadType((), "list", None))
+        event = reader.peek()
+        if not isinstance(event, SequenceStartEvent)                      \
+                or not reader._prunable(event, SequenceNode):
+            value = reader.build(_WHOLE)
+            if type(value) is not list:
+                raise _error(StatusBadType((), "list", value))
+            yield from _decode_items(decoder, value)
+            return
+        shape = _shape_of(decoder)
+        reader.loader.get_event()
+        i = 0
+        while not isinstance(reader.peek(), SequenceEndEvent):
+            r = decoder._decode(((), i), reader.build(shape))
+            if isinstance(r, Status):
+                raise _error(r)
+            yield r
+            i += 1
+        reader.loader.get_event()
+        reader.end_document()
+        reader.check_single_document()
+    finally:
+        reader.close()
+
+
+def _decode_items(decoder: Decoder[a], values: t.List[Any]) -> t.Iterator[a]:
+    for i, v in enumerate(values):
+        r = decoder._decode(((), i), v)
+        if isinstance(r, Status):
+            raise _error(r)
+        yield r
+
+
+# json
+# ----
+
+_WS = re.compile(r'[ \t\n\r]*')
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_SCALAR = re.compile(r'[^\s,\]}:]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+_CONSTANTS = {'true': True, 'false': False, 'null': None,
+              'NaN': float('nan'), 'Infinity': float('inf'),
+              '-Infinity': float('-inf')}
+
+_raw_decode = json.JSONDecoder().raw_decode
+
+# Scans a value with the standard library C decoder without keeping what it
+# builds: every object is dropped as soon as it has been parsed.
+_skip_decode = json.JSONDecoder(object_pairs_hook=lambda pairs: None).raw_decode
+
+
+class _JsonReader:
+    '''An incremental json tokenizer building pruned values.
+
+    The document is read by chunks. Only the part of the document that is
+    being parsed is kept in memory, plus the text of the value being built
+    when a whole value is needed; such values are built by the standard
+    library C decoder.
+
+    Skipped values are scanned by the C decoder, their objects being
+    dropped as soon as they are parsed. When a skipped value does not fit in
+    the chunks read so far, its elements are skipped one by one instead and
+    only the balance of its brackets is checked.
+    '''
+
+    def __init__(self, doc: Any, chunk_size: int) -> None:
+        self.chunk_size = chunk_size
+        self.pos = 0
+        self.mark: t.Optional[int] = None
+        # The text of the marked value that is no more in the buffer.
+        self.kept: t.List[Text] = []
+        self.decoder = None
+        if isinstance(doc, (bytes, bytearray, memoryview)):
+            doc = codecs.decode(doc, 'utf-8')
+        if isinstance(doc, str):
+            self.buf = doc
+            self.read = None
+        else:
+            self.buf = ''
+            self.read = doc.read
+
+    def more(self) -> bool:
+        '''Read the next chunk, returns False at the end of the document.'''
+        while self.read is not None:
+            # At least as much as the text not parsed yet (a long string or
+            # a value that does not fit): the buffer is rebuilt a
+            # logarithmic number of times, whatever the length of the text.
+            size = max(self.chunk_size, len(self.buf) - self.pos)
+            chunk = self.read(size)
+            if not chunk:
+                self.read = None
+                chunk = ''
+                if self.decoder is not None:
+                    chunk = self.decoder.decode(b'', final=True)
+            elif not isinstance(chunk, str):
+                if self.decoder is None:
+                    self.decoder = codecs.getincrementaldecoder('utf-8')()
+                chunk = self.decoder.decode(chunk)
+            if chunk:
+                if self.mark is not None:
+                    # The text of the marked value read so far is set
+                    # aside, and joined once the value is complete.
+                    self.kept.append(self.buf[self.mark:self.pos])
+                    self.mark = 0
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        return False
+
+    def error(self, msg: Text) -> None:
+        raise json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def peek(self) -> Text:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, c: Text, msg: Text) -> None:
+        if self.peek() != c:
+            self.error(msg)
+        self.pos += 1
+
+    def end(self) -> None:
+        if self.peek() != '':
+            self.error("Extra data")
+
+    def string_end(self) -> int:
+        while True:
+            m = _STRING_END.match(self.buf, self.pos + 1)
+            if m is not None:
+                return m.end()
+            if not self.more():
+                self.error("Unterminated string starting at")
+
+    def string(self) -> Text:
+        self.string_end()
+        value, self.pos = scanstring(self.buf, self.pos + 1)
+        return value
+
+    def scalar(self) -> Any:
+        c = self.peek()
+        if c == '"':
+            return self.string()
+        while True:
+            end = _SCALAR.match(self.buf, self.pos).end()
+            if end < len(self.buf) or not self.more():
+                break
+        token = self.buf[self.pos:end]
+        if token in _CONSTANTS:
+            value = _CONSTANTS[token]
+        else:
+            m = _NUMBER.fullmatch(token)
+            if m is None:
+                self.error("Expecting value")
+            if m.group(1) is None and m.group(2) is None:
+                value = int(token)
+            else:
+                value = float(token)
+        self.pos = end
+        return value
+
+    def skip(self) -> None:
+        c = self.peek()
+        if c == '"':
+            self.pos = self.string_end()
+            return
+        if c not in ('{', '['):
+            self.scalar()
+            return
+        try:
+            _, self.pos = _skip_decode(self.buf, self.pos)
+            return
+        except json.JSONDecodeError:
+            if self.read is None:
+                raise
+        # The value does not fit in the buffer: step into it and skip its
+        # elements one by one, reading more chunks as needed.
+        self.pos += 1
+        while True:
+            c = self.peek()
+            if c in ('}', ']'):
+                self.pos += 1
+                return
+            if c in (',', ':'):
+                self.pos += 1
+            elif c == '':
+                self.error("Unexpected end of document")
+            else:
+                self.skip()
+
+    def value(self) -> Any:
+        c = self.peek()
+        if c not in ('{', '['):
+            return self.scalar()
+        try:
+            value, self.pos = _raw_decode(self.buf, self.pos)
+            return value
+        except json.JSONDecodeError:
+            if self.read is None:
+                raise
+        # The value does not fit in the buffer: its end is found by
+        # skipping it, then its whole text is decoded once.
+        self.mark = self.pos
+        try:
+            self.skip()
+            self.kept.append(self.buf[self.mark:self.pos])
+            value, _ = _raw_decode(''.join(self.kept))
+        finally:
+            self.mark = None
+            self.kept = []
+        return value
+
+    def build(self, shape: _Shape) -> Any:
+        c = self.peek()
+        if not shape.whole:
+            if c == '{' and shape.keys is not None:
+                return self.mapping(shape.keys)
+            if c == '[' and shape.items is not None:
+                return self.sequence(shape.items)
+            if shape.nothing():
+                self.skip()
+                return None
+            if shape.keys is None and shape.items is None                 \
+                    and c in ('{', '['):
+                self.skip()
+                return _PRESENT
+        return self.value()
+
+    def mapping(self, keys: t.Dict[Any, _Shape]) -> t.Dict[Any, Any]:
+        self.pos += 1
+        result = {}
+        if self.peek() == '}':
+            self.pos += 1
+            return result
+        while True:
+            if self.peek() != '"':
+                self.error("Expecting property name enclosed in double quotes")
+            key = self.string()
+            self.expect(':', "Expecting ':' delimiter")
+            shape = keys.get(key)
+            if shape is None:
+                self.skip()
+            else:
+                result[key] = self.build(shape)
+            c = self.peek()
+            self.pos += 1
+            if c == '}':
+                return result
+            if c != ',':
+                self.pos -= 1
+                self.error("Expecting ',' delimiter")
+
+    def items(self, shape: _Shape) -> t.Iterator[Any]:
+        self.pos += 1
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.build(shape)
+            c = self.peek()
+            self.pos += 1
+            if c == ']':
+                return
+            if c != ',':
+                self.pos -= 1
+                self.error("Expecting ',' delimiter")
+
+    def sequence(self, shape: _Shape) -> t.List[Any]:
+        return list(self.items(shape))
+
+
+def parse_json_events(doc: Union[Text, bytes, IO[str], IO[bytes]],
+                      decoder: Decoder[a],
+                      chunk_size: int = 65536) -> a:
+    '''
+    Decode the given json document with the given Decoder, building only
+    the parts of the document read by the Decoder.
+
+    The document is read by an incremental tokenizer. The keys that are
+    not looked up by a `field()` and the values that are not read are
+    skipped without being built, so memory and time depend on what the
+    Decoder reads rather than on the size of the document.
+
+    Raises:
+     DecodeError: if the Decoder fails. The values quoted by its messages
+        are pruned to the parts read by the Decoder.
+     ValueError: if the document is not valid json.
+
+    Args:
+        doc: The document to decode (string, bytes or file object).
+        decoder: The Decoder used to decode `doc`.
+        chunk_size: The size of the chunks read from a file object.
+
+    Returns:
+        The value yielded by `decoder`.
+    '''
+    reader = _JsonReader(doc, chunk_size)
+    value = reader.build(_shape_of(decoder))
+    reader.end()
+    r = decoder._decode((), value)
+    if isinstance(r, Status):
+        raise _error(r)
+    return r
+
+
+def iter_json_events(doc: Union[Text, bytes, IO[str], IO[bytes]],
+                     decoder: Decoder[a],
+                     chunk_size: int = 65536) -> t.Iterator[a]:
+    '''
+    Lazily decode the elements of a json document that is a list.
+
+    Each element is built (see `parse_json_events()`), decoded and yielded
+    as soon as it has been parsed.
+
+    Raises:
+     DecodeError: if the document is not a list or if the Decoder fails
+        on an element.
+
+    Args:
+        doc: The document to decode (string, bytes or file object).
+        decoder: The Decoder applied to every element of the list.
+        chunk_size: The size of the chunks read from a file object.
+
+    Returns:
+        An iterator over the values yielded by `decoder`.
+    '''
+    reader = _JsonReader(doc, chunk_size)
+    if reader.peek() != '[':
+        value = reader.value()
+        reader.end()
+        raise _error(StatusBadType((), "list", value))
+    for i, v in enumerate(reader.items(_shape_of(decoder))):
+        r = decoder._decode(((), i), v)
+        if isinstance(r, Status):
+            raise _error(r)
+        yield r
+    reader.end()
@@ -0,0 +1,218 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+from collections import OrderedDict, namedtuple
+
+import typing as t
+from typing import Any, Text, Union
+
+from .jazzml import Decoder, a, _decode_value
+from .backends import load_json, load_yaml
+
+
+FilePath = Union[Text, 'os.PathLike[str]']
+
+CacheInfo = namedtuple('CacheInfo',
+                       'hits misses disk_hits evictions maxsize currsize')
+CacheInfo.__doc__ = '''The statistics of a FileCache.
+
+- hits: the calls answered from memory.
+- misses: the calls that loaded and decoded the file.
+- disk_hits: the misses whose loaded document was read from the disk
+  cache instead of being parsed.
+- evictions: the entries dropped to stay within `maxsize`.
+'''
+
+
+class FileCache:
+    '''A cache of decoded yaml/json files, used by `parse_yaml_file()` and
+    `parse_json_file()`.
+
+    The entries are keyed by the file, its modification time and size (or
+    its content hash), the format, the backend and the Decoder: a modified
+    file is read again. The least recently used entries are evicted first.
+
+    The optional disk cache keeps the loaded documents (before decoding),
+    pickled and keyed by their content hash, so that another process reads
+    them without parsing them. Its files must only be writable by trusted
+    users: they are unpickled.
+
+    The files are read, not mapped in memory like by `parse_yaml()` and
+    `parse_json()`: a file truncated by a writer while it is mapped would
+    kill the process (SIGBUS) instead of failing.
+
+    The cached values are shared by the callers, they must not be modified.
+    A FileCache can be shared by several threads.
+    '''
+
+    def __init__(self, maxsize: int = 128,
+                 directory: t.Optional[FilePath] = None,
+                 check: Text = 'stat') -> None:
+        '''
+        Args:
+            maxsize: The maximum number of decoded files kept in memory.
+            directory: The directory of the disk cache, None for none.
+            check: How a modified file is detected: 'stat' compares its
+                modification time and size, 'hash' (slower, reads the
+                file) its content.
+        '''
+        if check not in ('stat', 'hash'):
+            raise ValueError("Unknown check '{c}', expected 'stat' or 'hash'"
+                             .format(c=check))
+        self.maxsize = maxsize
+        self.directory = directory
+        self.check = check
+        self._entries: 'OrderedDict[t.Tuple[Any, ...], Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._disk_hits = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        '''The statistics of the cache.'''
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._disk_hits,
+                             self._evictions, self.maxsize,
+                             len(self._entries))
+
+    def clear(self) -> None:
+        '''Drop the entries kept in memory and reset the statistics.'''
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._disk_hits = 0
+            self._evictions = 0
+
+    def get(self, path: FilePath, decoder: Decoder[a], fmt: Text,
+            backend: t.Optional[Text]) -> a:
+        '''The value of the file `path` decoded by `decoder`.'''
+        path = os.path.abspath(os.fspath(path))
+        content = None
+        if self.check == 'stat':
+            st = os.stat(path)
+            version: t.Tuple[Any, ...] = (st.st_dev, st.st_ino,
+                                          st.st_mtime_ns, st.st_size)
+        else:
+            content = _read(path)
+            version = (hashlib.sha256(content).hexdigest(),)
+        key = (path, version, fmt, backend, decoder)
+
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._misses += 1
+
+        if content is None:
+            content = _read(path)
+        document = self._load(content, fmt, backend)
+        value = _decode_value(decoder, document, 1)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def _load(self, content: Any, fmt: Text,
+              backend: t.Optional[Text]) -> Any:
+        '''Load a document, through the disk cache if any.'''
+        load = load_yaml if fmt == 'yaml' else load_json
+        if self.directory is None:
+            return load(content, backend)
+
+        digest = hashlib.sha256(content)
+        digest.update('\0{f}\0{b}'.format(f=fmt, b=backend).encode('utf-8'))
+        cached = os.path.join(self.directory,
+                              digest.hexdigest() + '.pickle')
+        try:
+            with open(cached, 'rb') as handle:
+                value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        else:
+            with self._lock:
+                self._disk_hits += 1
+            return value
+
+        value = load(content, backend)
+        os.makedirs(self.directory, exist_ok=True)
+        # Written then renamed: the other processes never read a partial
+        # file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cached)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return value
+
+
+def _read(path: Text) -> bytes:
+    with open(path, 'rb') as handle:
+        return handle.read()
+
+
+default_file_cache = FileCache()
+'''The FileCache used by default by `parse_yaml_file()` and
+`parse_json_file()`.'''
+
+
+def parse_yaml_file(path: FilePath, decoder: Decoder[a],
+                    backend: t.Optional[Text] = None,
+                    cache: t.Optional[FileCache] = None) -> a:
+    '''
+    Decode the given yaml file with the given Decoder, through a cache.
+
+    As long as the file is not modified, reading it again with the same
+    Decoder returns the cached value, without loading or decoding the file.
+
+    Raises:
+     DecodeError: if the Decoder fails. Failures are not cached.
+
+    Args:
+        path: The path of the yaml file.
+        decoder: The Decoder used to decode the file.
+        backend: The name of the yaml backend used to load the file.
+        cache: The FileCache to use, by default `default_file_cache`.
+
+    Returns:
+        The value yielded by `decoder`. It must not be modified.
+    '''
+    if cache is None:
+        cache = default_file_cache
+    return cache.get(path, decoder, 'yaml', backend)
+
+
+def parse_json_file(path: FilePath, decoder: Decoder[a],
+                    backend: t.Optional[Text] = None,
+                    cache: t.Optional[FileCache] = None) -> a:
+    '''
+    Decode the given json file with the given Decoder, through a cache.
+
+    See `parse_yaml_file()`.
+
+    Args:
+        path: The path of the json file.
+        decoder: The Decoder used to decode the file.
+        backend: The name of the json backend used to load the file.
+        cache: The FileCache to use, by default `default_file_cache`.
+
+    Returns:
+        The value yielded by `decoder`. It must not be modified.
+    '''
+    if cache is None:
+        cache = default_file_cache
+    return cache.get(path, decoder, 'json', backend)
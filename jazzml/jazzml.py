@@ -6,7 +6,11 @@ License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/.
 '''
 import datetime as dt
-from functools import partial
+import operator
+import os
+import re
+from array import array
+from functools import lru_cache, partial
 
 from typing import (Callable, TypeVar, Generic, Union,
                     IO, Any, Text, Type)
@@ -15,27 +19,127 @@ import typing as t
 
 import numbers
 
-import yaml
-import json
+from .backends import load_yaml, load_json
 
 a = TypeVar('a')
 b = TypeVar('b')
 
 
+# Decoding protocol
+# -----------------
+#
+# Internally, a decoding function `decode(path, value)` returns the decoded
+# value itself on success and an instance of a `Status` subclass on failure.
+# Successes are therefore free of any allocation. `StatusOk` only exists for
+# the public `Decoder.at()` interface.
+#
+# Failures are small `__slots__` records that keep the raw information and
+# only render their message when asked to.
+#
+# The location of the decoded value is an immutable linked path: the root
+# is `()` and `(parent, segment)` is the child `segment` (a key or a list
+# index) of `parent`. Pushing a segment never copies anything and the path
+# is only turned into a list when a failure is reported.
+
+Path = Any
+
+
+# The Profile recording the decodings of `Decoder.at()` and of the parse
+# functions, set by `profiling()`. The Decoders themselves are never
+# instrumented: None costs a single test per document.
+_profiler: Any = None
+
+
+def _path_to_list(path: Path) -> t.List[Any]:
+    '''Materialize a linked path into the list of its segments.'''
+    if isinstance(path, list):
+        return list(path)
+    segments = []
+    while path:
+        path, segment = path
+        segments.append(segment)
+    segments.reverse()
+    return segments
+
+
+def _path_of_list(segments: t.List[Any]) -> Path:
+    '''Build the linked path of a list of segments.'''
+    path: Path = ()
+    for segment in segments:
+        path = (path, segment)
+    return path
+
+
+def _describe(status: 'Status') -> Text:
+    '''The message reporting a failing Status.'''
+    return "{e} in path '{p}'".format(e=status.message(), p=status.path())
+
+
+def _error(status: 'Status') -> 'DecodeError':
+    '''The exception reporting a failing Status.'''
+    return DecodeError([status])
+
+
+class DecodeError(ValueError):
+    '''The failure of a Decoder on a document.
+
+    The failures are collected when the document is decoded with
+    `max_errors` greater than 1: the independent failures of the arguments
+    of `mapn`, `*` and `@` and of the elements of a `List` are reported,
+    but not the failures of the alternatives of a `one_of`.
+
+    The failures are collected in a single pass: the document is decoded
+    by functions that carry on after a failure, building the value of a
+    combinator only if all its parts are decoded. Every Decoder is run at
+    most once on a value. Those functions are slower than the regular
+    decoding (`compile()` and `record()` do not generate code for them);
+    the failures inside a `stackless()`, `ParallelList` or user defined
+    Decoder are not collected, only the first one is reported.
+
+    With the event driven parsers (`parse_json_events()`, ...), the values
+    quoted by the messages are pruned to the parts of the document read by
+    the Decoder.
+
+    Attributes:
+        errors: The failing Statuses, in the order of the document. Their
+            `path()` and `message()` describe the failures.
+        complete: False if the collection of the failures stopped at
+            `max_errors`.
+    '''
+
+    def __init__(self, errors: t.List['Status'],
+                 complete: bool = True) -> None:
+        if len(errors) == 1 and complete:
+            message = _describe(errors[0])
+        else:
+            message = "{n} errors{c}:\n{e}".format(
+                n=len(errors), c='' if complete else ' (at least)',
+                e='\n'.join(_describe(status) for status in errors))
+        super().__init__(message)
+        self.errors = errors
+        self.complete = complete
+
+    def __reduce__(self):
+        return (DecodeError, (self.errors, self.complete))
+
+
 class Status(Generic[a]):
 
-    _path: t.List[Text] = []
+    __slots__ = ('_path',)
 
     def message(self):
         return ""
 
-    def path(self):
-        return self._path
+    def path(self) -> t.List[Any]:
+        '''The keys and list indices leading to the failing value.'''
+        return _path_to_list(self._path)
 
 
 class StatusMissingField(Status[a]):
 
-    def __init__(self, path: t.List[Text], field: Text) -> None:
+    __slots__ = ('__field',)
+
+    def __init__(self, path: Path, field: Text) -> None:
         self._path = path
         self.__field = field
 
@@ -43,18 +147,37 @@ class StatusMissingField(Status[a]):
         return "Missing field: {f}".format(f=self.__field)
 
 
+class StatusUnknownField(Status[a]):
+
+    __slots__ = ('__field',)
+
+    def __init__(self, path: Path, field: Any) -> None:
+        self._path = path
+        self.__field = field
+
+    def message(self):
+        return "Unknown field: {f}".format(f=self.__field)
+
+
 class StatusOk(Status[a]):
 
+    __slots__ = ('value',)
+
     def __init__(self: 'StatusOk[a]', value: a) -> None:
         self.value = value
 
     def message(self):
         return "Success"
 
+    def path(self):
+        return []
+
 
 class StatusBadType(Status[a]):
 
-    def __init__(self, path: t.List[Text],
+    __slots__ = ('__expected_type', '__actual_value')
+
+    def __init__(self, path: Path,
                  expected_type: Type,
                  actual_value: a) -> None:
         self._path = path
@@ -68,29 +191,69 @@ class StatusBadType(Status[a]):
 
 class StatusBadValue(Status[a]):
 
+    __slots__ = ('__received', '__expected')
+
     def __init__(self: 'StatusBadValue[A]',
-                 path: t.List[Text],
+                 path: Path,
                  received: str,
                  expected: str) -> None:
         self._path = path
-        self.__msg = f'Expected: {expected} but got {received}'
+        self.__received = received
+        self.__expected = expected
 
     def message(self: 'StatusBadValue[A]') -> str:
-        return self.__msg
+        return f'Expected: {self.__expected} but got {self.__received}'
 
 
 class StatusOneOfNoDecoder(Status[a]):
 
-    def __init__(self, path: t.List[Text]) -> None:
+    __slots__ = ()
+
+    def __init__(self, path: Path) -> None:
         self._path = path
 
     def message(self):
         return "one_of: no valid decoder found"
 
 
+class StatusUnknownTag(StatusOneOfNoDecoder[a]):
+
+    __slots__ = ('__field', '__tag')
+
+    def __init__(self, path: Path, field: Text, tag: Any) -> None:
+        self._path = path
+        self.__field = field
+        self.__tag = tag
+
+    def message(self):
+        return "Unknown tag: no decoder for value '{t}' of field '{f}'"     \
+               .format(t=self.__tag, f=self.__field)
+
+
+class StatusTagFailed(StatusOneOfNoDecoder[a]):
+    '''The failure of the decoder selected by a tag. The path is the
+    one of the failure of that decoder.'''
+
+    __slots__ = ('__field', '__tag', '__status')
+
+    def __init__(self, path: Path, field: Text, tag: Any,
+                 status: Status) -> None:
+        self._path = path
+        self.__field = field
+        self.__tag = tag
+        self.__status = status
+
+    def message(self):
+        return "Decoder for value '{t}' of field '{f}' failed: {e}"         \
+               .format(t=self.__tag, f=self.__field,
+                       e=self.__status.message())
+
+
 class StatusNok(Status[a]):
 
-    def __init__(self, path: t.List[Text], msg: Text) -> None:
+    __slots__ = ('__msg',)
+
+    def __init__(self, path: Path, msg: Text) -> None:
         self._path = path
         self.__msg = msg
 
@@ -103,9 +266,43 @@ class Decoder(Generic[a]):
     '''
 
     def __init__(self: 'Decoder[a]',
-                 f: Callable[[t.List[str], Any], Status[a]]):
+                 f: Callable[[t.List[str], Any], Status[a]],
+                 spec: t.Optional[t.Tuple[Any, ...]] = None):
+        '''
+        Args:
+            f: The decoding function. It receives the path of the value,
+                as a new list of keys and list indices, and the value. It
+                returns a `StatusOk` on success and another `Status` on
+                failure.
+            spec: An optional description of the combinator that built
+                `f`, as a tuple `(kind, *arguments)`. It is used by
+                `compile()` to inspect the Decoder tree.
+
+        A Decoder can be pickled, and sent to another process, as long as
+        the functions and values it has been built with can be pickled.
+        '''
+        def decode(path, value):
+            # The combinators share an immutable linked path: the list
+            # given to `f` is its own.
+            r = f(_path_to_list(path), value)
+            if type(r) is StatusOk:
+                return r.value
+            else:
+                return r
 
-        self.__unDecode = f
+        self._decode = decode
+        self._spec = spec if spec is not None else ('custom', f)
+
+    @classmethod
+    def _raw(cls, decode: Callable[[Any, Any], Any],
+             spec: t.Optional[t.Tuple[Any, ...]]) -> 'Decoder[a]':
+        '''Wrap a function following the internal decoding protocol:
+        it returns the decoded value itself or a failing `Status`.
+        '''
+        decoder = cls.__new__(cls)
+        decoder._decode = decode
+        decoder._spec = spec
+        return decoder
 
     def at(self: 'Decoder[a]', path: t.List[str], value: Any) -> Status[a]:
         '''Apply `self` to a path and dictionary.
@@ -115,7 +312,55 @@ class Decoder(Generic[a]):
             path: The current path in the document.
             value: The value to decode.
         '''
-        return self.__unDecode(path, value)
+        if isinstance(path, list):
+            path = _path_of_list(path)
+        if _profiler is None:
+            r = self._decode(path, value)
+        else:
+            r = _profiler.decoding(self)(path, value)
+        if isinstance(r, Status):
+            return r
+        else:
+            return StatusOk(r)
+
+    def check(self: 'Decoder[a]', value: Any) -> Status[None]:
+        '''Check that `self` accepts `value`, without decoding it.
+
+        See `validate()`.
+
+        Args:
+            self: The Decoder that must accept `value`.
+            value: The value to check.
+
+        Returns:
+            A `StatusOk` holding None if `value` is accepted, the failing
+            `Status` otherwise.
+        '''
+        from .validate import _check
+        return _check(self, value)
+
+    def named(self: 'Decoder[a]', name: Text) -> 'Decoder[a]':
+        '''A copy of `self` named `name`, as reported by `profiling()`.
+
+        The copy decodes like `self`, at the same cost: the name is only
+        read when profiling.
+
+        Args:
+            self: The Decoder to name.
+            name: Its name, for instance 'order.items'.
+        '''
+        decoder = Decoder._raw(self._decode, self._spec)
+        decoder.__dict__.update(self.__dict__)
+        decoder._name = name
+        if '_unnamed' not in self.__dict__:
+            decoder._unnamed = self
+        return decoder
+
+    def __reduce__(self):
+        '''Pickle a Decoder as the call to the combinator that built it.'''
+        if '_name' in self.__dict__:
+            return (Decoder.named, (self._unnamed, self._name))
+        return _reduce(self._spec)
 
     def __mul__(self: 'Decoder[Callable[[a], b]]',
                 decoder: 'Decoder[a]') -> 'Decoder[b]':
@@ -126,22 +371,20 @@ class Decoder(Generic[a]):
         - Partially apply `f` to the value returned by `decoder`.
             That partial application returns a function `g`.
 
+        A chain `succeed(f) * d1 * ... * dn` is built as a single node
+        that decodes its n arguments and partially applies `f` once.
+
         Args:
             self: A Decoder that must return a function.
             decoder: The Decoder that yields the next argument to `f`.
 
         '''
-        def decode(path, dic):
-            rf = self.at(path, dic)
-            if type(rf) is StatusOk:
-                ra = decoder.at(path, dic)
-                if isinstance(ra, StatusOk):
-                    return StatusOk(partial(rf.value, ra.value))
-                else:
-                    return ra
-            else:
-                return rf
-        return Decoder(decode)
+        fdec, args = _ap_chain(self)
+        args = args + (decoder,)
+        result = Decoder._raw(_ap_decode(fdec, args, False),
+                              ('ap', self, decoder))
+        result._chain = (fdec, args)
+        return result
 
     def __matmul__(self: 'Decoder[Callable[[a], b]]',
                    decoder: 'Decoder[a]') -> 'Decoder[b]':
@@ -153,19 +396,17 @@ class Decoder(Generic[a]):
             That partial application returns a function `g`.
         - Call `g()`
 
+        A chain `succeed(f) * d1 * ... @ dn` is built as a single node
+        equivalent to `mapn(f, d1, ..., dn)`.
+
         Args:
             self: A Decoder that must return a function `f`.
             decoder: The Decoder that yields the next argument to `f`.
 
         '''
-
-        def decode(path, dic):
-            rf = self.__mul__(decoder).at(path, dic)
-            if type(rf) is StatusOk:
-                return StatusOk(rf.value())
-            else:
-                return rf
-        return Decoder(decode)
+        fdec, args = _ap_chain(self)
+        return Decoder._raw(_ap_decode(fdec, args + (decoder,), True),
+                            ('ap_call', self, decoder))
 
     def then(self: 'Decoder[a]',
              f: Callable[[a], 'Decoder[b]']) -> 'Decoder[b]':
@@ -178,14 +419,59 @@ class Decoder(Generic[a]):
             f: A function that takes a value and returns a new Decoder.
 
         '''
+        decode_first = self._decode
+
         def decode(path, dic):
-            ra = self.at(path, dic)
-            if type(ra) is StatusOk:
-                return f(ra.value).at(path, dic)
-            else:
+            ra = decode_first(path, dic)
+            if isinstance(ra, Status):
                 return ra
+            return f(ra)._decode(path, dic)
 
-        return Decoder(decode)
+        return Decoder._raw(decode, ('then', self, f))
+
+
+def _ap_chain(decoder: Decoder[Any]
+              ) -> t.Tuple[Decoder[Any], t.Tuple[Decoder[Any], ...]]:
+    '''The Decoder of the function and the Decoders of the arguments of
+    the chain of `*` ending with `decoder`.'''
+    return getattr(decoder, '_chain', None) or (decoder, ())
+
+
+def _ap_decode(fdec: Decoder[Any], args: t.Tuple[Decoder[Any], ...],
+               call: bool) -> Callable[[Any, Any], Any]:
+    '''The decoding function of a chain of `*`, ending with `@` if
+    `call`: the function yielded by `fdec` is applied once to the values
+    yielded by `args`.'''
+    decode_args = [d._decode for d in args]
+
+    if call and fdec._spec[0] == 'succeed':
+        # The usual chain, equivalent to mapn(f, *args).
+        f = fdec._spec[1]
+
+        def decode(path, dic):
+            ras = []
+            for decode_arg in decode_args:
+                ra = decode_arg(path, dic)
+                if isinstance(ra, Status):
+                    return ra
+                ras.append(ra)
+            return f(*ras)
+    else:
+        decode_f = fdec._decode
+
+        def decode(path, dic):
+            rf = decode_f(path, dic)
+            if isinstance(rf, Status):
+                return rf
+            ras = []
+            for decode_arg in decode_args:
+                ra = decode_arg(path, dic)
+                if isinstance(ra, Status):
+                    return ra
+                ras.append(ra)
+            return rf(*ras) if call else partial(rf, *ras)
+
+    return decode
 
 
 def fail(msg: Text) -> Decoder[Any]:
@@ -199,7 +485,7 @@ def fail(msg: Text) -> Decoder[Any]:
     def decode(path, dic):
         return StatusNok(path, msg)
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('fail', msg))
 
 
 def succeed(v: a) -> Decoder[a]:
@@ -211,121 +497,266 @@ def succeed(v: a) -> Decoder[a]:
     '''
 
     def decode(path, dic):
-        return StatusOk(v)
+        return v
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('succeed', v))
 
 
 
 def this_str(expected: str) -> Decoder[str]:
 
-    def decode(path: t.List[str], v: Any) -> Status[str]:
+    def decode(path: t.List[str], v: Any) -> Any:
         if isinstance(v, str):
             if v == expected:
-                return StatusOk(v)
+                return v
             else:
                 return StatusBadValue(path, expected, v)
         else:
             return StatusBadType(path, str, v)
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('this_str', expected))
+
 
+def date(the_format: str = '%d-%m-%Y',
+         cache: int = 0) -> Decoder[dt.datetime]:
+    '''Decode a json/yaml string into a datetime, as
+    `datetime.strptime(value, the_format)` does.
 
-def date(the_format: str = '%d-%m-%Y') -> Decoder[dt.datetime]:
+    The format is compiled once into a parser. The formats made of `%Y`,
+    `%m`, `%d`, `%H`, `%M`, `%S` and literal characters (like '%d-%m-%Y' or
+    '%Y-%m-%dT%H:%M:%S') read the fields at fixed positions and build the
+    datetime with `datetime.fromisoformat()`, which is several times
+    faster. The other formats, and the values those fixed positions do not
+    fit, are parsed by `strptime`.
+
+    Args:
+        the_format: The format of the dates, see `datetime.strptime`.
+        cache: The number of distinct strings whose datetime is kept, 0
+            (the default) for none. Useful when the same dates are
+            repeated, as in logs.
+    '''
+    parse = _date_parser(the_format)
+    if cache:
+        parse = lru_cache(maxsize=cache)(parse)
 
-    def decode(path: t.List[str], v: Any) -> Status[dt.datetime]:
+    def decode(path: t.List[str], v: Any) -> Any:
         if isinstance(v, str):
             try:
-                return StatusOk(dt.datetime.strptime(v, the_format))
+                return parse(v)
             # pylint: disable = Catching too general exception Exception  (broad-exception-caught)
             except Exception:
                 return StatusBadType(path, str, v)
         else:
             return StatusBadType(path, str, v)
 
-    return Decoder(decode)
+    decoder = Decoder._raw(decode, ('date', the_format, cache))
+    decoder._parse = parse
+    return decoder
+
+
+# The fixed width directives of `strptime`, their width and their default
+# value, in the order of an ISO 8601 date.
+_DATE_FIELDS = {'%Y': (4, '1900'), '%m': (2, '01'), '%d': (2, '01'),
+                '%H': (2, '00'), '%M': (2, '00'), '%S': (2, '00')}
+
+_ISO_FORMAT = re.compile(r'%Y-%m-%d([^%]%H(:%M(:%S)?)?)?')
+
+
+def _date_parser(the_format: str) -> Callable[[str], dt.datetime]:
+    '''A function parsing the strings that follow `the_format` like
+    `datetime.strptime` does, raising a ValueError on failure.
 
-def parse_yaml(doc: Union[str, IO[str]], decoder: Decoder[a]) -> a:
+    For the formats made only of fixed width fields and literal
+    characters, the fields are moved to an ISO 8601 string parsed by
+    `fromisoformat`, which only accepts ASCII digits in them: strptime is
+    only called if it fails, with the same outcome.
+    '''
+    strptime = dt.datetime.strptime
+    positions: t.Dict[str, int] = {}
+    literals = []
+    i = n = 0
+    while i < len(the_format):
+        c = the_format[i]
+        if c == '%':
+            directive = the_format[i:i + 2]
+            if directive == '%%':
+                literals.append((n, '%'))
+                n += 1
+            elif directive in _DATE_FIELDS and directive not in positions:
+                positions[directive] = n
+                n += _DATE_FIELDS[directive][0]
+            else:
+                return partial(_strptime, the_format)
+            i += 2
+        else:
+            literals.append((n, c))
+            n += 1
+            i += 1
+
+    if _ISO_FORMAT.fullmatch(the_format):
+        # Already an ISO 8601 string.
+        iso = 's'
+    else:
+        parts = []
+        for directive, (width, default) in _DATE_FIELDS.items():
+            if directive in ('%H', '%M', '%S') and not (
+                    positions.keys() & {'%H', '%M', '%S'}):
+                break
+            parts.append({'%m': "'-'", '%d': "'-'", '%H': "'T'",
+                          '%M': "':'", '%S': "':'"}.get(directive, ''))
+            if directive in positions:
+                p = positions[directive]
+                parts.append('s[{a}:{b}]'.format(a=p, b=p + width))
+            else:
+                parts.append(repr(default))
+        iso = ' + '.join(part for part in parts if part)
+
+    tests = ['len(s) == {n}'.format(n=n)] + [
+        's[{p}] == {c!r}'.format(p=p, c=c) for p, c in literals]
+    if '%H' in positions:
+        # Accepted by recent versions of fromisoformat, not by strptime.
+        p = positions['%H']
+        tests.append("s[{a}:{b}] != '24'".format(a=p, b=p + 2))
+    source = (
+        'def parse(s):\n'
+        '    if {tests}:\n'
+        '        try:\n'
+        '            return fromisoformat({iso})\n'
+        '        except ValueError:\n'
+        '            pass\n'
+        '    return strptime(s, the_format)\n'
+        .format(tests=' and '.join(tests), iso=iso))
+    namespace = {'fromisoformat': dt.datetime.fromisoformat,
+                 'strptime': strptime, 'the_format': the_format}
+    exec(source, namespace)
+    return namespace['parse']
+
+
+def _strptime(the_format: str, s: str) -> dt.datetime:
+    return dt.datetime.strptime(s, the_format)
+
+
+def parse_yaml(doc: Union[str, bytes, IO[str], IO[bytes], memoryview,
+                          'os.PathLike[str]'],
+               decoder: Decoder[a],
+               backend: t.Optional[Text] = None,
+               max_errors: t.Optional[int] = 1) -> a:
     '''
     Decode the given yaml document with the given Decoder.
 
     Raises:
-     ValueError: if the Decoder fails.
+     DecodeError: if the Decoder fails.
 
     Args:
-        doc: The document to decode.
+        doc: The document to decode: a string, bytes, a file, a buffer
+            (memoryview, bytearray, mmap) or the path (os.PathLike, e.g.
+            pathlib.Path) of a file. Files are mapped in memory and
+            buffers are read by chunks, without a copy of the whole
+            document.
         decoder: The Decoder used to decode `doc`.
+        backend: The name of the yaml backend used to load `doc`. By
+            default, the one chosen with `set_yaml_backend()` or the
+            fastest available one.
+        max_errors: The maximum number of failures reported when the
+            Decoder fails (at least 1), None for all of them. Above 1,
+            decoding is slower: see `DecodeError`.
 
     Returns:
         The value yielded by `decoder`.
     '''
-    dic = yaml.load(doc, Loader=yaml.FullLoader)
-    r = decoder.at([], dic)
-    if isinstance(r, StatusOk):
-        return r.value
-    else:
-        raise ValueError("{e} in path '{p}'".format(e=r.message(), p=r.path))
+    dic = load_yaml(doc, backend)
+    return _decode_value(decoder, dic, max_errors)
 
 
-def parse_json(str, decoder: Decoder[a]) -> a:
+def parse_json(str: Union[Text, bytes, memoryview, 'os.PathLike[str]'],
+               decoder: Decoder[a],
+               backend: t.Optional[Text] = None,
+               max_errors: t.Optional[int] = 1) -> a:
     '''
     Decode the given json document with the given Decoder.
 
-    Raise a ValueError if the Decoder fails.
+    Raise a DecodeError (a ValueError) if the Decoder fails.
 
     Args:
-        doc: The document to decode (string).
+        doc: The document to decode: a string, bytes, a buffer
+            (memoryview, bytearray, mmap) or the path (os.PathLike, e.g.
+            pathlib.Path) of a file. Files are mapped in memory. The
+            backends that accept buffers (orjson) read them without a
+            copy, the others are given the decoded string.
         decoder: The Decoder used to decode `doc`.
+        backend: The name of the json backend used to load `doc`. By
+            default, the one chosen with `set_json_backend()` or the
+            fastest available one.
+        max_errors: The maximum number of failures reported when the
+            Decoder fails (at least 1), None for all of them. Above 1,
+            decoding is slower: see `DecodeError`.
 
     Returns:
         The value yielded by `decoder`.
     '''
-    dic = json.loads(str)
-    r = decoder.at([], dic)
-    if isinstance(r, StatusOk):
-        return r.value
+    dic = load_json(str, backend)
+    return _decode_value(decoder, dic, max_errors)
+
+
+def _decode_value(decoder: Decoder[a], value: Any,
+                  max_errors: t.Optional[int]) -> a:
+    '''Decode a loaded document, raising a DecodeError on failure.'''
+    if max_errors is not None and max_errors < 1:
+        raise ValueError('max_errors must be at least 1 or None, not {n}'
+                         .format(n=max_errors))
+    if max_errors != 1:
+        from .validate import _collect_decode
+        r, errors, complete = _collect_decode(decoder, value, max_errors)
+        if errors:
+            raise DecodeError(errors, complete)
+        return r
+    if _profiler is None:
+        r = decoder._decode((), value)
     else:
-        raise ValueError("{e} in path '{p}'".format(e=r.message(), p=r.path))
+        r = _profiler.decoding(decoder)((), value)
+    if isinstance(r, Status):
+        raise DecodeError([r])
+    return r
 
 
 def __decode_int(path, v):
     if type(v) is int:
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'int', v)
 
 
 def __decode_str(path, v):
     if type(v) is str:
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'str', v)
 
 
 def __decode_bool(path, v):
     if type(v) is bool:
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'bool', v)
 
 
 def __decode_float(path, v):
     if isinstance(v, (float, int)):
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'float', v)
 
 
 def __decode_real(path, v):
     if isinstance(v, numbers.Real):
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'real', v)
 
 
 def __decode_null(path, v):
     if v is None:
-        return StatusOk(v)
+        return v
     else:
         return StatusBadType(path, 'None', v)
 
@@ -342,13 +773,15 @@ def nullable(decoder: Decoder[a], default: a) -> Decoder[a]:
         decoder: The Decoder to apply if the value to decode is not null.
         default: The value returned if the value to decode is null.
     '''
+    decode_value = decoder._decode
+
     def decode(path, dic):
         if dic is None:
-            return StatusOk(default)
+            return default
         else:
-            return decoder.at(path, dic)
+            return decode_value(path, dic)
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('nullable', decoder, default))
 
 
 def null(value: a) -> Decoder[a]:
@@ -362,11 +795,11 @@ def null(value: a) -> Decoder[a]:
     '''
     def decode(path, dic):
         if dic is None:
-            return StatusOk(value)
+            return value
         else:
             return StatusBadType(path, 'Null', value)
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('null', value))
 
 
 def field(field_name: Text, decoder: Decoder[a]) -> Decoder[a]:
@@ -381,15 +814,15 @@ def field(field_name: Text, decoder: Decoder[a]) -> Decoder[a]:
     Returns:
         The value returned by `decoder`.
     '''
+    decode_value = decoder._decode
+
     def decode(path, dic):
         if field_name in dic:
-            v = dic[field_name]
-            path.append(field_name)
-            return decoder.at(path, v)
+            return decode_value((path, field_name), dic[field_name])
         else:
             return StatusMissingField(path, field_name)
 
-    return Decoder(decode)
+    return Decoder._raw(decode, ('field', field_name, decoder))
 
 
 def optional_field(field_name: Text, decoder: Decoder[a],
@@ -405,42 +838,92 @@ def optional_field(field_name: Text, decoder: Decoder[a],
         decoder: The Decoder to decode the field value.
         default: The value to return if the field does not exist.
     '''
+    decode_value = decoder._decode
 
     def decode(path, dic):
         if field_name in dic:
-            v = dic[field_name]
-            path.append(field_name)
-            return decoder.at(path, v)
+            return decode_value((path, field_name), dic[field_name])
         else:
-            return StatusOk(default)
+            return default
+
+    return Decoder._raw(decode,
+                        ('optional_field', field_name, decoder, default))
+
 
-    return Decoder(decode)
+# The type tests of the primitive Decoders, applied once to every distinct
+# type of a list of values instead of once to every value.
+_TYPE_CHECKS: t.Dict[Text, Callable[[type], bool]] = {
+    'int': lambda ty: ty is int,
+    'str': lambda ty: ty is str,
+    'bool': lambda ty: ty is bool,
+    'float': lambda ty: issubclass(ty, (float, int)),
+    'real': lambda ty: issubclass(ty, numbers.Real),
+    'noop': lambda ty: True,
+}
 
 
-def List(decoder: Decoder[a]) -> Decoder[t.List[a]]:
+def List(decoder: Decoder[a],
+         typecode: t.Optional[str] = None) -> Decoder[t.List[a]]:
     '''Decode a list of values into a python list.
 
     The given decoder is used to decode the elements of the list.
 
+    The lists of values decoded by a primitive Decoder (`Int`, `Str`,
+    `Bool`, `Float`, `Real`, `noop`) are checked in a single pass and,
+    when valid, returned as is, without a copy.
+
     Raise a ValueError if the Decoder fails on any element of the list.
 
     Args:
         decoder: The Decoder to decode the elements of the list .
+        typecode: If given, the decoded values are returned in an
+            `array.array` of that type code (e.g. 'q' or 'd'). Fails on the
+            first value that does not fit.
     '''
+    decode_item = decoder._decode
+    check = _TYPE_CHECKS.get(decoder._spec[0])
 
     def decode(path, l):
         if type(l) is list:
             rl = []
-            for ra in map(partial(decoder.at, path), l):
-                if type(ra) is StatusOk:
-                    rl.append(ra.value)
-                else:
+            for i, v in enumerate(l):
+                ra = decode_item((path, i), v)
+                if isinstance(ra, Status):
                     return ra
-            return StatusOk(rl)
+                rl.append(ra)
+            return rl
         else:
             return StatusBadType(path, "list", l)
 
-    return Decoder(decode)
+    if check is not None:
+        decode_each = decode
+
+        def decode(path, l):
+            if type(l) is list and all(check(ty)
+                                       for ty in set(map(type, l))):
+                return l
+            # Report the first bad element.
+            return decode_each(path, l)
+
+    if typecode is None:
+        return Decoder._raw(decode, ('list', decoder))
+
+    def decode_array(path, l):
+        rl = decode(path, l)
+        if isinstance(rl, Status):
+            return rl
+        try:
+            return array(typecode, rl)
+        except (OverflowError, TypeError):
+            expected = "array('{c}') item".format(c=typecode)
+            for i, v in enumerate(rl):
+                try:
+                    array(typecode, [v])
+                except (OverflowError, TypeError):
+                    return StatusBadType((path, i), expected, v)
+            raise
+
+    return Decoder._raw(decode_array, ('list', decoder, typecode))
 
 
 def one_of(decoders: t.List[Decoder[a]]) -> Decoder[a]:
@@ -452,33 +935,163 @@ def one_of(decoders: t.List[Decoder[a]]) -> Decoder[a]:
     Args:
         decoders: A list of Decoders.
     '''
+    decode = _one_of_decode([d._decode for d in decoders],
+                            [_tag_of(d) for d in decoders])
+
+    return Decoder._raw(decode, ('one_of', tuple(decoders)))
+
+
+def _tag_of(decoder: Decoder) -> t.Optional[t.Tuple[Any, str]]:
+    '''The tag `(field_name, value)` if `decoder` starts by reading
+    `field(field_name, this_str(value))`, that is, if it fails whenever
+    that field does not hold that string.
+    '''
+    spec = decoder._spec
+    kind = spec[0]
+    if kind == 'field' and spec[2]._spec[0] == 'this_str':
+        return (spec[1], spec[2]._spec[1])
+    if kind == 'mapn':
+        return _tag_of(spec[2][0]) if spec[2] else None
+    if kind == 'record':
+        for name, d, default in _record_slots(spec[2]):
+            if default is _REQUIRED and d._spec[0] == 'this_str':
+                return (name, d._spec[1])
+        return None
+    if kind in ('then', 'compiled'):
+        return _tag_of(spec[1])
+    if kind in ('ap', 'ap_call'):
+        if spec[1]._spec[0] == 'succeed':
+            return _tag_of(spec[2])
+        return _tag_of(spec[1])
+    return None
+
+
+def _one_of_decode(decode_alternatives: t.List[Callable[[Any, Any], Any]],
+                   tags: t.List[t.Optional[t.Tuple[Any, str]]]
+                   ) -> Callable[[Any, Any], Any]:
+    '''The decoding function of `one_of()`.
+
+    When at least two alternatives are tagged on the same field, the value
+    of that field selects, through a dictionary, the alternatives worth
+    trying: the untagged ones and the ones with that tag, in their
+    original order. The others would fail anyway.
+    '''
+    def decode_sequence(path, dic, alternatives=decode_alternatives):
+        for decode_alternative in alternatives:
+            ra = decode_alternative(path, dic)
+            if not isinstance(ra, Status):
+                return ra
+        return StatusOneOfNoDecoder(path)
+
+    dispatch = _one_of_table(decode_alternatives, tags)
+    if dispatch is None:
+        return decode_sequence
+
+    field_name, table, untagged = dispatch
+
     def decode(path, dic):
-        for decoder in decoders:
-            ra = decoder.at(path, dic)
-            if type(ra) is StatusOk:
+        if type(dic) is not dict:
+            return decode_sequence(path, dic)
+        tag = dic.get(field_name)
+        if isinstance(tag, str) and tag in table:
+            alternatives = table[tag]
+            if len(alternatives) == 1:
+                ra = alternatives[0](path, dic)
+                if isinstance(ra, Status):
+                    return StatusTagFailed(ra._path, field_name, tag, ra)
                 return ra
+            return decode_sequence(path, dic, alternatives)
+        if untagged:
+            return decode_sequence(path, dic, untagged)
+        if field_name in dic:
+            return StatusUnknownTag(path, field_name, tag)
         return StatusOneOfNoDecoder(path)
 
-    return Decoder(decode)
+    return decode
 
 
-Int: Decoder[int] = Decoder(__decode_int)
+def _one_of_table(alternatives: t.List[b],
+                  tags: t.List[t.Optional[t.Tuple[Any, str]]]
+                  ) -> t.Optional[t.Tuple[Any, t.Dict[str, t.List[b]],
+                                          t.List[b]]]:
+    '''The dispatch table of `one_of()`: the tagged field, the alternatives
+    worth trying by tag and the untagged alternatives. None if the
+    alternatives are not tagged on a single field.
+    '''
+    fields = {tag[0] for tag in tags if tag is not None}
+    if len(fields) != 1 or sum(tag is not None for tag in tags) < 2:
+        return None
+
+    untagged = [d for d, tag in zip(alternatives, tags) if tag is None]
+    table = {}
+    for tag in tags:
+        if tag is not None and tag[1] not in table:
+            table[tag[1]] = [d for d, other in zip(alternatives, tags)
+                             if other is None or other[1] == tag[1]]
+    return fields.pop(), table, untagged
+
+
+def tagged(field_name: Text,
+           decoders: t.Dict[Any, Decoder[a]]) -> Decoder[a]:
+    '''Creates a Decoder that reads the field `field_name` of a json/yaml
+    object and applies the Decoder associated to its value.
+
+    The Decoder is selected through a dictionary, whatever the number of
+    Decoders. It is applied to the whole object.
+
+    Fails if the field does not exist, if its value is not a key of
+    `decoders` or if the selected Decoder fails.
+
+    Args:
+        field_name: The name of the field holding the tag.
+        decoders: The Decoders, by tag.
+    '''
+    decode = _tagged_decode(field_name,
+                            {tag: d._decode for tag, d in decoders.items()})
+
+    return Decoder._raw(decode, ('tagged', field_name, dict(decoders)))
+
+
+def _tagged_decode(field_name: Text,
+                   table: t.Dict[Any, Callable[[Any, Any], Any]]
+                   ) -> Callable[[Any, Any], Any]:
+    '''The decoding function of `tagged()`.'''
+    def decode(path, dic):
+        if field_name in dic:
+            tag = dic[field_name]
+            try:
+                decode_tagged = table.get(tag)
+            except TypeError:
+                decode_tagged = None
+            if decode_tagged is None:
+                return StatusUnknownTag(path, field_name, tag)
+            r = decode_tagged(path, dic)
+            if isinstance(r, Status):
+                return StatusTagFailed(r._path, field_name, tag, r)
+            return r
+        else:
+            return StatusMissingField(path, field_name)
+
+    return decode
+
+
+Int: Decoder[int] = Decoder._raw(__decode_int, ('int',))
 ''' Decode a json/yaml integer into an int.
 '''
 
-Str: Decoder[str] = Decoder(__decode_str)
+Str: Decoder[str] = Decoder._raw(__decode_str, ('str',))
 ''' Decode a json/yaml string into a str.
 '''
 
-Bool: Decoder[bool] = Decoder(__decode_bool)
+Bool: Decoder[bool] = Decoder._raw(__decode_bool, ('bool',))
 ''' Decode a json/yaml boolean into a bool.
 '''
 
-Float: Decoder[float] = Decoder(__decode_float)
+Float: Decoder[float] = Decoder._raw(__decode_float, ('float',))
 ''' Decode a json/yaml float into a float.
 '''
 
-Real: Decoder[numbers.Real] = Decoder(__decode_real)
+Real: Decoder[numbers.Real] = Decoder._raw(__decode_real, ('real',))
 ''' Decode a json/yaml number into a float or an int.
 '''
 
@@ -492,20 +1105,161 @@ def mapn(f: Callable[..., a], *decoders: Decoder) -> Decoder[a]:
         f: A function with as many arguments as the number of Decoders.
         *decoders: Decoders to be applied in sequence.
     '''
+    decode_args = [d._decode for d in decoders]
+
     def decode(path, dic):
         ras = []
-        for decoder in decoders:
-            ra = decoder.at(path, dic)
-            if type(ra) is StatusOk:
-                ras.append(ra.value)
-            else:
+        for decode_arg in decode_args:
+            ra = decode_arg(path, dic)
+            if isinstance(ra, Status):
                 return ra
-        return StatusOk(f(*ras))
+            ras.append(ra)
+        return f(*ras)
+
+    return Decoder._raw(decode, ('mapn', f, decoders))
 
-    return Decoder(decode)
 
+def record(mk: Callable[..., a],
+           fields: t.Optional[t.Dict[Any, Any]] = None, /, *,
+           strict: bool = False, **decoders: Any) -> Decoder[a]:
+    '''Creates a Decoder that reads the fields of a json/yaml object and
+    passes their decoded values, in order, to `mk`::
 
-noop: Decoder[Any] = Decoder(lambda path, dic: StatusOk(dic))
+        record(Point, x=Int, y=Int, label=(Str, ''))
+
+    is equivalent to::
+
+        mapn(Point, field('x', Int), field('y', Int),
+             optional_field('label', Str, ''))
+
+    but faster: the function decoding the fields is generated once, with
+    a single lookup by field, the checks of `Int`, `Str`, `Bool` and
+    `Float` inlined and without a Decoder node by field. The Decoder of a
+    field is either a Decoder, for a required field, or a pair
+    `(Decoder, default)` for an optional one.
+
+    Fails if the value is not an object, on the first field (in the given
+    order) that is missing or that its Decoder rejects and, if `strict`,
+    if the object has other fields. That check only compares the number
+    of fields read with the size of the object.
+
+    Args:
+        mk: The function building the record.
+        fields: The Decoders of the fields, by field name, for the names
+            that are not python identifiers (or are 'strict').
+        strict: If True, reject the fields that are not in `fields` or
+            `decoders`.
+        **decoders: The Decoders of the fields, by field name.
+    '''
+    return _record(mk, dict(fields or {}, **decoders), strict)
+
+
+# The default of the required fields of a `record`.
+_REQUIRED: Any = object()
+
+
+def _record_slots(fields: t.Dict[Any, Any]
+                  ) -> t.List[t.Tuple[Any, Decoder[Any], Any]]:
+    '''The fields of a `record` as triples (name, Decoder, default),
+    the default being `_REQUIRED` for the required fields.'''
+    return [(name, d[0], d[1]) if isinstance(d, tuple)
+            else (name, d, _REQUIRED) for name, d in fields.items()]
+
+
+# The checks of the primitive Decoders inlined by `record`.
+_INLINE_CHECKS = {'int': 'type({v}) is not int',
+                  'str': 'type({v}) is not str',
+                  'bool': 'type({v}) is not bool',
+                  'float': 'not isinstance({v}, (float, int))'}
+
+
+def _record(mk: Callable[..., a], fields: t.Dict[Any, Any],
+            strict: bool) -> Decoder[a]:
+    '''Build a `record` Decoder.
+
+    Its decoding function is generated once: one lookup by field, the
+    checks of the primitive Decoders inlined and the other Decoders
+    called. The generated code only depends on the shape of the record,
+    see `_record_code()`: the names, Decoders and defaults of the fields
+    are the globals of the function.
+    '''
+    slots = _record_slots(fields)
+    namespace: t.Dict[str, Any] = {
+        'Status': Status, 'StatusBadType': StatusBadType,
+        'StatusMissingField': StatusMissingField, 'MISSING': _REQUIRED,
+        '_unknown_field': _unknown_field, 'mk': mk, 'fields': fields}
+    shape = []
+    for i, (name, d, default) in enumerate(slots):
+        namespace['k{i}'.format(i=i)] = name
+        if default is not _REQUIRED:
+            namespace['default{i}'.format(i=i)] = default
+        kind = d._spec[0]
+        if kind in _INLINE_CHECKS:
+            shape.append((default is _REQUIRED, kind))
+        else:
+            namespace['decode{i}'.format(i=i)] = d._decode
+            shape.append((default is _REQUIRED, None))
+    exec(_record_code(tuple(shape), strict), namespace)
+
+    return Decoder._raw(namespace['decode'], ('record', mk, fields, strict))
+
+
+@lru_cache(maxsize=256)
+def _record_code(shape: t.Tuple[t.Tuple[bool, t.Optional[str]], ...],
+                 strict: bool) -> Any:
+    '''The compiled code of the decoding function of the `record`s of a
+    shape: by field, whether it is required and the kind of its Decoder if
+    its check is inlined.'''
+    lines = ['def decode(path, dic):',
+             '    if not isinstance(dic, dict):',
+             "        return StatusBadType(path, 'dict', dic)",
+             '    get = dic.get']
+    if strict:
+        required = sum(is_required for is_required, _ in shape)
+        lines.append('    found = {n}'.format(n=required))
+    for i, (is_required, kind) in enumerate(shape):
+        v, key = 'v{i}'.format(i=i), 'k{i}'.format(i=i)
+        lines.append('    {v} = get({k}, MISSING)'.format(v=v, k=key))
+        lines.append('    if {v} is MISSING:'.format(v=v))
+        if is_required:
+            lines.append('        return StatusMissingField(path, {k})'
+                         .format(k=key))
+            indent = '    '
+        else:
+            lines.append('        {v} = default{i}'.format(v=v, i=i))
+            lines.append('    else:')
+            indent = '        '
+            if strict:
+                lines.append(indent + 'found += 1')
+        if kind is not None:
+            check = _INLINE_CHECKS[kind]
+            lines.append(indent + 'if {c}:'.format(c=check.format(v=v)))
+            lines.append(indent + "    return StatusBadType((path, {k}), "
+                         "'{kind}', {v})".format(k=key, kind=kind, v=v))
+        else:
+            lines.append(indent + '{v} = decode{i}((path, {k}), {v})'
+                         .format(v=v, i=i, k=key))
+            lines.append(indent + 'if isinstance({v}, Status):'.format(v=v))
+            lines.append(indent + '    return {v}'.format(v=v))
+    if strict:
+        lines.append('    if found != len(dic):')
+        lines.append('        return _unknown_field(path, dic, fields)')
+    lines.append('    return mk({args})'.format(
+        args=', '.join('v{i}'.format(i=i) for i in range(len(shape)))))
+    return compile('\n'.join(lines) + '\n', '<record>', 'exec')
+
+
+def _unknown_field(path: Path, dic: t.Dict[Any, Any],
+                   fields: t.Dict[Any, Any]) -> Status:
+    '''The failure of a strict `record` on the first field of `dic`
+    missing from `fields`.'''
+    for name in dic:
+        if name not in fields:
+            return StatusUnknownField(path, name)
+    raise AssertionError('no unknown field')
+
+
+noop: Decoder[Any] = Decoder._raw(lambda path, dic: dic, ('noop',))
 '''Decoder that returns the value to decode, unchanged.
 '''
 
@@ -513,32 +1267,261 @@ noop: Decoder[Any] = Decoder(lambda path, dic: StatusOk(dic))
 def lazy(f: Callable[[], Decoder[a]]) -> Decoder[a]:
     '''Create a Decoder that lazily builds another Decoder.
 
+    The factory is called once, by the first decoding. The Decoder it
+    returns is then reused.
+
     Args:
         f: A factory For the lazily built Decoder.
     '''
+    decode_lazy = None
+
     def decode(path, dic):
-        decoder = f()
-        return decoder.at(path, dic)
+        nonlocal decode_lazy
+        if decode_lazy is None:
+            decode_lazy = f()._decode
+        return decode_lazy(path, dic)
+
+    return Decoder._raw(decode, ('lazy', f))
+
 
-    return Decoder(decode)
+def recursive(f: Callable[[Decoder[a]], Decoder[a]]) -> Decoder[a]:
+    '''Create a recursive Decoder.
+
+    `f` receives the Decoder being defined and returns its definition,
+    in which it can be used. The Decoder graph is built once, whatever
+    the depth of the decoded values::
+
+        tree = recursive(lambda tree: mapn(Node,
+                                           field('value', Int),
+                                           field('children', List(tree))))
+
+    Args:
+        f: A function building the Decoder from the Decoder itself.
+    '''
+    decode_self = None
+
+    def decode(path, dic):
+        return decode_self(path, dic)
+
+    this = Decoder._raw(decode, ('recursive', f, None))
+    decoder = f(this)
+    decode_self = decoder._decode
+    this._spec = ('recursive', f, decoder)
+    return this
 
 
 def susp(decoder: Decoder[a]) -> Decoder[Callable[[], a]]:
     '''
     Create a Decoder that lazily parse its value.
 
+    It yields a function that decodes the value with `decoder` when first
+    called, and returns the same value (or raises a DecodeError for the
+    same failure) when called again.
+
     Args:
         decoder: A decoder.
     '''
+    decode_inner = decoder._decode
+
     def decode(path, dic):
-        def f(_path=path, _dic=dic):
-            r = decoder.at(_path, _dic)
+        return _Thunk(decode_inner, path, dic)
 
-            if isinstance(r, StatusOk):
-                return r.value
-            else:
-                raise ValueError("{e} in path '{p}'".format(e=r.message(), p=r._path))
+    return Decoder._raw(decode, ('susp', decoder))
 
-        return StatusOk(f)
 
-    return Decoder(decode)
+# The result of a suspended decoding not run yet.
+_PENDING: Any = object()
+
+
+class _Thunk:
+    '''A suspended decoding, run by its first call.'''
+
+    __slots__ = ('_decode', '_path', '_value', '_result')
+
+    def __init__(self, decode: Callable[[Any, Any], Any], path: Path,
+                 value: Any) -> None:
+        self._decode = decode
+        self._path = path
+        self._value = value
+        self._result = _PENDING
+
+    def __call__(self) -> Any:
+        r = self._result
+        if r is _PENDING:
+            r = self._result = self._decode(self._path, self._value)
+            # The value is not needed any more.
+            self._decode = self._value = None
+        if isinstance(r, Status):
+            raise _error(r)
+        return r
+
+
+class _LazyField:
+    '''The attribute of a lazy record decoded by its first access.'''
+
+    __slots__ = ('name', 'decode', 'slot')
+
+    def __init__(self, name: Text, decode: Callable[[Any, Any], Any],
+                 slot: Any) -> None:
+        self.name = name
+        self.decode = decode
+        # The member of `__slots__` holding the decoded value (or failure).
+        self.slot = slot
+
+    def __get__(self, record: Any, owner: Any = None) -> Any:
+        if record is None:
+            return self
+        try:
+            r = self.slot.__get__(record, owner)
+        except AttributeError:
+            r = self.decode(record._path, record._value)
+            self.slot.__set__(record, r)
+        if isinstance(r, Status):
+            raise _error(r)
+        return r
+
+    def __set__(self, record: Any, value: Any) -> None:
+        raise AttributeError("lazy record field '{n}' is read-only"
+                             .format(n=self.name))
+
+
+class _LazyRecord:
+    '''The base class of the records yielded by `lazy_record()`.'''
+
+    __slots__ = ('_path', '_value')
+
+    _class: Any = None
+    _fields: t.Tuple[Text, ...] = ()
+
+    def __init__(self, path: Path, value: Any) -> None:
+        self._path = path
+        self._value = value
+
+    def __call__(self) -> Any:
+        '''Decode every field and build the record class.'''
+        return self._class(**{name: getattr(self, name)
+                              for name in self._fields})
+
+    def __repr__(self) -> str:
+        fields = []
+        for name in self._fields:
+            r = self._cached(name)
+            fields.append('{n}={v}'.format(
+                n=name, v='...' if r is _PENDING
+                else '<failed>' if isinstance(r, Status) else repr(r)))
+        return '{c}({f})'.format(c=type(self).__name__, f=', '.join(fields))
+
+    def _cached(self, name: Text) -> Any:
+        '''The decoded value (or failure) of a field, if decoded.'''
+        try:
+            return type(self).__dict__[name].slot.__get__(self)
+        except AttributeError:
+            return _PENDING
+
+
+def lazy_record(cls: Callable[..., a],
+                decoders: t.Dict[Text, Decoder[Any]]
+                ) -> Decoder[Any]:
+    '''Create a Decoder that yields a record whose fields are decoded on
+    demand::
+
+        order = lazy_record(Order, {'id': field('id', Int),
+                                    'lines': field('lines', List(line))})
+        o = parse_json(doc, order)
+        o.id        # decodes only the field 'id'
+
+    The record has one attribute by key of `decoders`. Its Decoder is
+    applied to the whole decoded value the first time the attribute is
+    read; the result, or the failure, is kept. A failure raises a
+    DecodeError when the attribute is read, decoding the record itself
+    never fails. The fields that are not read are never decoded.
+
+    Calling the record decodes its remaining fields and returns
+    `cls(**fields)`.
+
+    The records are instances of a class with `__slots__` built by
+    `lazy_record()`, with the same name as `cls`.
+
+    Args:
+        cls: The class (or function) building the complete record.
+        decoders: The Decoders of the fields, by attribute name.
+    '''
+    names = tuple(decoders)
+    for name in names:
+        if not name.isidentifier() or name.startswith('_'):
+            raise ValueError("Invalid lazy record field name '{n}'"
+                             .format(n=name))
+    slots = tuple('_f{i}'.format(i=i) for i in range(len(names)))
+    record_class = type(getattr(cls, '__name__', 'LazyRecord'),
+                        (_LazyRecord,),
+                        {'__slots__': slots, '_class': cls,
+                         '_fields': names})
+    for name, slot, decoder in zip(names, slots, decoders.values()):
+        setattr(record_class, name,
+                _LazyField(name, decoder._decode,
+                           record_class.__dict__[slot]))
+
+    def decode(path, dic):
+        return record_class(path, dic)
+
+    return Decoder._raw(decode, ('lazy_record', cls, dict(decoders)))
+
+
+def _reduce(spec: t.Tuple[Any, ...]) -> Any:
+    '''The pickle reduction of the Decoder described by `spec`.'''
+    kind, args = spec[0], spec[1:]
+    if kind in _builtin_decoders:
+        return _builtin_decoders[kind]
+    if kind in _combinators:
+        return (_combinators[kind], args)
+    if kind == 'custom':
+        return (Decoder, args)
+    if kind == 'one_of':
+        return (one_of, (list(args[0]),))
+    if kind == 'mapn':
+        return (mapn, (args[0],) + tuple(args[1]))
+    if kind == 'recursive':
+        return (recursive, (args[0],))
+    if kind == 'compiled':
+        from .compiler import compile
+        return (compile, args)
+    if kind == 'columns':
+        from .columns import Columns
+        return (Columns, args)
+    if kind == 'stackless':
+        from .stackless import stackless
+        return (stackless, args)
+    if kind == 'parallel_list':
+        from .parallel import ParallelList
+        return (ParallelList, args)
+    raise TypeError("cannot pickle a Decoder of kind '{k}'".format(k=kind))
+
+
+_builtin_decoders = {
+    'int': 'Int',
+    'str': 'Str',
+    'bool': 'Bool',
+    'float': 'Float',
+    'real': 'Real',
+    'noop': 'noop',
+}
+
+_combinators = {
+    'ap': operator.mul,
+    'ap_call': operator.matmul,
+    'then': Decoder.then,
+    'fail': fail,
+    'succeed': succeed,
+    'this_str': this_str,
+    'date': date,
+    'nullable': nullable,
+    'null': null,
+    'field': field,
+    'optional_field': optional_field,
+    'list': List,
+    'tagged': tagged,
+    'lazy': lazy,
+    'susp': susp,
+    'lazy_record': lazy_record,
+    'record': _record,
+}
@@ -0,0 +1,315 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import os
+import pickle
+import sys
+import threading
+
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from functools import partial
+from itertools import islice
+
+from typing import Any, Text, Union
+
+import typing as t
+
+import yaml
+
+from .jazzml import Decoder, Status, List, a, _TYPE_CHECKS
+from .backends import json_backend, load_json, load_yaml, yaml_backend
+from .stream import DocumentError, _decode_document
+
+
+Document = Union[Text, bytes, 'os.PathLike[str]']
+
+
+# The state of a worker process: the Decoder and the loader, sent once
+# when the process starts.
+_worker: t.Optional[t.Tuple[Decoder, t.Callable[[Any], Any]]] = None
+
+
+def _loader(fmt: Text, backend: t.Optional[Text]) -> t.Callable[[Any], Any]:
+    # The backend is looked up now to report an unknown one at once.
+    if fmt == 'yaml':
+        yaml_backend(backend)
+        return partial(load_yaml, name=backend)
+    if fmt == 'json':
+        json_backend(backend)
+        return partial(load_json, name=backend)
+    raise ValueError("Unknown document format '{f}'".format(f=fmt))
+
+
+def _init_worker(payload: bytes, fmt: Text,
+                 backend: t.Optional[Text]) -> None:
+    global _worker
+    _worker = (pickle.loads(payload), _loader(fmt, backend))
+
+
+def _decode_chunk(chunk: t.List[t.Tuple[int, Document]],
+                  state: t.Optional[t.Tuple[Decoder, Any]] = None
+                  ) -> t.List[t.Tuple[int, Any]]:
+    '''Load and decode a chunk of documents.
+
+    Returns the pairs (index, value or DocumentError).
+    '''
+    decoder, load = state if state is not None else _worker
+    results = []
+    for index, doc in chunk:
+        try:
+            value = load(doc)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            results.append((index, DocumentError(index, None, str(e))))
+        else:
+            results.append((index,
+                            _decode_document(decoder, index, None, value)))
+    return results
+
+
+def _chunks(docs: t.Iterable[Document],
+            size: int) -> t.Iterator[t.List[t.Tuple[int, Document]]]:
+    it = enumerate(docs)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_many(docs: t.Iterable[Document],
+                decoder: Decoder[a],
+                workers: t.Optional[int] = None,
+                fmt: Text = 'yaml',
+                chunksize: int = 16,
+                ordered: bool = True,
+                errors: t.Optional[t.List[DocumentError]] = None,
+                backend: t.Optional[Text] = None
+                ) -> t.Iterator[t.Tuple[int, a]]:
+    '''
+    Load and decode many documents in a pool of processes.
+
+    The Decoder is pickled once and sent once to every worker process; the
+    documents are sent by chunks. The Decoder, and the functions it has
+    been built with, must therefore be picklable: module level functions
+    and classes are, lambdas are not.
+
+    The documents are read from `docs` as the results are consumed: at
+    most `2 * workers` chunks are decoded or waiting to be yielded.
+
+    Raises:
+     DocumentError: if a document cannot be loaded or decoded and `errors`
+        is None. The remaining work is then cancelled.
+
+    Args:
+        docs: The documents: strings, bytes or paths of files (mapped in
+            memory by the workers).
+        decoder: The Decoder applied to every document.
+        workers: The number of processes, by default the number of CPUs.
+            With 1 worker, the documents are decoded in this process.
+        fmt: The format of the documents: 'yaml' or 'json'.
+        chunksize: The number of documents sent at once to a worker.
+        ordered: If True, the results are yielded in the order of `docs`,
+            otherwise as soon as they are available.
+        errors: If given, the documents that cannot be loaded or decoded
+            are skipped and their DocumentError is appended to this list.
+        backend: The name of the yaml/json backend.
+
+    Returns:
+        An iterator over the pairs (index of the document in `docs`, value
+        yielded by `decoder`).
+    '''
+    load = _loader(fmt, backend)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        results = (_decode_chunk(chunk, (decoder, load))
+                   for chunk in _chunks(docs, chunksize))
+        yield from _collect(results, errors)
+        return
+
+    payload = pickle.dumps(decoder)
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(payload, fmt, backend)) as executor:
+        # The chunks are read and submitted as the results are consumed,
+        # at most `2 * workers` at a time: `docs` may be a long iterator.
+        pending: t.Deque[Future] = deque()
+        try:
+            results = _submitted(executor, _chunks(docs, chunksize),
+                                 2 * workers, ordered, pending)
+            yield from _collect(results, errors)
+        finally:
+            for f in pending:
+                f.cancel()
+
+
+def _submitted(executor: ProcessPoolExecutor,
+               chunks: t.Iterator[t.List[t.Tuple[int, Document]]],
+               window: int, ordered: bool, pending: t.Deque[Future]
+               ) -> t.Iterator[t.List[t.Tuple[int, Any]]]:
+    '''The results of the chunks decoded by `executor`, with at most
+    `window` chunks in `pending`, in order or as they are completed.'''
+    def submit(n: int) -> None:
+        for chunk in islice(chunks, n):
+            pending.append(executor.submit(_decode_chunk, chunk))
+
+    submit(window)
+    while pending:
+        if ordered:
+            done = [pending.popleft()]
+        else:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            done = [f for f in pending if f in completed]
+            for f in done:
+                pending.remove(f)
+        # Refilled before waiting for the results: the workers are kept
+        # busy while they are consumed.
+        submit(len(done))
+        for f in done:
+            yield f.result()
+
+
+def _collect(results: t.Iterable[t.List[t.Tuple[int, Any]]],
+             errors: t.Optional[t.List[DocumentError]]
+             ) -> t.Iterator[t.Tuple[int, Any]]:
+    for chunk in results:
+        for index, r in chunk:
+            if isinstance(r, DocumentError):
+                if errors is None:
+                    raise r
+                errors.append(r)
+            else:
+                yield index, r
+
+
+# The thread pools of the ParallelList Decoders, by number of threads.
+_thread_pools: t.Dict[int, ThreadPoolExecutor] = {}
+_thread_pools_lock = threading.Lock()
+
+# Set in the threads of the pools: a ParallelList nested in the items of
+# another one is decoded serially instead of waiting for the pool it runs
+# in.
+_pool_thread = threading.local()
+
+
+def _mark_pool_thread() -> None:
+    _pool_thread.active = True
+
+
+def _thread_pool(workers: int) -> ThreadPoolExecutor:
+    pool = _thread_pools.get(workers)
+    if pool is None:
+        with _thread_pools_lock:
+            pool = _thread_pools.get(workers)
+            if pool is None:
+                pool = _thread_pools[workers] = ThreadPoolExecutor(
+                    workers, thread_name_prefix='jazzml',
+                    initializer=_mark_pool_thread)
+    return pool
+
+
+def _gil_enabled() -> bool:
+    '''Whether the threads of this process are serialized by the GIL.'''
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
+def ParallelList(decoder: Decoder[a],
+                 workers: t.Optional[int] = None,
+                 chunk: int = 1024,
+                 min_size: t.Optional[int] = None,
+                 serial_on_gil: bool = True) -> Decoder[t.List[a]]:
+    '''
+    Decode a list of values into a python list, like `List`, with a pool of
+    threads::
+
+        orders = ParallelList(order, workers=8)
+
+    The list is split into chunks of `chunk` values, decoded by the
+    threads, and their values are joined in order. On a free-threaded
+    python build, the threads decode at the same time and a large list
+    uses every core.
+
+    The failure is the one of the first value, by index, that the Decoder
+    rejects, as with `List`. Once a value is rejected, the chunks after it
+    are not decoded: the ones not started are cancelled and the running
+    ones stop at their next value.
+
+    The list is decoded serially, as by `List`, when:
+
+    - it has less than `min_size` values,
+    - the values are primitive (they are checked in a single pass),
+    - the Decoder runs in a thread of the pool, for a ParallelList nested
+      in the values of another one,
+    - the GIL is enabled and `serial_on_gil` is True: the threads would
+      run one at a time.
+
+    The pools are shared by the ParallelLists with the same number of
+    threads. The Decoder is called by several threads at once: the
+    functions it has been built with must be thread-safe.
+
+    Args:
+        decoder: The Decoder to decode the elements of the list.
+        workers: The number of threads, by default the number of CPUs.
+            With 1 thread, the lists are decoded serially.
+        chunk: The number of values decoded at once by a thread.
+        min_size: The length of the smallest list decoded in parallel, by
+            default 2 chunks.
+        serial_on_gil: If True, the lists are decoded serially when the
+            GIL is enabled.
+    '''
+    if chunk < 1:
+        raise ValueError('The chunk size must be positive')
+    serial = List(decoder)._decode
+    decode_item = decoder._decode
+    threads = workers or os.cpu_count() or 1
+    smallest = 2 * chunk if min_size is None else min_size
+    parallel = threads > 1 and decoder._spec[0] not in _TYPE_CHECKS
+
+    def decode_chunk(path, l, start, failed):
+        # `failed[0]`: the smallest index of a rejected value, in any chunk.
+        rl = []
+        for i in range(start, min(start + chunk, len(l))):
+            if failed[0] < start:
+                return None
+            ra = decode_item((path, i), l[i])
+            if isinstance(ra, Status):
+                if i < failed[0]:
+                    failed[0] = i
+                return ra
+            rl.append(ra)
+        return rl
+
+    def decode(path, l):
+        if (not parallel or type(l) is not list or len(l) < smallest
+                or getattr(_pool_thread, 'active', False)
+                or (serial_on_gil and _gil_enabled())):
+            return serial(path, l)
+
+        pool = _thread_pool(threads)
+        failed = [len(l)]
+        futures = [pool.submit(decode_chunk, path, l, start, failed)
+                   for start in range(0, len(l), chunk)]
+        rl = []
+        try:
+            for f in futures:
+                r = f.result()
+                if isinstance(r, Status):
+                    return r
+                rl.extend(r)
+        finally:
+            # Once done, or after a failure: stop the chunks still running.
+            failed[0] = -1
+            for f in futures:
+                f.cancel()
+        return rl
+
+    return Decoder._raw(decode, ('parallel_list', decoder, workers, chunk,
+                                 min_size, serial_on_gil))
@@ -0,0 +1,301 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import contextlib
+import time
+
+import typing as t
+from typing import Any, Callable, Text
+
+from . import jazzml
+from .jazzml import Decoder, Status, _builtin_decoders, _reduce, lazy, one_of
+
+
+class NodeStats:
+    '''The statistics of the Decoders reported under one label.
+
+    Attributes:
+        label: The name given with `Decoder.named()`, otherwise the
+            location of the Decoder: the names of the enclosing named
+            Decoder and fields, `[]` for the items of a list, followed by
+            the kind of the Decoder between parentheses, as in
+            `order.items[].price (float)`.
+        calls: The number of calls.
+        failures: The number of calls that failed.
+        cumulative: The time spent in the calls, in seconds, including the
+            nested Decoders.
+        own: The time spent in the calls, excluding the nested Decoders.
+        tries: For `one_of`, the number of successful calls by number of
+            alternatives tried.
+    '''
+
+    __slots__ = ('label', 'calls', 'failures', 'cumulative', 'own', 'tries')
+
+    def __init__(self, label: Text) -> None:
+        self.label = label
+        self.calls = 0
+        self.failures = 0
+        self.cumulative = 0.0
+        self.own = 0.0
+        self.tries: t.Dict[int, int] = {}
+
+    def mean_tries(self) -> t.Optional[float]:
+        '''The mean number of alternatives tried by the successful calls of
+        a `one_of`, None for the other Decoders.'''
+        matched = sum(self.tries.values())
+        if not matched:
+            return None
+        return sum(n * c for n, c in self.tries.items()) / matched
+
+    def __repr__(self) -> str:
+        return ('NodeStats({l!r}, calls={c}, failures={f}, cumulative={cu:.6f},'
+                ' own={o:.6f})'.format(l=self.label, c=self.calls,
+                                      f=self.failures, cu=self.cumulative,
+                                      o=self.own))
+
+
+class Profile:
+    '''The statistics recorded by `profiling()`, by Decoder.
+
+    The decoded Decoders are instrumented copies of the profiled ones:
+    every node of the copy counts its calls and failures and measures its
+    time. `compile()` and `stackless()` Decoders are profiled as the
+    Decoders they wrap. The cumulative time of a recursive Decoder counts
+    its nested calls several times, like `cProfile` does.
+    '''
+
+    def __init__(self) -> None:
+        self.stats: t.Dict[Text, NodeStats] = {}
+        # The instrumented Decoders, by profiled Decoder (kept alive).
+        self._instrumented: t.Dict[int, t.Tuple[Decoder, Decoder]] = {}
+        # The time spent in the nested Decoders of the running one.
+        self._nested = 0.0
+
+    def decoding(self, decoder: Decoder) -> Callable[[Any, Any], Any]:
+        '''The decoding function of the instrumented copy of `decoder`.'''
+        entry = self._instrumented.get(id(decoder))
+        if entry is None:
+            entry = self._instrumented[id(decoder)] = (
+                decoder, _Instrument(self).build(decoder, '$', {}))
+        return entry[1]._decode
+
+    def hotspots(self, n: t.Optional[int] = 10) -> t.List[NodeStats]:
+        '''The `n` (all if None) Decoders that took the longest time,
+        excluding their nested Decoders.'''
+        stats = sorted(self.stats.values(), key=lambda s: s.own,
+                       reverse=True)
+        return stats if n is None else stats[:n]
+
+    def report(self, n: t.Optional[int] = 10) -> Text:
+        '''A table of the `hotspots()`.'''
+        lines = ['{:>10} {:>8} {:>10} {:>10} {:>6}  {}'.format(
+            'calls', 'failures', 'cumul (s)', 'own (s)', 'tries', 'decoder')]
+        for s in self.hotspots(n):
+            tries = s.mean_tries()
+            lines.append('{:>10} {:>8} {:>10.4f} {:>10.4f} {:>6}  {}'.format(
+                s.calls, s.failures, s.cumulative, s.own,
+                '' if tries is None else '{:.2f}'.format(tries), s.label))
+        return '\n'.join(lines)
+
+    def _node(self, label: Text) -> NodeStats:
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = NodeStats(label)
+        return stats
+
+
+class _Instrument:
+    '''Build the instrumented copy of a Decoder tree.'''
+
+    def __init__(self, profile: Profile) -> None:
+        self.profile = profile
+
+    def build(self, decoder: Decoder, where: Text,
+              memo: t.Dict[int, Decoder]) -> Decoder:
+        '''The instrumented copy of `decoder`, located at `where`.
+
+        `memo` maps the `recursive` Decoders being copied to their copy.
+        '''
+        spec = decoder._spec
+        kind = spec[0] if spec is not None else None
+        name = decoder.__dict__.get('_name')
+        if name is not None:
+            where = label = name
+        elif kind in ('field', 'optional_field'):
+            where = label = '{w}.{n}'.format(w=where, n=spec[1])
+        elif kind in ('list', 'parallel_list'):
+            where = label = where + '[]'
+        else:
+            label = '{w} ({k})'.format(w=where, k=kind)
+
+        if kind == 'recursive':
+            if id(decoder) in memo:
+                return memo[id(decoder)]
+
+            # Like `recursive()`, the nested uses of the Decoder being timed
+            # too.
+            decode_self = None
+
+            def forward(path, v):
+                return decode_self(path, v)
+
+            this = self.timed(Decoder._raw(forward, ('recursive', spec[1],
+                                                     None)), label)
+            memo[id(decoder)] = this
+            body = self.build(spec[2], where, memo)
+            decode_self = body._decode
+            this._spec = ('recursive', spec[1], body)
+            return this
+
+        if kind in ('compiled', 'stackless'):
+            return self.build(spec[1], where, memo)
+
+        if kind == 'one_of':
+            return self.one_of(spec[1], where, label, memo)
+
+        if kind == 'then':
+            _, first, f = spec
+            return self.timed(
+                self.build(first, where, memo).then(
+                    self.cached(f, where, memo)), label)
+
+        if kind == 'lazy':
+            return self.timed(lazy(lambda: self.build(spec[1](), where,
+                                                      memo)), label)
+
+        if kind is None or kind in _builtin_decoders:
+            return self.timed(decoder, label)
+
+        try:
+            make, args = _reduce(spec)
+        except TypeError:
+            # A Decoder that cannot be rebuilt: timed as a whole.
+            return self.timed(decoder, label)
+        copy = make(*[self.argument(arg, where, memo) for arg in args])
+        return self.timed(copy, label)
+
+    def argument(self, arg: Any, where: Text,
+                 memo: t.Dict[int, Decoder]) -> Any:
+        '''Instrument the Decoders of an argument of a combinator.'''
+        if isinstance(arg, Decoder):
+            return self.build(arg, where, memo)
+        if isinstance(arg, (list, tuple)):
+            return type(arg)(self.argument(a, where, memo) for a in arg)
+        if isinstance(arg, dict):
+            return {k: self.argument(v, where, memo) for k, v in arg.items()}
+        return arg
+
+    def cached(self, f: Callable[[Any], Decoder], where: Text,
+               memo: t.Dict[int, Decoder]) -> Callable[[Any], Decoder]:
+        '''Instrument the Decoders returned by the function given to
+        `then()`.'''
+        copies: t.Dict[int, t.Tuple[Decoder, Decoder]] = {}
+
+        def instrumented(v):
+            d = f(v)
+            entry = copies.get(id(d))
+            if entry is None:
+                entry = copies[id(d)] = (d, self.build(d, where, memo))
+            return entry[1]
+
+        return instrumented
+
+    def timed(self, decoder: Decoder, label: Text) -> Decoder:
+        '''A copy of `decoder` recording its calls under `label`.'''
+        stats = self.profile._node(label)
+        profile = self.profile
+        decode = decoder._decode
+        clock = time.perf_counter
+
+        def timed(path, v):
+            outer = profile._nested
+            profile._nested = 0.0
+            start = clock()
+            try:
+                r = decode(path, v)
+            finally:
+                elapsed = clock() - start
+                nested = profile._nested
+                profile._nested = outer + elapsed
+                stats.calls += 1
+                stats.cumulative += elapsed
+                stats.own += elapsed - nested
+            if isinstance(r, Status):
+                stats.failures += 1
+            return r
+
+        copy = Decoder._raw(timed, decoder._spec)
+        if '_chain' in decoder.__dict__:
+            copy._chain = decoder._chain
+        return copy
+
+    def one_of(self, alternatives: t.Tuple[Decoder, ...], where: Text,
+               label: Text, memo: t.Dict[int, Decoder]) -> Decoder:
+        '''The instrumented copy of a `one_of`, counting the alternatives
+        tried.'''
+        tried = [0]
+
+        def counted(d):
+            decode = d._decode
+
+            def count(path, v):
+                tried[0] += 1
+                return decode(path, v)
+
+            # Same spec: the tags still select the alternatives.
+            return Decoder._raw(count, d._spec)
+
+        copy = self.timed(
+            one_of([counted(self.build(d, where, memo))
+                    for d in alternatives]), label)
+        stats = self.profile._node(label)
+        decode = copy._decode
+
+        def decode_one_of(path, v):
+            outer = tried[0]
+            tried[0] = 0
+            try:
+                r = decode(path, v)
+                if not isinstance(r, Status):
+                    stats.tries[tried[0]] = stats.tries.get(tried[0], 0) + 1
+                return r
+            finally:
+                tried[0] = outer
+
+        return Decoder._raw(decode_one_of, copy._spec)
+
+
+@contextlib.contextmanager
+def profiling() -> t.Iterator[Profile]:
+    '''
+    Profile the Decoders run by `Decoder.at()` and the parse functions::
+
+        with profiling() as profile:
+            parse_json(doc, decoder)
+        print(profile.report())
+
+    Every node of the Decoders is timed and counted, by name (see
+    `Decoder.named()`) or location. For a `one_of`, the number of
+    alternatives tried before one succeeds is also recorded.
+
+    The profiled Decoders are run through instrumented copies, built once
+    by Decoder: outside of `profiling()`, the Decoders are left untouched
+    and run at full speed. The profiling applies to the whole process, the
+    Decoders run by other threads being recorded too. The parse functions
+    given a `max_errors` above 1 do not run the profiled Decoders (see
+    `DecodeError`).
+
+    Returns:
+        The Profile holding the statistics.
+    '''
+    profile = Profile()
+    previous = jazzml._profiler
+    jazzml._profiler = profile
+    try:
+        yield profile
+    finally:
+        jazzml._profiler = previous
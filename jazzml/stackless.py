@@ -0,0 +1,302 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+from functools import partial
+
+import typing as t
+from typing import Any
+
+from .jazzml import (Decoder, Status, StatusBadType, StatusMissingField,
+                     StatusOneOfNoDecoder, StatusTagFailed, StatusUnknownTag,
+                     a, _ap_chain, _one_of_table, _record_slots, _REQUIRED,
+                     _tag_of, _Thunk, _TYPE_CHECKS, _unknown_field)
+
+
+# A step decodes one node of the Decoder tree. It is a generator that
+# yields the tasks (Decoder, path, value) decoding its children, receives
+# their results and returns its own.
+Task = t.Tuple[Decoder, Any, Any]
+Step = t.Generator[Task, Any, Any]
+
+
+class _Engine:
+    '''Run a Decoder with an explicit stack of steps instead of nested
+    python calls.
+
+    The nodes without children (primitive and user defined Decoders) are
+    decoded by their own decoding function.
+    '''
+
+    def __init__(self) -> None:
+        # The Decoders built by `lazy` and the dispatch tables of `one_of`,
+        # by node. The node is kept alive with its entry.
+        self.lazy: t.Dict[int, t.Tuple[Decoder, Decoder]] = {}
+        self.tables: t.Dict[int, t.Tuple[Decoder, Any]] = {}
+
+    def run(self, decoder: Decoder, path: Any, value: Any) -> Any:
+        steps = _STEPS
+        stack: t.List[Step] = []
+        task: t.Optional[Task] = (decoder, path, value)
+        r = None
+        while True:
+            if task is not None:
+                d, p, v = task
+                spec = d._spec
+                step = steps.get(spec[0]) if spec is not None else None
+                if step is None:
+                    r = d._decode(p, v)
+                else:
+                    stack.append(step(self, d, p, v))
+                    r = None
+            if not stack:
+                return r
+            try:
+                task = stack[-1].send(r)
+            except StopIteration as e:
+                stack.pop()
+                task = None
+                r = e.value
+
+    def built(self, decoder: Decoder) -> Decoder:
+        '''The Decoder built by the `lazy` Decoder `decoder`.'''
+        entry = self.lazy.get(id(decoder))
+        if entry is None:
+            entry = self.lazy[id(decoder)] = (decoder, decoder._spec[1]())
+        return entry[1]
+
+    def table(self, decoder: Decoder) -> Any:
+        '''The dispatch table of the `one_of` Decoder `decoder`.'''
+        entry = self.tables.get(id(decoder))
+        if entry is None:
+            alternatives = decoder._spec[1]
+            tags = [_tag_of(d) for d in alternatives]
+            entry = self.tables[id(decoder)] = (
+                decoder, _one_of_table(alternatives, tags))
+        return entry[1]
+
+
+def _field(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    _, name, inner = decoder._spec
+    if name in dic:
+        return (yield inner, (path, name), dic[name])
+    return StatusMissingField(path, name)
+
+
+def _optional_field(engine: _Engine, decoder: Decoder, path: Any,
+                    dic: Any) -> Step:
+    _, name, inner, default = decoder._spec
+    if name in dic:
+        return (yield inner, (path, name), dic[name])
+    return default
+
+
+def _nullable(engine: _Engine, decoder: Decoder, path: Any,
+              value: Any) -> Step:
+    _, inner, default = decoder._spec
+    if value is None:
+        return default
+    return (yield inner, path, value)
+
+
+def _list(engine: _Engine, decoder: Decoder, path: Any, l: Any) -> Step:
+    if type(l) is not list:
+        return StatusBadType(path, "list", l)
+    spec = decoder._spec
+    inner = spec[1]
+    if len(spec) > 2 or inner._spec[0] in _TYPE_CHECKS:
+        # The elements are not nested Decoders.
+        return decoder._decode(path, l)
+    rl = []
+    for i, v in enumerate(l):
+        ra = yield inner, (path, i), v
+        if isinstance(ra, Status):
+            return ra
+        rl.append(ra)
+    return rl
+
+
+def _mapn(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    _, f, decoders = decoder._spec
+    ras = []
+    for d in decoders:
+        ra = yield d, path, dic
+        if isinstance(ra, Status):
+            return ra
+        ras.append(ra)
+    return f(*ras)
+
+
+def _record(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    _, mk, fields, strict = decoder._spec
+    if not isinstance(dic, dict):
+        return StatusBadType(path, 'dict', dic)
+    args = []
+    for name, d, default in _record_slots(fields):
+        if name in dic:
+            ra = yield d, (path, name), dic[name]
+            if isinstance(ra, Status):
+                return ra
+            args.append(ra)
+        elif default is _REQUIRED:
+            return StatusMissingField(path, name)
+        else:
+            args.append(default)
+    if strict and any(name not in fields for name in dic):
+        return _unknown_field(path, dic, fields)
+    return mk(*args)
+
+
+def _alternatives(alternatives: t.Iterable[Decoder], path: Any,
+                  dic: Any) -> Step:
+    for d in alternatives:
+        ra = yield d, path, dic
+        if not isinstance(ra, Status):
+            return ra
+    return StatusOneOfNoDecoder(path)
+
+
+def _one_of(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    # Same selection of the alternatives as `one_of()`.
+    dispatch = engine.table(decoder)
+    if dispatch is None or type(dic) is not dict:
+        return (yield from _alternatives(decoder._spec[1], path, dic))
+    field_name, table, untagged = dispatch
+    tag = dic.get(field_name)
+    if isinstance(tag, str) and tag in table:
+        alternatives = table[tag]
+        if len(alternatives) == 1:
+            ra = yield alternatives[0], path, dic
+            if isinstance(ra, Status):
+                return StatusTagFailed(ra._path, field_name, tag, ra)
+            return ra
+        return (yield from _alternatives(alternatives, path, dic))
+    if untagged:
+        return (yield from _alternatives(untagged, path, dic))
+    if field_name in dic:
+        return StatusUnknownTag(path, field_name, tag)
+    return StatusOneOfNoDecoder(path)
+
+
+def _tagged(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    _, field_name, decoders = decoder._spec
+    if field_name not in dic:
+        return StatusMissingField(path, field_name)
+    tag = dic[field_name]
+    try:
+        selected = decoders.get(tag)
+    except TypeError:
+        selected = None
+    if selected is None:
+        return StatusUnknownTag(path, field_name, tag)
+    r = yield selected, path, dic
+    if isinstance(r, Status):
+        return StatusTagFailed(r._path, field_name, tag, r)
+    return r
+
+
+def _ap(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    # The whole chain of `*`, ending with `@` if ap_call.
+    kind, left, right = decoder._spec
+    fdec, args = _ap_chain(left)
+    rf = yield fdec, path, dic
+    if isinstance(rf, Status):
+        return rf
+    ras = []
+    for d in args + (right,):
+        ra = yield d, path, dic
+        if isinstance(ra, Status):
+            return ra
+        ras.append(ra)
+    return partial(rf, *ras) if kind == 'ap' else rf(*ras)
+
+
+def _then(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    _, first, f = decoder._spec
+    ra = yield first, path, dic
+    if isinstance(ra, Status):
+        return ra
+    return (yield f(ra), path, dic)
+
+
+def _lazy(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    return (yield engine.built(decoder), path, dic)
+
+
+def _inner(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    # compiled, stackless: the original Decoder.
+    return (yield decoder._spec[1], path, dic)
+
+
+def _recursive(engine: _Engine, decoder: Decoder, path: Any,
+               dic: Any) -> Step:
+    return (yield decoder._spec[2], path, dic)
+
+
+def _susp(engine: _Engine, decoder: Decoder, path: Any, dic: Any) -> Step:
+    # A step without children: the thunk decodes the value when called.
+    return _Thunk(partial(engine.run, decoder._spec[1]), path, dic)
+    yield
+
+
+_STEPS: t.Dict[str, t.Callable[[_Engine, Decoder, Any, Any], Step]] = {
+    'field': _field,
+    'optional_field': _optional_field,
+    'nullable': _nullable,
+    'list': _list,
+    'mapn': _mapn,
+    'record': _record,
+    'one_of': _one_of,
+    'tagged': _tagged,
+    'ap': _ap,
+    'ap_call': _ap,
+    'then': _then,
+    'lazy': _lazy,
+    'recursive': _recursive,
+    'compiled': _inner,
+    'stackless': _inner,
+    'susp': _susp,
+}
+
+
+def stackless(decoder: Decoder[a], hybrid: bool = True) -> Decoder[a]:
+    '''Make a Decoder that decodes values of any depth.
+
+    Decoders call the Decoders of their children, several python frames per
+    nesting level: a value nested a few hundred levels deep, possibly on
+    purpose, makes them fail with a RecursionError. The returned Decoder
+    decodes the value with an explicit stack instead, with a bounded use of
+    the python stack. It yields the same values and errors as `decoder`.
+
+    Only the Decoder tree is run that way: the yaml/json loaders and the
+    user defined Decoders keep their own limits.
+
+    Args:
+        decoder: The Decoder to run.
+        hybrid: If True, the value is first decoded by `decoder` itself,
+            which is faster. It is decoded again with the explicit stack
+            only if it is too deeply nested, so the functions given to
+            the Decoders may be called twice on the same values.
+
+    Returns:
+        An equivalent Decoder.
+    '''
+    engine = _Engine()
+    run = engine.run
+
+    if hybrid:
+        decode_recursive = decoder._decode
+
+        def decode(path, dic):
+            try:
+                return decode_recursive(path, dic)
+            except RecursionError:
+                return run(decoder, path, dic)
+    else:
+        def decode(path, dic):
+            return run(decoder, path, dic)
+
+    return Decoder._raw(decode, ('stackless', decoder, hybrid))
@@ -0,0 +1,126 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+from typing import IO, Any, Text, Union
+
+import typing as t
+
+from .jazzml import Decoder, Status, a, _describe
+from .backends import json_backend, yaml_documents_backend
+
+
+class DocumentError(ValueError):
+    '''The failure to decode one document of a stream.
+
+    Attributes:
+        document: The index of the document in the stream (0 based).
+        line: The line where the document starts (1 based), if known.
+        status: The failing Status, or None if the document could not
+            be loaded.
+    '''
+
+    def __init__(self, document: int, line: t.Optional[int],
+                 reason: Text, status: t.Optional[Status] = None) -> None:
+        location = "document {d}".format(d=document)
+        if line is not None:
+            location += " (line {l})".format(l=line)
+        super().__init__("{loc}: {r}".format(loc=location, r=reason))
+        self.document = document
+        self.line = line
+        self.reason = reason
+        self.status = status
+
+    def __reduce__(self):
+        return (DocumentError,
+                (self.document, self.line, self.reason, self.status))
+
+
+def _decode_document(decoder: Decoder[a], document: int,
+                     line: t.Optional[int], value: Any) -> Any:
+    '''Decode one document, returning a DocumentError on failure.'''
+    r = decoder._decode((), value)
+    if isinstance(r, Status):
+        return DocumentError(document, line, _describe(r), r)
+    return r
+
+
+def iter_yaml(stream: Union[Text, bytes, IO[str], IO[bytes]],
+              decoder: Decoder[a],
+              errors: t.Optional[t.List[DocumentError]] = None,
+              backend: t.Optional[Text] = None) -> t.Iterator[a]:
+    '''
+    Lazily decode the documents of a multi-document yaml stream.
+
+    Documents are loaded and decoded one at a time, so the memory used does
+    not depend on the size of the stream.
+
+    Raises:
+     DocumentError: if a document cannot be decoded and `errors` is None.
+
+    Args:
+        stream: The yaml stream (string or file object).
+        decoder: The Decoder applied to every document.
+        errors: If given, the documents that cannot be decoded are skipped
+            and their DocumentError is appended to this list.
+        backend: The name of the yaml backend.
+
+    Returns:
+        An iterator over the values yielded by `decoder`.
+    '''
+    documents = yaml_documents_backend(backend)(stream)
+    for document, (line, value) in enumerate(documents):
+        r = _decode_document(decoder, document, line, value)
+        if isinstance(r, DocumentError):
+            if errors is None:
+                raise r
+            errors.append(r)
+        else:
+            yield r
+
+
+def iter_jsonl(stream: t.Iterable[Union[Text, bytes]],
+               decoder: Decoder[a],
+               errors: t.Optional[t.List[DocumentError]] = None,
+               backend: t.Optional[Text] = None) -> t.Iterator[a]:
+    '''
+    Lazily decode a JSON Lines stream: one json document per line.
+
+    Lines are read, loaded and decoded one at a time, so the memory used
+    does not depend on the size of the stream. Blank lines are ignored.
+
+    Raises:
+     DocumentError: if a line cannot be loaded or decoded and `errors`
+        is None.
+
+    Args:
+        stream: The lines (a text or binary file object, or any iterable).
+        decoder: The Decoder applied to every document.
+        errors: If given, the lines that cannot be loaded or decoded are
+            skipped and their DocumentError is appended to this list.
+        backend: The name of the json backend.
+
+    Returns:
+        An iterator over the values yielded by `decoder`.
+    '''
+    loads = json_backend(backend)
+    document = 0
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            value = loads(text)
+        except ValueError as e:
+            r = DocumentError(document, line, str(e))
+        else:
+            r = _decode_document(decoder, document, line, value)
+        document += 1
+        if isinstance(r, DocumentError):
+            if errors is None:
+                raise r
+            errors.append(r)
+        else:
+            yield r
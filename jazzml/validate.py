@@ -0,0 +1,620 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+import typing as t
+from functools import lru_cache, partial
+from typing import Any, Callable
+
+from .jazzml import (Decoder, Status, StatusBadType, StatusMissingField,
+                     StatusOk, StatusTagFailed, StatusUnknownField,
+                     StatusUnknownTag, _ap_chain, _error, _INLINE_CHECKS,
+                     _one_of_decode, _record_slots, _REQUIRED, _tag_of,
+                     _tagged_decode, _TYPE_CHECKS, _unknown_field)
+
+
+# A check follows the decoding protocol but yields None instead of the
+# decoded value: it returns a failing Status or None.
+Check = Callable[[Any, Any], t.Optional[Status]]
+
+
+# The primitive Decoders.
+_LEAVES = frozenset(_TYPE_CHECKS) | {'this_str', 'null', 'date', 'fail'}
+
+
+def _succeed(path: Any, v: Any) -> None:
+    return None
+
+
+def _checker(decoder: Decoder) -> Check:
+    '''The check of `decoder`, built once and kept with the Decoder.'''
+    check = getattr(decoder, '_check', None)
+    if check is None:
+        check = decoder._check = _build(decoder, {})
+    return check
+
+
+def _arguments(decoder: Decoder) -> t.List[Decoder]:
+    '''The Decoders of the arguments of a `mapn`, `*` or `@` Decoder,
+    flattening the chains of `*` and `@` and dropping `succeed`.'''
+    kind, *args = decoder._spec
+    if kind == 'mapn':
+        decoders = list(args[1])
+    else:
+        decoders = []
+        for d in args:
+            if d._spec[0] in ('ap', 'ap_call'):
+                decoders.extend(_arguments(d))
+            else:
+                decoders.append(d)
+    return [d for d in decoders if d._spec[0] != 'succeed']
+
+
+def _build(decoder: Decoder, memo: t.Dict[int, Check]) -> Check:
+    '''Build the check of `decoder`.
+
+    `memo` maps the `recursive` Decoders being built to their check.
+    '''
+    spec = decoder._spec
+    kind = spec[0] if spec is not None else None
+
+    if kind in _LEAVES:
+        # The decoding functions of the primitive Decoders return the
+        # value itself: they already are checks.
+        return decoder._decode
+
+    if kind in ('succeed', 'susp'):
+        # susp defers the decoding, which therefore never fails here.
+        return _succeed
+
+    if kind == 'field':
+        _, name, inner = spec
+        check_value = _build(inner, memo)
+
+        if inner._spec[0] in _LEAVES:
+            # Leaves do not use the path on success: it is only built to
+            # report a failure, by checking the value again.
+            def check(path, dic):
+                if name in dic:
+                    v = dic[name]
+                    if isinstance(check_value(None, v), Status):
+                        return check_value((path, name), v)
+                    return None
+                else:
+                    return StatusMissingField(path, name)
+
+            return check
+
+        def check(path, dic):
+            if name in dic:
+                return check_value((path, name), dic[name])
+            else:
+                return StatusMissingField(path, name)
+
+        return check
+
+    if kind == 'optional_field':
+        _, name, inner, _ = spec
+        check_value = _build(inner, memo)
+
+        def check(path, dic):
+            if name in dic:
+                return check_value((path, name), dic[name])
+            return None
+
+        return check
+
+    if kind == 'nullable':
+        check_value = _build(spec[1], memo)
+
+        def check(path, v):
+            if v is None:
+                return None
+            return check_value(path, v)
+
+        return check
+
+    if kind == 'list':
+        inner = spec[1]
+        if len(spec) > 2 or inner._spec[0] in _TYPE_CHECKS:
+            # Checked in a single pass by `List`, without a copy.
+            return decoder._decode
+        check_item = _build(inner, memo)
+
+        def check(path, l):
+            if type(l) is not list:
+                return decoder._decode(path, l)
+            for i, v in enumerate(l):
+                r = check_item((path, i), v)
+                if isinstance(r, Status):
+                    return r
+            return None
+
+        return check
+
+    if kind == 'record':
+        _, _, fields, strict = spec
+        slots = [(name, _build(d, memo), default)
+                 for name, d, default in _record_slots(fields)]
+
+        def check(path, dic):
+            if not isinstance(dic, dict):
+                return StatusBadType(path, 'dict', dic)
+            found = 0
+            for name, check_value, default in slots:
+                v = dic.get(name, _REQUIRED)
+                if v is _REQUIRED:
+                    if default is _REQUIRED:
+                        return StatusMissingField(path, name)
+                else:
+                    found += 1
+                    r = check_value((path, name), v)
+                    if isinstance(r, Status):
+                        return r
+            if strict and found != len(dic):
+                return _unknown_field(path, dic, fields)
+            return None
+
+        return check
+
+    if kind in ('mapn', 'ap', 'ap_call'):
+        # The function is not called: only the arguments are checked.
+        arguments = _arguments(decoder)
+        if any(d._spec[0] == 'field' for d in arguments):
+            return _arguments_check(arguments, memo)
+        checks = [_build(d, memo) for d in arguments]
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(path, v):
+            for check_arg in checks:
+                r = check_arg(path, v)
+                if isinstance(r, Status):
+                    return r
+            return None
+
+        return check
+
+    if kind == 'one_of':
+        alternatives = spec[1]
+        return _one_of_decode([_build(d, memo) for d in alternatives],
+                              [_tag_of(d) for d in alternatives])
+
+    if kind == 'tagged':
+        _, name, decoders = spec
+        return _tagged_decode(name, {tag: _build(d, memo)
+                                     for tag, d in decoders.items()})
+
+    if kind == 'then':
+        # The first Decoder is run to choose the branch, which is checked.
+        _, first, f = spec
+        decode_first = first._decode
+
+        def check(path, v):
+            ra = decode_first(path, v)
+            if isinstance(ra, Status):
+                return ra
+            return _checker(f(ra))(path, v)
+
+        return check
+
+    if kind == 'lazy':
+        check_lazy = None
+
+        def check(path, v):
+            nonlocal check_lazy
+            if check_lazy is None:
+                check_lazy = _checker(spec[1]())
+            return check_lazy(path, v)
+
+        return check
+
+    if kind == 'recursive':
+        if id(decoder) in memo:
+            return memo[id(decoder)]
+        check_self = None
+
+        def check(path, v):
+            return check_self(path, v)
+
+        memo[id(decoder)] = check
+        check_self = _build(spec[2], memo)
+        return check
+
+    if kind in ('compiled', 'stackless'):
+        return _build(spec[1], memo)
+
+    # Columns and user defined Decoders: decode and drop the value.
+    decode = decoder._decode
+
+    def check(path, v):
+        r = decode(path, v)
+        if isinstance(r, Status):
+            return r
+        return None
+
+    return check
+
+
+def _arguments_check(arguments: t.List[Decoder],
+                     memo: t.Dict[int, Check]) -> Check:
+    '''The check of the arguments of a `mapn`, `*` or `@` Decoder.
+
+    It is generated once, like the decoding function of a `record`: the
+    fields are looked up inline, the checks of the primitive Decoders of
+    the fields inlined and the other checks called. The generated code
+    only depends on the shape of the arguments, see `_arguments_code()`.
+    '''
+    namespace: t.Dict[str, Any] = {
+        'Status': Status, 'StatusBadType': StatusBadType,
+        'StatusMissingField': StatusMissingField}
+    shape = []
+    for i, d in enumerate(arguments):
+        spec = d._spec
+        if spec[0] == 'field':
+            namespace['k{i}'.format(i=i)] = spec[1]
+            kind = spec[2]._spec[0]
+            if kind in _INLINE_CHECKS:
+                shape.append(kind)
+                continue
+            d = spec[2]
+            shape.append('field')
+        else:
+            shape.append(None)
+        namespace['check{i}'.format(i=i)] = _build(d, memo)
+    exec(_arguments_code(tuple(shape)), namespace)
+    return namespace['check']
+
+
+@lru_cache(maxsize=256)
+def _arguments_code(shape: t.Tuple[t.Optional[str], ...]) -> Any:
+    '''The compiled code of the checks of the arguments of a shape: by
+    argument, the kind of the Decoder of the field whose check is inlined,
+    'field' for another field or None for another Decoder.'''
+    lines = ['def check(path, dic):']
+    for i, kind in enumerate(shape):
+        v, key = 'v{i}'.format(i=i), 'k{i}'.format(i=i)
+        if kind is None:
+            lines.append('    {v} = check{i}(path, dic)'.format(v=v, i=i))
+        else:
+            lines.append('    if {k} not in dic:'.format(k=key))
+            lines.append('        return StatusMissingField(path, {k})'
+                         .format(k=key))
+            lines.append('    {v} = dic[{k}]'.format(v=v, k=key))
+            if kind in _INLINE_CHECKS:
+                lines.append('    if {c}:'.format(
+                    c=_INLINE_CHECKS[kind].format(v=v)))
+                lines.append("        return StatusBadType((path, {k}), "
+                             "'{kind}', {v})".format(k=key, kind=kind, v=v))
+                continue
+            lines.append('    {v} = check{i}((path, {k}), {v})'
+                         .format(v=v, i=i, k=key))
+        lines.append('    if isinstance({v}, Status):'.format(v=v))
+        lines.append('        return {v}'.format(v=v))
+    lines.append('    return None')
+    return compile('\n'.join(lines) + '\n', '<check>', 'exec')
+
+
+def validate(value: Any, decoder: Decoder[Any]) -> None:
+    '''
+    Check that `decoder` accepts the given (loaded) yaml/json value, without
+    decoding it.
+
+    Every type, field and `this_str` check of `decoder` is done, but the
+    functions given to `mapn`, `*`, `@` are not called and no value is
+    built, which makes it much faster than decoding. Only the Decoders
+    given to `then()` are run, to choose the branch to check.
+
+    Raises:
+     DecodeError: if `decoder` rejects `value`.
+
+    Args:
+        value: The value to check.
+        decoder: The Decoder that must accept `value`.
+    '''
+    r = _checker(decoder)((), value)
+    if isinstance(r, Status):
+        raise _error(r)
+
+
+def _check(decoder: Decoder[Any], value: Any) -> Status[None]:
+    r = _checker(decoder)((), value)
+    if isinstance(r, Status):
+        return r
+    return StatusOk(None)
+
+
+# Collecting the failures
+# -----------------------
+#
+# A collector follows the decoding protocol but does not stop at the first
+# failure: it adds every failure to `errors` and returns `_FAILED` instead
+# of a Status. The value of a combinator is built only if all its parts
+# are decoded.
+
+Collect = Callable[[Any, Any, '_Errors'], Any]
+
+
+# The result of a collector that failed.
+_FAILED: Any = object()
+
+
+class _Enough(Exception):
+    '''Raised when the maximum number of failures is reached.'''
+
+
+class _Errors(list):
+    '''The failures collected so far.'''
+
+    def __init__(self, limit: t.Optional[int]) -> None:
+        super().__init__()
+        self.limit = limit
+
+    def add(self, status: Status) -> None:
+        self.append(status)
+        if self.limit is not None and len(self) >= self.limit:
+            raise _Enough()
+
+
+class _TagErrors:
+    '''The failures of the Decoder selected by a tag.'''
+
+    def __init__(self, errors: _Errors, field_name: Any, tag: Any) -> None:
+        self.errors = errors
+        self.field_name = field_name
+        self.tag = tag
+
+    def add(self, status: Status) -> None:
+        self.errors.add(StatusTagFailed(status._path, self.field_name,
+                                        self.tag, status))
+
+
+def _collector(decoder: Decoder) -> Collect:
+    '''The collector of `decoder`, built once and kept with the Decoder.'''
+    collect = getattr(decoder, '_collect', None)
+    if collect is None:
+        collect = decoder._collect = _build_collector(decoder, {})
+    return collect
+
+
+def _from_decode(decode: Callable[[Any, Any], Any]) -> Collect:
+    '''The collector of a Decoder that fails at most once.'''
+    def collect(path, v, errors):
+        r = decode(path, v)
+        if isinstance(r, Status):
+            errors.add(r)
+            return _FAILED
+        return r
+
+    return collect
+
+
+def _has_field(path: Any, dic: Any, name: Any,
+               errors: '_Errors') -> t.Optional[bool]:
+    '''Whether `dic` has the field `name`, or None if it is not a dict
+    the field could be read from: the failure is then collected. Like the
+    Decoders, the values that do not contain `name` (a list, ...) have no
+    such field.'''
+    if isinstance(dic, dict):
+        return name in dic
+    try:
+        present = name in dic
+    except TypeError:
+        present = True
+    if present:
+        errors.add(StatusBadType(path, 'dict', dic))
+        return None
+    return False
+
+
+def _build_collector(decoder: Decoder,
+                     memo: t.Dict[int, Collect]) -> Collect:
+    '''Build the collector of `decoder`.
+
+    `memo` maps the `recursive` Decoders being built to their collector.
+    '''
+    spec = decoder._spec
+    kind = spec[0] if spec is not None else None
+
+    if kind == 'field':
+        _, name, inner = spec
+        collect_value = _build_collector(inner, memo)
+
+        def collect(path, dic, errors):
+            present = _has_field(path, dic, name, errors)
+            if present:
+                return collect_value((path, name), dic[name], errors)
+            if present is not None:
+                errors.add(StatusMissingField(path, name))
+            return _FAILED
+
+        return collect
+
+    if kind == 'optional_field':
+        _, name, inner, default = spec
+        collect_value = _build_collector(inner, memo)
+
+        def collect(path, dic, errors):
+            present = _has_field(path, dic, name, errors)
+            if present:
+                return collect_value((path, name), dic[name], errors)
+            return _FAILED if present is None else default
+
+        return collect
+
+    if kind == 'nullable':
+        _, inner, default = spec
+        collect_value = _build_collector(inner, memo)
+
+        def collect(path, v, errors):
+            if v is None:
+                return default
+            return collect_value(path, v, errors)
+
+        return collect
+
+    if kind == 'list':
+        decode_list = decoder._decode
+        collect_item = _build_collector(spec[1], memo)
+        # The lists of primitive values are decoded in a single pass, and
+        # the arrays by `List` itself: their failures are collected
+        # element by element, respectively reported once.
+        single_pass = _checker(decoder) is decode_list
+
+        def collect(path, l, errors):
+            if single_pass or type(l) is not list:
+                r = decode_list(path, l)
+                if not isinstance(r, Status):
+                    return r
+                if len(spec) > 2 or type(l) is not list:
+                    errors.add(r)
+                    return _FAILED
+            rl = [collect_item((path, i), v, errors) for i, v in enumerate(l)]
+            if any(r is _FAILED for r in rl):
+                return _FAILED
+            return rl
+
+        return collect
+
+    if kind == 'record':
+        _, mk, fields, strict = spec
+        slots = [(name, _build_collector(d, memo), default)
+                 for name, d, default in _record_slots(fields)]
+
+        def collect(path, dic, errors):
+            if not isinstance(dic, dict):
+                errors.add(StatusBadType(path, 'dict', dic))
+                return _FAILED
+            values = []
+            for name, collect_value, default in slots:
+                if name in dic:
+                    values.append(collect_value((path, name), dic[name],
+                                                errors))
+                elif default is _REQUIRED:
+                    errors.add(StatusMissingField(path, name))
+                    values.append(_FAILED)
+                else:
+                    values.append(default)
+            failed = any(r is _FAILED for r in values)
+            if strict:
+                for name in dic:
+                    if name not in fields:
+                        errors.add(StatusUnknownField(path, name))
+                        failed = True
+            return _FAILED if failed else mk(*values)
+
+        return collect
+
+    if kind == 'mapn':
+        _, f, decoders = spec
+        collects = [_build_collector(d, memo) for d in decoders]
+
+        def collect(path, v, errors):
+            values = [collect_arg(path, v, errors) for collect_arg in collects]
+            if any(r is _FAILED for r in values):
+                return _FAILED
+            return f(*values)
+
+        return collect
+
+    if kind in ('ap', 'ap_call'):
+        if kind == 'ap':
+            fdec, args = _ap_chain(decoder)
+        else:
+            fdec, args = _ap_chain(spec[1])
+            args = args + (spec[2],)
+        collect_f = _build_collector(fdec, memo)
+        collects = [_build_collector(d, memo) for d in args]
+        call = kind == 'ap_call'
+
+        def collect(path, v, errors):
+            rf = collect_f(path, v, errors)
+            values = [collect_arg(path, v, errors) for collect_arg in collects]
+            if rf is _FAILED or any(r is _FAILED for r in values):
+                return _FAILED
+            return rf(*values) if call else partial(rf, *values)
+
+        return collect
+
+    if kind == 'tagged':
+        _, name, decoders = spec
+        collects = {tag: _build_collector(d, memo)
+                    for tag, d in decoders.items()}
+
+        def collect(path, dic, errors):
+            present = _has_field(path, dic, name, errors)
+            if not present:
+                if present is not None:
+                    errors.add(StatusMissingField(path, name))
+                return _FAILED
+            tag = dic[name]
+            try:
+                collect_tagged = collects.get(tag)
+            except TypeError:
+                collect_tagged = None
+            if collect_tagged is None:
+                errors.add(StatusUnknownTag(path, name, tag))
+                return _FAILED
+            return collect_tagged(path, dic, _TagErrors(errors, name, tag))
+
+        return collect
+
+    if kind == 'then':
+        _, first, f = spec
+        collect_first = _build_collector(first, memo)
+
+        def collect(path, v, errors):
+            ra = collect_first(path, v, errors)
+            if ra is _FAILED:
+                return _FAILED
+            return _collector(f(ra))(path, v, errors)
+
+        return collect
+
+    if kind == 'lazy':
+        collect_lazy = None
+
+        def collect(path, v, errors):
+            nonlocal collect_lazy
+            if collect_lazy is None:
+                collect_lazy = _collector(spec[1]())
+            return collect_lazy(path, v, errors)
+
+        return collect
+
+    if kind == 'recursive':
+        if id(decoder) in memo:
+            return memo[id(decoder)]
+        collect_self = None
+
+        def collect(path, v, errors):
+            return collect_self(path, v, errors)
+
+        memo[id(decoder)] = collect
+        collect_self = _build_collector(spec[2], memo)
+        return collect
+
+    if kind == 'compiled':
+        return _build_collector(spec[1], memo)
+
+    # Primitive Decoders, one_of, Columns, stackless (whose collector would
+    # be bounded by the python stack), ParallelList and user defined
+    # Decoders.
+    return _from_decode(decoder._decode)
+
+
+def _collect_decode(decoder: Decoder[Any], value: Any,
+                    max_errors: t.Optional[int]
+                    ) -> t.Tuple[Any, t.List[Status], bool]:
+    '''Decode `value` with `decoder`, collecting at most `max_errors`
+    failures: the decoded value, the failures and whether all of them have
+    been collected.'''
+    errors = _Errors(max_errors)
+    try:
+        r = _collector(decoder)((), value, errors)
+    except _Enough:
+        return None, list(errors), False
+    return r, list(errors), True
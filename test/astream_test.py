@@ -0,0 +1,133 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import asyncio
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from hypothesis             import given, settings
+from hypothesis.strategies  import lists
+
+import yaml
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary
+
+
+def serve_and_decode(data, piece, **kwargs):
+    '''Serve `data` from a local server, written by pieces of `piece`
+    bytes, and decode what a client reads with `adecode_stream()`.'''
+
+    async def send(reader, writer):
+        for i in range(0, len(data), piece):
+            writer.write(data[i:i + piece])
+            await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(send, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                return [v async for v in adecode_stream(reader, **kwargs)]
+            finally:
+                writer.close()
+
+    return asyncio.run(main())
+
+
+@settings(print_blob=True, max_examples=25, deadline=None)
+@given(lists(gen_dictionary(2), max_size=20))
+def test_adecode_stream(dics):
+
+    lines = ''.join(json.dumps(dic) + '\n' for dic in dics).encode('utf-8')
+    doc = yaml.dump_all(dics, explicit_start=True).encode('utf-8')
+
+    assert serve_and_decode(lines, 7, decoder=noop, batch_size=3) == dics
+    assert serve_and_decode(doc, 100, decoder=noop, fmt='yaml') == dics
+
+
+def test_adecode_stream_errors():
+
+    doc = ('%YAML 1.1\n--- # first\n\nb: 1\n---\na: x\n--- \nb: 2\n...\n'
+           '# last\n--- {a: 3}')
+
+    errors = []
+    assert serve_and_decode(doc.encode('utf-8'), 5, decoder=field('a', Int),
+                            fmt='yaml', errors=errors) == [3]
+
+    expected = []
+    list(iter_yaml(doc, field('a', Int), errors=expected))
+    assert ([(e.document, e.line) for e in errors]
+            == [(e.document, e.line) for e in expected] == [(0, 4), (1, 6), (2, 8)])
+
+    lines = b'{"a": 1}\n\n{"a": "x"}\n{"a": \n{"a": 4}'
+
+    errors = []
+    assert serve_and_decode(lines, 4, decoder=field('a', Int),
+                            errors=errors) == [1, 4]
+    assert [(e.document, e.line) for e in errors] == [(1, 3), (2, 4)]
+    assert errors[1].status is None
+
+    try:
+        serve_and_decode(lines, 4, decoder=field('a', Int))
+        assert False
+    except DocumentError as e:
+        assert e.document == 1
+        assert "in path '['a']'" in str(e)
+
+
+def test_adecode_stream_long_lines():
+
+    long = 'x' * 1000000
+    lines = ('{"a": "%s"}\n{"a": "b"}\n{"a": "%s"}' % (long, long)).encode()
+    doc = yaml.dump_all([{'a': long}, {'a': 'b'}],
+                        explicit_start=True).encode('utf-8')
+
+    assert serve_and_decode(lines, 4096, decoder=field('a', Str)) \
+        == [long, 'b', long]
+    assert serve_and_decode(doc, 4096, decoder=field('a', Str),
+                            fmt='yaml') == [long, 'b']
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    '''Records the largest number of batches in flight.'''
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.lock = threading.Lock()
+        self.running = self.largest = 0
+
+    def submit(self, *args, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.largest = max(self.largest, self.running)
+        future = super().submit(*args, **kwargs)
+        future.add_done_callback(self.done)
+        return future
+
+    def done(self, future):
+        with self.lock:
+            self.running -= 1
+
+
+def test_adecode_stream_bounded():
+
+    lines = b''.join(b'{"a": %d}\n' % i for i in range(10000))
+
+    with CountingExecutor() as executor:
+        values = serve_and_decode(lines, 1 << 16, decoder=field('a', Int),
+                                  executor=executor, batch_size=10,
+                                  max_pending=3)
+
+    assert values == list(range(10000))
+    assert 1 <= executor.largest <= 3
@@ -0,0 +1,94 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import json
+
+from hypothesis             import given, settings
+
+import yaml
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary, mk_parser
+
+
+@settings(print_blob=True, max_examples=50)
+@given(gen_dictionary(3))
+def test_yaml_backends(dic):
+
+    parser = mk_parser(dic)
+
+    doc = yaml.dump(dic)
+
+    for backend in yaml_backends():
+        assert parse_yaml(doc, parser, backend=backend) == dic
+        assert parse_yaml(doc.encode('utf-8'), parser, backend=backend) == dic
+
+
+def test_json_bytes():
+
+    for backend in json_backends():
+        assert parse_json(b'{"a": [1, 2]}', field('a', List(Int)),
+                          backend=backend) == [1, 2]
+
+
+def test_set_backend():
+
+    calls = []
+
+    def load(doc):
+        calls.append(doc)
+        return json.loads(doc)
+
+    register_json_backend('recording', load)
+
+    try:
+        set_json_backend('recording')
+        assert parse_json('1', Int) == 1
+        assert parse_json('2', Int, backend='json') == 2
+        assert calls == ['1']
+    finally:
+        set_json_backend(None)
+
+    try:
+        set_yaml_backend('unknown')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_files_and_buffers(tmp_path):
+
+    decoder = field('a', List(Str))
+    doc = '{"a": ["été", "x"]}'
+    expected = ['été', 'x']
+
+    path = tmp_path / 'doc.json'
+    path.write_bytes(doc.encode('utf-8'))
+
+    for backend in yaml_backends():
+        assert parse_yaml(path, decoder, backend=backend) == expected
+        assert parse_yaml(memoryview(doc.encode('utf-8')), decoder,
+                          backend=backend) == expected
+
+    for backend in json_backends():
+        assert parse_json(path, decoder, backend=backend) == expected
+        assert parse_json(memoryview(doc.encode('utf-8')), decoder,
+                          backend=backend) == expected
+        assert parse_json(bytearray(doc.encode('utf-16')), decoder,
+                          backend=backend) == expected
+
+    empty = tmp_path / 'empty.yaml'
+    empty.write_bytes(b'')
+    assert parse_yaml(empty, null(0)) == 0
+
+    try:
+        parse_json(path, field('b', Int))
+        assert False
+    except DecodeError as e:
+        assert "Missing field: b" in str(e)
@@ -0,0 +1,92 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import pickle
+
+from hypothesis             import given, settings
+from hypothesis.strategies  import (integers, floats, text, booleans,
+                                    lists, fixed_dictionaries)
+
+from jazzml import *
+
+
+decoders = {'t': Float, 'x': Int, 'ok': Bool, 'label': Str,
+            'tags': List(Str)}
+
+records = lists(fixed_dictionaries({'t': floats(allow_nan=False),
+                                    'x': integers(),
+                                    'ok': booleans(),
+                                    'label': text(),
+                                    'tags': lists(text(), max_size=3)}),
+                max_size=20)
+
+rows = List(mapn(lambda *values: values,
+                 *[field(name, d) for name, d in decoders.items()]))
+
+
+@settings(print_blob=True)
+@given(records)
+def test_columns(docs):
+
+    status = Columns(decoders).at([], docs)
+
+    assert type(status) is StatusOk
+
+    columns = status.value
+    decoded = rows.at([], docs).value
+
+    for i, name in enumerate(decoders):
+        assert [v.item() if hasattr(v, 'item') else v
+                for v in columns[name]] == [r[i] for r in decoded]
+
+
+def test_columns_errors():
+
+    docs = [{'t': 0.5, 'x': 1, 'ok': True, 'label': 'a', 'tags': []},
+            {'t': 1.5, 'x': 2, 'ok': False, 'label': 'b', 'tags': ['b']},
+            {'t': 2.5, 'x': 3, 'ok': True, 'label': 'c', 'tags': ['c']}]
+
+    assert type(Columns(decoders).at([], docs)) is StatusOk
+
+    for i, name, value in [(2, 'x', 'three'), (1, 'label', None),
+                           (1, 'tags', [1]), (2, 't', None)]:
+        bad = [dict(d) for d in docs]
+        bad[i][name] = value
+        status = Columns(decoders).at([], bad)
+        expected = rows.at([], bad)
+        assert type(status) is type(expected)
+        assert status.path() == expected.path()
+        assert status.path()[0] == i
+
+    # The first failing row is reported, whatever the column.
+    bad = [dict(d) for d in docs]
+    bad[2]['t'] = None
+    del bad[1]['label']
+    status = Columns(decoders).at([], bad)
+    assert type(status) is StatusMissingField
+    assert status.path() == [1]
+
+    status = Columns(decoders).at([], docs[:1] + [[1, 2]])
+    assert type(status) is StatusBadType
+    assert status.path() == [1]
+
+    assert type(Columns(decoders).at([], {})) is StatusBadType
+
+
+def test_columns_types():
+
+    docs = [{'x': 2 ** 70, 'y': 1}, {'x': 1, 'y': 2.5}]
+
+    columns = Columns({'x': Int, 'y': Float}).at([], docs).value
+
+    assert list(columns['x']) == [2 ** 70, 1]
+    assert list(columns['y']) == [1.0, 2.5]
+
+    copy = pickle.loads(pickle.dumps(Columns({'x': Int, 'y': Float})))
+
+    assert list(copy.at([], docs).value['y']) == [1.0, 2.5]
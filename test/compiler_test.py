@@ -0,0 +1,166 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+from collections            import namedtuple
+from hypothesis             import given, settings, event
+
+from jazzml import *
+from jazzml import compile
+
+from jazzml_test import gen_dictionary, dict_depth, mk_parser, mk_app_parser
+
+
+mkPoint = namedtuple('Point', 'x y')
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(5))
+def test_compiled_parser(dic):
+
+    event("dict depth: {d}".format(d=dict_depth(dic)))
+
+    parser = compile(mk_parser(dic))
+
+    status = parser.at([], dic)
+
+    assert type(status) is StatusOk
+
+    assert status.value == dic
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(5))
+def test_compiled_app_parser(dic):
+
+    parser = compile(mk_app_parser(dic))
+
+    status = parser.at([], dic)
+
+    assert type(status) is StatusOk
+
+    assert status.value == dic
+
+
+def test_compiled_errors():
+
+    decoder = mapn(mkPoint,
+                   field('x', Int),
+                   optional_field('y', one_of([Int, this_str('none')]), 0))
+    compiled = compile(decoder)
+
+    docs = [{'x': 1, 'y': 2}, {'x': 1}, {'x': 1, 'y': 'none'},
+            {'y': 2}, {'x': 'a'}, {'x': 1, 'y': 'other'}, {'x': 1, 'y': 2.0}]
+
+    for doc in docs:
+        expected = decoder.at([], doc)
+        actual = compiled.at([], doc)
+        assert type(actual) is type(expected)
+        assert actual.message() == expected.message()
+        assert actual.path() == expected.path()
+        if type(expected) is StatusOk:
+            assert actual.value == expected.value
+
+
+def test_compiled_list():
+
+    decoder = compile(List(nullable(mapn(mkPoint, field('x', Int),
+                                         field('y', Float)), None)))
+
+    doc = '''
+        - x: 1
+          y: 2.5
+        -
+        - x: 3
+          y: 4
+        '''
+
+    assert parse_yaml(doc, decoder) == [mkPoint(1, 2.5), None, mkPoint(3, 4)]
+
+    status = decoder.at([], [{'x': 1, 'y': True}, {'x': 1, 'y': 'a'}])
+
+    assert type(status) is StatusBadType
+    assert status.path() == [1, 'y']
+
+
+def test_star_import():
+
+    names = {}
+    exec('from jazzml import *', names)
+
+    assert 'compile' not in names
+    assert 'parse_json' in names
+
+
+def test_compiled_constants():
+
+    inf = float('inf')
+    decoder = compile(mapn(lambda *vals: vals,
+                           optional_field('x', Float, inf),
+                           field('y', nullable(Float, -inf)),
+                           optional_field('z', Float, float('nan'))))
+
+    x, y, z = decoder.at([], {'y': None}).value
+    assert (x, y) == (inf, -inf)
+    assert z != z
+    assert decoder.at([], {'x': 1.5, 'y': 2.5}).value[:2] == (1.5, 2.5)
+
+
+def test_compiled_deep_nesting():
+
+    lists, doc, bad = Int, 1, 'a'
+    for _ in range(30):
+        lists = List(optional_field('x', nullable(lists, None), None))
+        doc = [{'x': doc}, {}, {'x': None}]
+        bad = [{}, {'x': bad}]
+    nullables = Int
+    for _ in range(150):
+        nullables = nullable(nullables, 0)
+
+    for decoder, ok, ko in ((lists, doc, bad), (nullables, 2, 'a')):
+        compiled = compile(decoder)
+        assert compiled.at([], ok).value == decoder.at([], ok).value
+        assert compiled.at([], ko).path() == decoder.at([], ko).path()
+
+
+def test_compiled_dispatch():
+
+    def message(kind):
+        return mapn(lambda k, x: (k, x), field('type', this_str(kind)),
+                    field('x', Int))
+
+    decoders = [one_of([message('a'), message('b'), message('c')]),
+                tagged('type', {'a': message('a'), 'b': message('b')})]
+
+    for decoder in decoders:
+        compiled = compile(decoder)
+        for doc in [{'type': 'a', 'x': 1}, {'type': 'b', 'x': 2},
+                    {'type': 'b', 'x': 'two'}, {'type': 'd', 'x': 1},
+                    {'x': 1}]:
+            expected = decoder.at([], doc)
+            status = compiled.at([], doc)
+            assert type(status) is type(expected)
+            assert status.path() == expected.path()
+            if type(status) is StatusOk:
+                assert status.value == expected.value
+
+
+def test_compiled_recursive():
+
+    tree = recursive(lambda tree: mapn(lambda v, c: (v, c),
+                                       field('value', Int),
+                                       field('children', List(tree))))
+    compiled = compile(tree)
+
+    doc = {'value': 1, 'children': [{'value': 2, 'children': []},
+                                    {'value': 3, 'children': [{}]}]}
+
+    assert compiled.at([], doc).path() == tree.at([], doc).path()
+    assert compiled._source.count('def ') == 2
+
+    del doc['children'][1]
+    assert compiled.at([], doc).value == tree.at([], doc).value
@@ -0,0 +1,179 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import dataclasses
+import datetime as dt
+import json
+import pickle
+
+import typing as t
+from typing import Any, Dict, List as ListOf, Literal, NamedTuple, Optional, \
+    TypedDict, Union
+
+from hypothesis             import given, settings
+from hypothesis.strategies  import (integers, lists, builds, none,
+                                    recursive as hp_recursive)
+
+from jazzml import *
+from jazzml import compile
+
+
+@dataclasses.dataclass
+class Line:
+    product: str
+    quantity: int = 1
+
+
+class Point(NamedTuple):
+    x: float
+    y: float = 0.0
+
+
+class Meta(TypedDict, total=False):
+    author: t.Required[str]
+    tags: ListOf[str]
+
+
+@dataclasses.dataclass
+class Order:
+    id: int
+    lines: list[Line]
+    at: dt.datetime
+    where: Optional[Point]
+    meta: Meta
+    paid: bool = False
+    note: Optional[str] = None
+    notes: list[str] = dataclasses.field(default_factory=list)
+    extra: Any = None
+
+
+@dataclasses.dataclass
+class Tree:
+    value: int
+    children: 'list[Tree]'
+
+
+@dataclasses.dataclass
+class Even:
+    value: int
+    next: 'Optional[Odd]' = None
+
+
+@dataclasses.dataclass
+class Odd:
+    value: int
+    next: Optional[Even] = None
+
+
+@dataclasses.dataclass
+class Circle:
+    kind: Literal['circle']
+    radius: float
+
+
+@dataclasses.dataclass
+class Square:
+    kind: Literal['square']
+    side: float
+
+
+@dataclasses.dataclass
+class Drawing:
+    shapes: list[Union[Circle, Square]]
+
+
+@dataclasses.dataclass
+class Options:
+    name: str
+    verbose: bool = dataclasses.field(default=False, kw_only=True)
+
+
+def test_derive():
+
+    doc = {'id': 1, 'lines': [{'product': 'a'}, {'product': 'b',
+                                                 'quantity': 2}],
+           'at': '01-02-2024', 'where': {'x': 1}, 'meta': {'author': 'me'},
+           'note': None}
+    order = derive(Order)
+    expected = Order(1, [Line('a'), Line('b', 2)], dt.datetime(2024, 2, 1),
+                     Point(1, 0.0), {'author': 'me'})
+
+    assert parse_json(json.dumps(doc), order) == expected
+    assert compile(order).at([], doc).value == expected
+    assert pickle.loads(pickle.dumps(order)).at([], doc).value == expected
+    assert order.at([], doc).value.notes is not \
+        order.at([], doc).value.notes
+
+    assert derive(Order) is order
+    assert derive(list[Order]).at([], [doc]).value == [expected]
+    assert derive(Order, '%Y-%m-%d') is not order
+
+    bad = dict(doc, where={'y': 1})
+    assert type(order.at([], bad)) is StatusMissingField
+    assert order.at([], bad).path() == ['where']
+    assert derive(Order, strict=True).at([], dict(doc, other=1)) \
+        .path() == []
+
+    assert derive(Options).at([], {'name': 'a', 'verbose': True}).value \
+        == Options('a', verbose=True)
+
+
+def test_derive_recursive():
+
+    tree = derive(Tree)
+    doc = {'value': 1, 'children': [{'value': 2, 'children': []},
+                                    {'value': 3, 'children': [
+                                        {'value': 4, 'children': []}]}]}
+    expected = Tree(1, [Tree(2, []), Tree(3, [Tree(4, [])])])
+
+    assert tree._spec[0] == 'recursive'
+    assert tree.at([], doc).value == expected
+    assert pickle.loads(pickle.dumps(tree)).at([], doc).value == expected
+    assert stackless(tree).at([], doc).value == expected
+
+    chain = {'value': 0, 'next': {'value': 1, 'next': {'value': 2}}}
+    assert derive(Even).at([], chain).value == Even(0, Odd(1, Even(2)))
+    assert derive(Odd).at([], chain).value == Odd(0, Even(1, Odd(2)))
+
+    # Not recursive: no knot.
+    assert derive(Line)._spec[0] == 'record'
+
+
+def test_derive_union():
+
+    drawing = derive(Drawing)
+    doc = {'shapes': [{'kind': 'square', 'side': 2},
+                      {'kind': 'circle', 'radius': 1}]}
+
+    assert drawing.at([], doc).value == Drawing([Square('square', 2),
+                                                 Circle('circle', 1)])
+    status = drawing.at([], {'shapes': [{'kind': 'square', 'radius': 1}]})
+    assert type(status) is StatusTagFailed
+
+
+def test_derive_unsupported():
+
+    @dataclasses.dataclass
+    class Bad:
+        counts: Dict[str, int]
+
+    try:
+        derive(Bad)
+        assert False
+    except TypeError as e:
+        assert 'Bad.counts' in str(e)
+
+
+@settings(print_blob=True, max_examples=50)
+@given(hp_recursive(builds(Tree, integers(), lists(none(), max_size=0)),
+                    lambda trees: builds(Tree, integers(),
+                                         lists(trees, max_size=4)),
+                    max_leaves=20))
+def test_derive_roundtrip(value):
+
+    assert derive(Tree).at([], dataclasses.asdict(value)).value == value
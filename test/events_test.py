@@ -0,0 +1,232 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import io
+import json
+
+from hypothesis             import given, settings, event
+from hypothesis.strategies  import integers
+
+import yaml
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary, dict_depth
+
+
+def mk_projection(dic, keep):
+    '''A Decoder reading one out of `keep` keys of `dic` (recursively).'''
+
+    def go(i, k):
+        v = dic[k]
+        if type(v) is dict:
+            vdec = mk_projection(v, keep)
+        elif type(v) is list:
+            vdec = List(Int)
+        else:
+            vdec = noop
+        return field(k, vdec)
+
+    decoders = [go(i, k) for i, k in enumerate(dic.keys()) if i % keep == 0]
+    return mapn(lambda *vals: vals, *decoders)
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(4), integers(min_value=1, max_value=3))
+def test_parse_json_events(dic, keep):
+
+    event("dict depth: {d}".format(d=dict_depth(dic)))
+
+    decoder = mk_projection(dic, keep)
+
+    doc = json.dumps(dic)
+
+    expected = parse_json(doc, decoder)
+
+    assert parse_json_events(doc, decoder) == expected
+    assert parse_json_events(io.StringIO(doc), decoder, chunk_size=7) == expected
+    assert parse_json_events(io.BytesIO(doc.encode('utf-8')), decoder,
+                             chunk_size=5) == expected
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(4), integers(min_value=1, max_value=3))
+def test_parse_yaml_events(dic, keep):
+
+    decoder = mk_projection(dic, keep)
+
+    doc = yaml.dump(dic)
+
+    expected = parse_yaml(doc, decoder)
+
+    assert parse_yaml_events(doc, decoder) == expected
+    assert parse_yaml_events(doc, decoder, loader=yaml.FullLoader) == expected
+
+
+def test_events_errors():
+
+    decoder = field('a', List(field('x', Int)))
+
+    for parse in (parse_json_events, parse_yaml_events):
+        try:
+            parse('{"a": [{"x": 1}, {"y": 2}], "b": [1, 2]}', decoder)
+            assert False
+        except DecodeError as e:
+            assert str(e) == "Missing field: x in path '['a', 1]'"
+
+    try:
+        parse_json_events('{"a": [{"x": 1}], "b": [1, 2}', decoder)
+        assert False
+    except ValueError:
+        pass
+
+    # The quoted values are pruned.
+    decoder = mapn(lambda a, b: (a, b), field('a', Bool), List(Int))
+    for parse in (parse_json_events, parse_yaml_events):
+        try:
+            parse('{"a": true, "b": 2}', decoder)
+            assert False
+        except DecodeError as e:
+            assert str(e) == "Bad Type: expected type list but read value " \
+                "'{'a': True}' in path '[]'"
+
+
+def test_yaml_events_anchors():
+
+    doc = '''
+        defaults: &defaults
+          x: 1
+          y: 2
+        skipped: &point {x: 3, y: 4}
+        points:
+          - *point
+          - <<: *defaults
+            y: 5
+        '''
+
+    decoder = field('points', List(mapn(lambda x, y: (x, y),
+                                        field('x', Int), field('y', Int))))
+
+    assert parse_yaml_events(doc, decoder) == parse_yaml(doc, decoder)
+
+    # Repeated merge keys and lists of merged mappings.
+    doc = '''
+        b: &b {x: 1, y: 1}
+        o: &o {x: 10, y: 10, z: 10}
+        values:
+          - {<<: *b, <<: *o}
+          - {<<: *o, <<: *b}
+          - {<<: [*b, *o]}
+          - {<<: [*o, *b], <<: {y: 2}, x: 3}
+        '''
+
+    decoder = field('values', List(mapn(lambda x, y, z: (x, y, z),
+                                        field('x', Int), field('y', Int),
+                                        optional_field('z', Int, 0))))
+
+    assert parse_yaml_events(doc, decoder) == parse_yaml(doc, decoder) \
+        == [(10, 10, 10), (1, 1, 10), (1, 1, 10), (3, 2, 10)]
+
+
+def test_iter_events():
+
+    values = [{'x': i, 'other': list(range(i))} for i in range(20)]
+
+    decoder = field('x', Int)
+
+    assert list(iter_json_events(io.StringIO(json.dumps(values)), decoder,
+                                 chunk_size=3)) == list(range(20))
+    assert list(iter_yaml_events(yaml.dump(values), decoder)) == list(range(20))
+
+    items = iter_json_events('[{"x": 1}, {"x": "a"}]', decoder)
+
+    assert next(items) == 1
+
+    try:
+        next(items)
+        assert False
+    except DecodeError as e:
+        assert "in path '[1, 'x']'" in str(e)
+
+
+class CountingReader(io.BytesIO):
+    '''Records the sizes of the reads.'''
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.sizes = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super().read(size)
+
+
+def test_large_file_events():
+
+    values = [{'x': i, 'y': 'v%d' % i, 'z': [i, {'a': 'b' * (i % 7)}]}
+              for i in range(20000)]
+    doc = json.dumps({'values': values, 'long': 'c' * 3000000, 'n': 1})
+
+    for decoder, expected in ((field('values', noop), values),
+                              (field('n', Int), 1)):
+        assert parse_json_events(io.BytesIO(doc.encode('utf-8')), decoder,
+                                 chunk_size=4096) == expected
+
+    # A string longer than the chunks is read by chunks of growing size.
+    reader = CountingReader(doc.encode('utf-8'))
+    assert parse_json_events(reader, field('long', Str),
+                             chunk_size=4096) == 'c' * 3000000
+    assert len(reader.sizes) < len(doc) // 4096 // 2
+
+    items = iter_json_events(CountingReader(json.dumps(values).encode()),
+                             field('x', Int), chunk_size=4096)
+    assert list(items) == list(range(20000))
+
+
+def test_recursive_events():
+
+    tree = recursive(lambda tree: mapn(lambda v, c: (v, c),
+                                       field('value', Int),
+                                       optional_field('children',
+                                                      List(tree), [])))
+    doc = json.dumps({'value': 1, 'skipped': [1, 2],
+                      'children': [{'value': 2, 'skipped': {'a': 1}}]})
+
+    assert parse_json_events(doc, tree) == parse_json(doc, tree)
+    assert parse_yaml_events(doc, tree) == parse_yaml(doc, tree)
+
+
+def test_nullable_events():
+
+    chain = recursive(lambda chain: mapn(lambda v, n: (v, n),
+                                         field('v', Int),
+                                         field('n', nullable(chain, None))))
+    decoders = [field('a', nullable(succeed('present'), 'null')),
+                field('a', nullable(mapn(lambda: 'present'), 'null')),
+                field('a', nullable(one_of([fail('no'), succeed(1)]), 0)),
+                field('a', nullable(field('x', Int), 0)),
+                field('a', nullable(List(nullable(succeed(1), 0)), [])),
+                chain]
+    docs = [{'a': {'x': 1}}, {'a': None}, {'a': [None, [1], {}]}, {'a': 3},
+            {'v': 1, 'n': {'v': 2, 'n': None, 'z': [1]}}]
+
+    def outcome(parse, doc, decoder):
+        try:
+            return parse(doc, decoder)
+        except DecodeError as e:
+            return e.errors[0].path()
+        except TypeError:
+            # `field` on a scalar.
+            return TypeError
+
+    for decoder in decoders:
+        for dic in docs:
+            doc = json.dumps(dic)
+            expected = outcome(parse_json, doc, decoder)
+            assert outcome(parse_json_events, doc, decoder) == expected
+            assert outcome(parse_yaml_events, doc, decoder) == expected
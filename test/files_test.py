@@ -0,0 +1,85 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import os
+
+from jazzml import *
+
+
+decoder = mapn(lambda name, flags: (name, flags),
+               field('name', Str), field('flags', List(Str)))
+
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_parse_file_cache(tmp_path):
+
+    cache = FileCache(maxsize=2)
+    flags = tmp_path / 'flags.yaml'
+    write(flags, 'name: a\nflags: [x, y]\n', 10 ** 9)
+
+    first = parse_yaml_file(flags, decoder, cache=cache)
+    assert first == ('a', ['x', 'y'])
+    assert parse_yaml_file(str(flags), decoder, cache=cache) is first
+    assert cache.info().hits == 1
+    assert cache.info().misses == 1
+
+    # Another Decoder is another entry.
+    assert parse_yaml_file(flags, field('name', Str), cache=cache) == 'a'
+    assert cache.info().misses == 2
+
+    write(flags, 'name: b\nflags: []\n', 2 * 10 ** 9)
+    assert parse_yaml_file(flags, decoder, cache=cache) == ('b', [])
+
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) \
+        == (1, 3, 1, 2)
+
+    write(flags, 'name: 1\nflags: []\n', 3 * 10 ** 9)
+    try:
+        parse_yaml_file(flags, decoder, cache=cache)
+        assert False
+    except DecodeError as e:
+        assert e.errors[0].path() == ['name']
+
+    cache.clear()
+    assert cache.info() == CacheInfo(0, 0, 0, 0, 2, 0)
+
+
+def test_parse_file_hash(tmp_path):
+
+    cache = FileCache(check='hash')
+    routes = tmp_path / 'routes.json'
+    write(routes, '{"name": "r", "flags": ["1"]}', 10 ** 9)
+
+    assert parse_json_file(routes, decoder, cache=cache) == ('r', ['1'])
+
+    # Same size and modification time, different content.
+    write(routes, '{"name": "s", "flags": ["1"]}', 10 ** 9)
+    assert parse_json_file(routes, decoder, cache=cache) == ('s', ['1'])
+    assert cache.info().misses == 2
+
+
+def test_parse_file_disk_cache(tmp_path):
+
+    directory = tmp_path / 'cache'
+    flags = tmp_path / 'flags.yaml'
+    flags.write_text('name: a\nflags: [x]\n')
+
+    cold = FileCache(directory=directory)
+    assert parse_yaml_file(flags, decoder, cache=cold) == ('a', ['x'])
+    assert cold.info().disk_hits == 0
+    assert len(os.listdir(directory)) == 1
+
+    # Another process: the loaded document is read from the disk cache.
+    warm = FileCache(directory=directory)
+    assert parse_yaml_file(flags, decoder, cache=warm) == ('a', ['x'])
+    assert warm.info().disk_hits == 1
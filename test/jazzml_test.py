@@ -8,18 +8,23 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import hypothesis.strategies as hp
 
-from functools              import reduce
+from functools              import reduce, partial
 from hypothesis             import (given, settings, event, assume,
                                    reproduce_failure)
 from hypothesis.strategies  import (text, integers, floats, booleans,
                                     lists, floats, just, dictionaries,
                                     one_of)
 from math                   import isnan
+from array                  import array
 
+import datetime as dt
+import json
+import pickle
 import tempfile as tf
 import yaml
 
 from jazzml import *
+from jazzml import compile
 
 def gen_dictionary(depth):
     any_value = [integers(), text(), just(None), booleans(),
@@ -246,3 +251,412 @@ def test_optional_field(dic, key, default):
     assert type(status) is StatusOk
 
     assert status.value == default + 1
+
+
+def test_user_decoder():
+
+    def decode_even(path, v):
+        if type(v) is int and v % 2 == 0:
+            return StatusOk(v)
+        else:
+            return StatusNok(path, "not even")
+
+    even = Decoder(decode_even)
+
+    assert parse_json('[2, 4]', List(even)) == [2, 4]
+
+    status = List(even).at([], [2, 3])
+
+    assert type(status) is StatusNok
+    assert status.message() == "not even"
+    assert status.path() == [1]
+
+    def decode_pairs(path, v):
+        # The path is a list of its own.
+        path.append('pair')
+        return Int.at(path + [0], v[0])
+
+    status = field('a', List(Decoder(decode_pairs))).at([], {'a': [['x']]})
+    assert status.path() == ['a', 0, 'pair', 0]
+
+
+def test_failures_are_compact():
+
+    status = this_str('a').at([], 'b')
+
+    assert type(status) is StatusBadValue
+    assert not hasattr(status, '__dict__')
+    assert status.message().startswith('Expected: ')
+
+
+def test_error_path():
+
+    decoder = field('a', List(mapn(lambda x, y: (x, y),
+                                   field('x', Int),
+                                   optional_field('y', Int, 0))))
+
+    status = decoder.at([], {'a': [{'x': 1}, {'x': 2, 'y': 3}, {'x': 'b'}]})
+
+    assert type(status) is StatusBadType
+    assert status.path() == ['a', 2, 'x']
+
+    try:
+        parse_json('{"a": [{"x": 1, "y": null}]}', decoder)
+        assert False
+    except ValueError as e:
+        assert "in path '['a', 0, 'y']'" in str(e)
+
+
+def test_susp_path():
+
+    thunks = parse_json('{"a": [{"x": 1}, {"x": "b"}]}',
+                        field('a', List(susp(field('x', Int)))))
+
+    assert thunks[0]() == 1
+
+    try:
+        thunks[1]()
+        assert False
+    except ValueError as e:
+        assert "in path '['a', 1, 'x']'" in str(e)
+
+
+def test_susp_memoized():
+
+    calls = []
+
+    def count(path, v):
+        calls.append(v)
+        return StatusOk(v) if v > 0 else StatusNok(path, 'negative')
+
+    for decoder in [susp(Decoder(count)), stackless(susp(Decoder(count)),
+                                                    hybrid=False)]:
+        calls.clear()
+        good, bad = decoder.at([], 1).value, decoder.at([], -1).value
+
+        assert good() == good() == 1
+        for _ in range(2):
+            try:
+                bad()
+                assert False
+            except ValueError as e:
+                assert 'negative' in str(e)
+        assert calls == [1, -1]
+
+
+def test_lazy_record():
+
+    calls = []
+
+    def counted(decoder):
+        def decode(path, v):
+            calls.append(path)
+            return decoder.at(path, v)
+        return Decoder(decode)
+
+    record = lazy_record(dict, {'id': counted(field('id', Int)),
+                                'size': counted(field('size', Int)),
+                                'tags': field('tags', List(Str))})
+    doc = {'id': 1, 'size': 'big', 'tags': ['a']}
+    r = parse_json(json.dumps(doc), record)
+
+    assert calls == []
+    assert r.id == 1 and r.id == 1
+    assert len(calls) == 1
+    assert repr(r) == 'dict(id=1, size=..., tags=...)'
+
+    for _ in range(2):
+        try:
+            r.size
+            assert False
+        except ValueError as e:
+            assert "in path '['size']'" in str(e)
+    assert len(calls) == 2
+
+    try:
+        r.id = 2
+        assert False
+    except AttributeError:
+        pass
+
+    assert not hasattr(r, '__dict__')
+    assert lazy_record(dict, {'id': field('id', Int)}).at([], doc).value() \
+        == {'id': 1}
+    copy = pickle.loads(pickle.dumps(lazy_record(
+        dict, {'id': field('id', Int), 'size': field('size', Int)})))
+    assert copy.at([], dict(doc, size=2)).value() == {'id': 1, 'size': 2}
+
+    try:
+        lazy_record(dict, {'_value': Int})
+        assert False
+    except ValueError:
+        pass
+
+
+def mk_message(kind, payload_field):
+    return mapn(lambda kind, value: (kind, value),
+                field('type', this_str(kind)),
+                field(payload_field, Int))
+
+
+def test_tagged():
+
+    decoder = tagged('type', {'a': mk_message('a', 'x'),
+                              'b': mk_message('b', 'y')})
+
+    assert parse_json('{"type": "b", "y": 2}', decoder) == ('b', 2)
+
+    status = decoder.at([], {'type': 'c'})
+    assert type(status) is StatusUnknownTag
+    assert "'c'" in status.message()
+
+    status = decoder.at([], {'x': 1})
+    assert type(status) is StatusMissingField
+
+    status = decoder.at([], {'type': ['a']})
+    assert type(status) is StatusUnknownTag
+
+    status = decoder.at([], {'type': 'a', 'x': 'one'})
+    assert type(status) is StatusTagFailed
+    assert status.path() == ['x']
+    assert "'a'" in status.message()
+
+
+def test_one_of_dispatch():
+
+    kinds = ['k{i}'.format(i=i) for i in range(10)]
+    decoder = one_of([mk_message(k, 'x') for k in kinds])
+
+    for k in kinds:
+        assert decoder.at([], {'type': k, 'x': 1}).value == (k, 1)
+
+    status = decoder.at([], {'type': 'unknown', 'x': 1})
+    assert type(status) is StatusUnknownTag
+
+    status = decoder.at([], {'type': 'k3', 'x': None})
+    assert type(status) is StatusTagFailed
+    assert status.path() == ['x']
+
+    status = decoder.at([], {'x': 1})
+    assert type(status) is StatusOneOfNoDecoder
+
+    status = decoder.at([], [1])
+    assert type(status) is StatusOneOfNoDecoder
+
+
+def test_one_of_dispatch_order():
+
+    # The untagged alternatives are still tried, in their original order.
+    decoder = one_of([mk_message('a', 'x'),
+                      mapn(lambda v: ('any', v), field('x', Int)),
+                      mk_message('b', 'x'),
+                      mk_message('b', 'y')])
+
+    assert decoder.at([], {'type': 'a', 'x': 1}).value == ('a', 1)
+    assert decoder.at([], {'type': 'b', 'x': 1}).value == ('any', 1)
+    assert decoder.at([], {'type': 'b', 'y': 1}).value == ('b', 1)
+    assert decoder.at([], {'type': 'c', 'x': 1}).value == ('any', 1)
+
+    status = decoder.at([], {'type': 'c', 'y': 1})
+    assert type(status) is StatusOneOfNoDecoder
+
+
+def mk_tree(tree):
+    return mapn(lambda value, children: (value, children),
+                field('value', Int),
+                optional_field('children', List(tree), []))
+
+
+def test_recursive():
+
+    tree = recursive(mk_tree)
+
+    doc = {'value': 1, 'children': [{'value': 2},
+                                    {'value': 3, 'children': [{'value': 4}]}]}
+
+    assert tree.at([], doc).value == (1, [(2, []), (3, [(4, [])])])
+
+    doc['children'][1]['children'][0]['value'] = 'four'
+    status = tree.at([], doc)
+    assert type(status) is StatusBadType
+    assert status.path() == ['children', 1, 'children', 0, 'value']
+
+
+def test_recursive_deep():
+
+    doc = {'value': 0}
+    for i in range(1, 200):
+        doc = {'value': i, 'children': [doc]}
+
+    assert recursive(mk_tree).at([], doc).value[0] == 199
+
+
+def test_lazy_builds_once():
+
+    calls = []
+
+    def factory():
+        calls.append(None)
+        return Int
+
+    decoder = List(lazy(factory))
+
+    assert decoder.at([], [1, 2, 3]).value == [1, 2, 3]
+    assert len(calls) == 1
+
+
+def test_primitive_lists():
+
+    values = [1, 2, 3]
+
+    assert List(Int).at([], values).value is values
+    assert List(Float).at([], [1, 2.5]).value == [1, 2.5]
+    assert List(Str).at([], []).value == []
+
+    status = List(Int).at([], [1, 2, True, 'a'])
+    assert type(status) is StatusBadType
+    assert status.path() == [2]
+
+    status = field('a', List(Str)).at([], {'a': 'abc'})
+    assert type(status) is StatusBadType
+    assert status.path() == ['a']
+
+    assert List(Float, 'd').at([], values).value == array('d', [1, 2, 3])
+    assert List(Int, 'q').at([], values).value == array('q', [1, 2, 3])
+
+    status = List(Int, 'q').at([], [1, 2 ** 70])
+    assert type(status) is StatusBadType
+    assert status.path() == [1]
+
+    status = List(Int, 'q').at([], [1, 'a'])
+    assert type(status) is StatusBadType
+    assert status.path() == [1]
+
+
+def test_applicative_chain():
+
+    def f(*args):
+        return args
+
+    fields = [field(str(i), Int) for i in range(10)]
+    doc = {str(i): i for i in range(10)}
+
+    chain = succeed(f)
+    for d in fields[:-1]:
+        chain = chain * d
+
+    assert type(chain.at([], doc).value) is partial
+    assert chain.at([], doc).value() == tuple(range(9))
+    assert (chain @ fields[-1]).at([], doc).value == tuple(range(10))
+
+    # The chain is not shared with the Decoders built on it.
+    other = chain * field('other', Str)
+    assert (chain @ fields[-1]).at([], doc).value == tuple(range(10))
+    assert (other @ fields[-1]).at([], dict(doc, other='o')).value \
+        == tuple(range(9)) + ('o', 9)
+
+    status = (chain @ fields[-1]).at([], dict(doc, **{'3': 'x', '5': 'y'}))
+    assert status.path() == ['3']
+
+    # A Decoder yielding the function.
+    g = field('f', Str).then(lambda name: succeed({'tuple': f}[name]))
+    doc = {'f': 'tuple', 'a': 1, 'b': 2}
+    assert (g * field('a', Int) @ field('b', Int)).at([], doc).value == (1, 2)
+    assert compile(g * field('a', Int) @ field('b', Int)).at([], doc).value \
+        == (1, 2)
+
+
+DATE_FORMATS = ['%d-%m-%Y', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S',
+                '%Y-%m-%d %H:%M', '%Y%m%d%H%M', '%d/%m/%Y %H:%M:%S', '%H:%M',
+                '%m%%%Y', '%b %d %Y']
+
+
+def gen_date_string(the_format):
+    # Dates following `the_format`, some of their characters replaced.
+    changes = lists(hp.tuples(integers(0, 30),
+                              hp.sampled_from('0123456789-:/ T%²٣+_')),
+                    max_size=2)
+    return hp.tuples(hp.datetimes(), changes).map(
+        lambda t: ''.join(dict(t[1]).get(i, c) for i, c
+                          in enumerate(t[0].strftime(the_format))))
+
+
+@settings(print_blob=True, max_examples=300)
+@given(hp.sampled_from(DATE_FORMATS).flatmap(
+    lambda f: hp.tuples(just(f), gen_date_string(f))))
+def test_date(args):
+
+    the_format, s = args
+    try:
+        expected = dt.datetime.strptime(s, the_format)
+    except ValueError:
+        expected = None
+
+    for decoder in [date(the_format), date(the_format, cache=4),
+                    compile(field('d', date(the_format)))]:
+        status = (decoder.at([], {'d': s}) if decoder._spec[0] == 'compiled'
+                  else decoder.at([], s))
+        if expected is None:
+            assert type(status) is StatusBadType
+        else:
+            assert status.value == expected
+
+
+def point(*values):
+    return values
+
+
+def test_record():
+
+    line = record(point, x=Int, y=Float, label=(nullable(Str, ''), 'none'))
+    decoder = record(point, {'id': Int, 'lines': List(line)}, strict=True)
+    equivalent = mapn(point, field('id', Int),
+                      field('lines', List(mapn(
+                          point, field('x', Int), field('y', Float),
+                          optional_field('label', nullable(Str, ''),
+                                         'none')))))
+
+    docs = [{'id': 1, 'lines': [{'x': 1, 'y': 2.5}, {'x': 2, 'y': 1,
+                                                     'label': None}]},
+            {'id': 1, 'lines': [{'x': 1}]},
+            {'id': 1, 'lines': [{'x': 1, 'y': 'a'}]},
+            {'lines': [], 'id': 'a'}]
+    for doc in docs:
+        expected = equivalent.at([], doc)
+        for d in [decoder, compile(decoder), stackless(decoder, False)]:
+            status = d.at([], doc)
+            assert type(status) is type(expected)
+            assert status.path() == expected.path()
+            if type(status) is StatusOk:
+                assert status.value == expected.value
+        check = decoder.check(doc)
+        assert type(check) is type(expected)
+        assert check.path() == expected.path()
+        if type(expected) is StatusOk:
+            assert parse_json_events(json.dumps(doc), decoder) \
+                == expected.value
+
+    unknown = {'id': 1, 'lines': [], 'other': 2}
+    for d in [decoder, compile(decoder), stackless(decoder, False)]:
+        status = d.at([], unknown)
+        assert type(status) is StatusUnknownField
+        assert 'other' in status.message()
+    assert type(decoder.check(unknown)) is StatusUnknownField
+    assert record(point, id=Int).at([], unknown).value == (1,)
+
+    try:
+        parse_json(json.dumps({'lines': [{'x': 'a'}], 'other': 1}), decoder,
+                   max_errors=None)
+        assert False
+    except DecodeError as e:
+        assert [(type(s), s.path()) for s in e.errors] \
+            == [(StatusMissingField, []), (StatusBadType, ['lines', 0, 'x']),
+                (StatusMissingField, ['lines', 0]), (StatusUnknownField, [])]
+
+    # Tagged records select the alternatives of one_of.
+    messages = one_of([record(point, type=this_str('a'), x=Int),
+                       record(point, type=this_str('b'), y=Int)])
+    status = messages.at([], {'type': 'b', 'y': 'one'})
+    assert type(status) is StatusTagFailed
+    assert pickle.loads(pickle.dumps(decoder)).at([], docs[0]).value \
+        == decoder.at([], docs[0]).value
@@ -0,0 +1,210 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import pickle
+import sys
+import threading
+
+from collections            import namedtuple
+from hypothesis             import given, settings
+from hypothesis.strategies  import integers, lists, one_of as hp_one_of, \
+    text
+
+import yaml
+
+from jazzml import *
+from jazzml import compile
+
+from jazzml_test import gen_dictionary
+
+
+Point = namedtuple('Point', 'x y')
+
+point_decoder = mapn(Point, field('x', Int),
+                     optional_field('y', one_of([Int, null(0)]), -1))
+
+
+def mk_pickle_parser(dic):
+
+    def go(k):
+        v = dic[k]
+        if type(v) is dict:
+            return field(k, mk_pickle_parser(v))
+        elif type(v) is list:
+            return field(k, List(Int))
+        else:
+            return field(k, one_of([Int, Str, Bool, Float, null(None)]))
+
+    return mapn(_to_dict(list(dic.keys())), *[go(k) for k in dic.keys()])
+
+
+class _to_dict:
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __call__(self, *values):
+        return dict(zip(self.keys, values))
+
+
+@settings(print_blob=True, max_examples=50)
+@given(gen_dictionary(3))
+def test_pickle(dic):
+
+    parser = mk_pickle_parser(dic)
+
+    copy = pickle.loads(pickle.dumps(parser))
+
+    assert copy.at([], dic).value == dic
+
+
+def test_decode_many():
+
+    docs = [yaml.dump({'x': i, 'y': None if i % 3 else i}) for i in range(50)]
+    expected = [(i, Point(i, 0 if i % 3 else i)) for i in range(50)]
+
+    assert list(decode_many(docs, point_decoder, workers=2, chunksize=4)) == expected
+    assert sorted(decode_many(docs, point_decoder, workers=2, chunksize=4,
+                              ordered=False)) == expected
+    assert list(decode_many(docs, point_decoder, workers=1)) == expected
+
+
+def test_decode_many_lazy():
+
+    read = []
+
+    def docs():
+        for i in range(2000):
+            read.append(i)
+            yield '{"x": %d}' % i
+
+    for ordered in (True, False):
+        read.clear()
+        results = decode_many(docs(), point_decoder, workers=2, fmt='json',
+                              chunksize=4, ordered=ordered)
+        next(results)
+        # At most 2 * workers chunks in flight, plus the completed ones
+        # being yielded.
+        assert len(read) <= 2 * (2 * 2) * 4
+        assert len(list(results)) == 1999
+        assert len(read) == 2000
+
+
+def test_decode_many_errors(tmp_path):
+
+    paths = []
+    for i, doc in enumerate(['{"x": 1}', '{"x": "a"}', '{"x": ', '{"x": 4}']):
+        path = tmp_path / f'doc{i}.json'
+        path.write_text(doc)
+        paths.append(path)
+
+    errors = []
+
+    decoded = list(decode_many(paths, point_decoder, workers=2, fmt='json',
+                               chunksize=1, errors=errors))
+
+    assert decoded == [(0, Point(1, -1)), (3, Point(4, -1))]
+    assert [e.document for e in errors] == [1, 2]
+    assert type(errors[0].status) is StatusBadType
+
+    try:
+        list(decode_many(paths, point_decoder, workers=2, fmt='json'))
+        assert False
+    except DocumentError as e:
+        assert e.document == 1
+
+
+def mk_tree(tree):
+    return mapn(Point, field('x', Int), optional_field('y', List(tree), []))
+
+
+def test_pickle_recursive():
+
+    tree = recursive(mk_tree)
+    copy = pickle.loads(pickle.dumps(tree))
+    doc = {'x': 1, 'y': [{'x': 2}, {'x': 3, 'y': []}]}
+
+    assert copy.at([], doc).value == tree.at([], doc).value
+
+
+@settings(print_blob=True, max_examples=50)
+@given(lists(hp_one_of(integers(), text()), max_size=100))
+def test_parallel_list(values):
+
+    items = [{'x': v} for v in values]
+    decoder = field('x', Int)
+    expected = List(decoder).at([], items)
+
+    for chunk in (1, 7, 100):
+        parallel = ParallelList(decoder, workers=3, chunk=chunk, min_size=0,
+                                serial_on_gil=False)
+        for d in (parallel, compile(parallel),
+                  pickle.loads(pickle.dumps(parallel))):
+            status = d.at([], items)
+            assert type(status) is type(expected)
+            assert status.path() == expected.path()
+            if type(status) is StatusOk:
+                assert status.value == expected.value
+
+
+class Counted:
+    '''A decoding function counting its calls and their threads.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.threads = set()
+
+    def __call__(self, path, v):
+        with self.lock:
+            self.count += 1
+            self.threads.add(threading.current_thread())
+        return StatusOk(v) if v >= 0 else StatusBadValue(path, 'positive', v)
+
+
+def test_parallel_list_errors():
+
+    counted = Counted()
+    decoder = ParallelList(Decoder(counted), workers=4, chunk=10,
+                           serial_on_gil=False)
+
+    values = list(range(100000))
+    values[0] = values[5] = values[50] = -1
+    status = decoder.at([], values)
+    assert status.path() == [0]
+    # The chunks after the first failure are not decoded.
+    assert counted.count < len(values) // 2
+
+    values[0] = 0
+    assert decoder.at([], values).path() == [5]
+
+    nested = ParallelList(ParallelList(Int, workers=2, chunk=2, min_size=0,
+                                       serial_on_gil=False),
+                          workers=2, chunk=2, min_size=0, serial_on_gil=False)
+    lists_ = [[i, i + 1] for i in range(50)]
+    assert nested.at([], lists_).value == lists_
+
+
+def test_parallel_list_serial():
+
+    counted = Counted()
+    values = list(range(5000))
+
+    serial = ParallelList(Decoder(counted), workers=4, chunk=10)
+    assert serial.at([], values).value == values
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    if is_gil_enabled is None or is_gil_enabled():
+        assert counted.threads == {threading.current_thread()}
+
+    counted.threads.clear()
+    small = ParallelList(Decoder(counted), workers=4, chunk=10, min_size=100,
+                         serial_on_gil=False)
+    assert small.at([], values[:99]).value == values[:99]
+    assert counted.threads == {threading.current_thread()}
+
+    assert type(ParallelList(Int).at([], {})) is StatusBadType
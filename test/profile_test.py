@@ -0,0 +1,80 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import json
+import pickle
+
+from hypothesis             import given, settings
+
+from jazzml import *
+from jazzml import compile
+
+from jazzml_test import gen_dictionary, mk_parser, mk_app_parser
+
+
+@settings(print_blob=True, max_examples=50)
+@given(gen_dictionary(3))
+def test_profiling_same_values(dic):
+
+    for parser in [mk_parser(dic), mk_app_parser(dic)]:
+        with profiling() as profile:
+            status = parser.named('root').at([], dic)
+
+        assert status.value == dic
+        assert profile.stats['root'].calls == 1
+
+
+def test_profiling():
+
+    item = mapn(lambda i, p: (i, p), field('id', Int), field('price', Float))
+    message = one_of([mapn(lambda k, x: x, field('kind', this_str('a')),
+                           field('x', Int)),
+                      field('y', Int)])
+    tree = recursive(lambda tree: mapn(lambda v, c: (v, c),
+                                       field('v', Int),
+                                       optional_field('c', List(tree), [])))
+    order = mapn(lambda items, messages, tree: (items, messages, tree),
+                 field('items', List(item).named('order.items')),
+                 field('messages', List(message)),
+                 field('tree', tree))
+    doc = {'items': [{'id': i, 'price': 1.5} for i in range(10)],
+           'messages': [{'y': 1}] * 3 + [{'kind': 'a', 'x': 1}],
+           'tree': {'v': 1, 'c': [{'v': 2, 'c': [{'v': 3}]}]}}
+
+    with profiling() as profile:
+        assert parse_json(json.dumps(doc), order) == order.at([], doc).value
+
+    stats = profile.stats
+    assert stats['order.items'].calls == 2
+    assert stats['order.items.price (float)'].calls == 20
+    assert stats['$.messages[] (one_of)'].tries == {1: 2, 2: 6}
+    assert stats['$.messages[].kind'].failures == 6
+    assert stats['$.tree (recursive)'].calls == 6
+
+    for s in stats.values():
+        assert 0 <= s.own <= s.cumulative + 1e-9
+
+    assert profile.hotspots(1)[0].own == max(s.own for s in stats.values())
+    assert 'order.items.price' in profile.report(None)
+
+    # Not recorded any more.
+    order.at([], doc)
+    assert stats['order.items'].calls == 2
+
+
+def test_named():
+
+    decoder = field('a', List(Int)).named('a')
+
+    assert decoder.at([], {'a': [1]}).value == [1]
+    assert compile(decoder).at([], {'a': [1]}).value == [1]
+
+    copy = pickle.loads(pickle.dumps(decoder.named('b')))
+    assert copy._name == 'b'
+    assert copy.at([], {'a': [1]}).value == [1]
+    assert pickle.loads(pickle.dumps(Int.named('int'))).at([], 1).value == 1
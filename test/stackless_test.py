@@ -0,0 +1,108 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import pickle
+
+from hypothesis             import given, settings, event
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary, dict_depth, mk_parser, mk_app_parser
+
+
+DEPTH = 20000
+
+
+def mk_tree(tree):
+    return mapn(lambda value, children: (value, children),
+                field('value', Int),
+                optional_field('children', List(tree), []))
+
+
+def deep_tree(depth):
+    doc = {'value': 0}
+    for i in range(1, depth):
+        doc = {'value': i, 'children': [doc]}
+    return doc
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(5))
+def test_stackless_parser(dic):
+
+    event("dict depth: {d}".format(d=dict_depth(dic)))
+
+    for parser in [mk_parser(dic), mk_app_parser(dic)]:
+
+        status = stackless(parser, hybrid=False).at([], dic)
+
+        assert type(status) is StatusOk
+
+        assert status.value == dic
+
+
+def test_stackless_deep():
+
+    doc = deep_tree(DEPTH)
+
+    for hybrid in [True, False]:
+        value = stackless(recursive(mk_tree), hybrid=hybrid).at([], doc).value
+        for i in reversed(range(DEPTH)):
+            assert value[0] == i
+            value = value[1][0] if value[1] else None
+
+    nested = []
+    for _ in range(DEPTH):
+        nested = [nested]
+
+    def lists():
+        return one_of([null(0), List(lazy(lists))])
+
+    assert stackless(lists()).at([], nested).value is not None
+
+
+def test_stackless_errors():
+
+    doc = deep_tree(DEPTH)
+    leaf = doc
+    while 'children' in leaf:
+        leaf = leaf['children'][0]
+    leaf['value'] = 'zero'
+
+    status = stackless(recursive(mk_tree)).at([], doc)
+
+    assert type(status) is StatusBadType
+    assert status.path() == ['children', 0] * (DEPTH - 1) + ['value']
+
+    message = tagged('type', {'a': field('x', Int), 'b': field('y', Int)})
+    decoder = stackless(List(one_of([message, field('z', Int)])),
+                        hybrid=False)
+
+    for doc in [[{'type': 'a', 'x': 1}, {'z': 2}],
+                [{'type': 'c'}],
+                [{'type': 'b', 'y': 'one'}]]:
+        expected = List(one_of([message, field('z', Int)])).at([], doc)
+        status = decoder.at([], doc)
+        assert type(status) is type(expected)
+        assert status.path() == expected.path()
+
+
+def test_stackless_susp_pickle():
+
+    decoder = stackless(field('a', List(susp(field('x', Int)))))
+
+    thunks = parse_json('{"a": [{"x": 1}, {"x": "b"}]}',
+                        pickle.loads(pickle.dumps(decoder)))
+
+    assert thunks[0]() == 1
+
+    try:
+        thunks[1]()
+        assert False
+    except ValueError as e:
+        assert "in path '['a', 1, 'x']'" in str(e)
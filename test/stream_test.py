@@ -0,0 +1,77 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import io
+import json
+
+from hypothesis             import given, settings
+from hypothesis.strategies  import lists
+
+import yaml
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary
+
+
+@settings(print_blob=True, max_examples=50)
+@given(lists(gen_dictionary(2), max_size=5))
+def test_iter_yaml(dics):
+
+    doc = yaml.dump_all(dics)
+
+    for backend in yaml_backends():
+        decoded = list(iter_yaml(io.StringIO(doc), noop, backend=backend))
+        assert decoded == dics
+
+
+@settings(print_blob=True, max_examples=50)
+@given(lists(gen_dictionary(2), max_size=5))
+def test_iter_jsonl(dics):
+
+    lines = ''.join(json.dumps(dic) + '\n' for dic in dics)
+
+    decoded = list(iter_jsonl(io.BytesIO(lines.encode('utf-8')), noop))
+
+    assert decoded == dics
+
+
+def test_iter_yaml_errors():
+
+    doc = 'a: 1\n---\na: x\n---\nb: 2\n---\na: 3\n'
+
+    assert list(iter_yaml(doc, field('a', Int), errors=[])) == [1, 3]
+
+    errors = []
+    list(iter_yaml(doc, field('a', Int), errors=errors))
+
+    assert [(e.document, e.line) for e in errors] == [(1, 3), (2, 5)]
+    assert type(errors[0].status) is StatusBadType
+
+    decoded = iter_yaml(doc, field('a', Int))
+
+    assert next(decoded) == 1
+
+    try:
+        next(decoded)
+        assert False
+    except DocumentError as e:
+        assert e.document == 1
+        assert e.line == 3
+        assert "in path '['a']'" in str(e)
+
+
+def test_iter_jsonl_errors():
+
+    lines = ['{"a": 1}', '', '{"a": "x"}', '{"a": ', '{"a": 4}']
+
+    errors = []
+
+    assert list(iter_jsonl(lines, field('a', Int), errors=errors)) == [1, 4]
+    assert [(e.document, e.line) for e in errors] == [(1, 3), (2, 4)]
+    assert errors[1].status is None
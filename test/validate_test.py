@@ -0,0 +1,191 @@
+'''
+Copyright   : (c) Jean-Christophe Mincke, 2021-2024
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+'''
+
+import json
+import pickle
+
+from hypothesis             import given, settings, event
+
+import yaml
+
+from jazzml import *
+
+from jazzml_test import gen_dictionary, dict_depth, mk_parser, mk_app_parser
+
+
+def never_called(*args):
+    assert False
+
+
+@settings(print_blob=True)
+@given(gen_dictionary(5))
+def test_validate(dic):
+
+    event("dict depth: {d}".format(d=dict_depth(dic)))
+
+    for parser in [mk_parser(dic), mk_app_parser(dic)]:
+
+        validate(dic, parser)
+
+        assert type(parser.check(dic)) is StatusOk
+
+
+def test_check_errors():
+
+    point = mapn(never_called, field('x', Int), field('y', Float))
+    decoder = mapn(never_called,
+                   field('kind', one_of([this_str('a'), this_str('b')])),
+                   field('points', List(point)),
+                   optional_field('date', date(), None))
+
+    doc = {'kind': 'a', 'points': [{'x': 1, 'y': 2.5}], 'date': '01-02-2024'}
+
+    assert type(decoder.check(doc)) is StatusOk
+
+    for bad, path in [({'kind': 'c'}, ['kind']),
+                      ({'points': [{'x': 1, 'y': 2}, {'x': 1.5}]},
+                       ['points', 1, 'x']),
+                      ({'points': [{'y': 2}]}, ['points', 0]),
+                      ({'date': '2024-02-01'}, ['date'])]:
+        status = decoder.check(dict(doc, **bad))
+        assert type(status) is not StatusOk
+        assert status.path() == path
+
+    try:
+        validate({'kind': 'a'}, decoder)
+        assert False
+    except DecodeError as e:
+        assert "Missing field: points" in str(e)
+
+
+def test_check_then():
+
+    shapes = {'circle': mapn(never_called, field('r', Float)),
+              'square': mapn(never_called, field('side', Float))}
+
+    decoder = field('shape', Str).then(lambda name: shapes[name])
+
+    assert type(decoder.check({'shape': 'circle', 'r': 1})) is StatusOk
+    assert decoder.check({'shape': 'square', 'r': 1}).path() == []
+
+    tree = recursive(lambda tree: mapn(never_called, field('value', Int),
+                                       optional_field('children',
+                                                      List(tree), [])))
+
+    doc = {'value': 1, 'children': [{'value': 2}, {'value': 'three'}]}
+
+    assert tree.check(doc).path() == ['children', 1, 'value']
+
+
+def test_collect_errors():
+
+    item = mapn(lambda *args: args, field('name', Str), field('size', Int),
+                optional_field('tags', List(Str), []))
+    decoder = mapn(lambda *args: args, field('version', Int),
+                   field('items', List(item)))
+
+    doc = {'version': '1',
+           'items': [{'name': 'a', 'size': 1},
+                     {'name': 2, 'size': 'big'},
+                     {'size': 3, 'tags': ['x', 1, 'y', 2]}]}
+
+    try:
+        parse_json(json.dumps(doc), decoder, max_errors=None)
+        assert False
+    except DecodeError as e:
+        assert e.complete
+        assert [s.path() for s in e.errors] == [
+            ['version'], ['items', 1, 'name'], ['items', 1, 'size'],
+            ['items', 2], ['items', 2, 'tags', 1], ['items', 2, 'tags', 3]]
+        assert str(e).startswith('6 errors:\n')
+        copy = pickle.loads(pickle.dumps(e))
+        assert str(copy) == str(e)
+
+    try:
+        parse_yaml(yaml.dump(doc), decoder, max_errors=3)
+        assert False
+    except DecodeError as e:
+        assert not e.complete
+        assert len(e.errors) == 3
+
+    try:
+        parse_json(json.dumps(doc), decoder)
+        assert False
+    except ValueError as e:
+        assert str(e) == "Bad Type: expected type int but read value '1' " \
+                         "in path '['version']'"
+
+
+def test_collect_tagged_errors():
+
+    decoder = List(tagged('type', {'a': mapn(lambda x, y: (x, y),
+                                             field('x', Int),
+                                             field('y', Int)),
+                                   'b': field('z', Str)}))
+
+    doc = [{'type': 'a', 'x': 'one', 'y': 'two'},
+           {'type': 'c'},
+           {'type': 'b', 'z': 'ok'}]
+
+    try:
+        parse_json(json.dumps(doc), decoder, max_errors=10)
+        assert False
+    except DecodeError as e:
+        assert [type(s) for s in e.errors] == [StatusTagFailed,
+                                               StatusTagFailed,
+                                               StatusUnknownTag]
+        assert [s.path() for s in e.errors] == [[0, 'x'], [0, 'y'], [1]]
+
+    for max_errors in (0, -1):
+        try:
+            parse_json(json.dumps(doc), decoder, max_errors=max_errors)
+            assert False
+        except ValueError as e:
+            assert not isinstance(e, DecodeError)
+            assert 'max_errors' in str(e)
+
+
+def test_collect_not_dict_errors():
+
+    decoder = mapn(lambda a, b, c: (a, b, c), field('items', List(Int)),
+                   field('meta', field('version', Int)),
+                   field('extra', optional_field('note', Str, '')))
+
+    try:
+        parse_json('{"items": ["x"], "meta": 3, "extra": 5}', decoder,
+                   max_errors=None)
+        assert False
+    except DecodeError as e:
+        assert [type(s) for s in e.errors] == [StatusBadType] * 3
+        assert [s.path() for s in e.errors] == [['items', 0], ['meta'],
+                                               ['extra']]
+
+
+def test_collect_single_pass():
+
+    calls = []
+
+    def count(name, decoder):
+        return decoder.then(lambda v: calls.append(name) or succeed(v))
+
+    item = mapn(lambda n, s: (n, s), count('name', field('name', Str)),
+                field('size', Int))
+    decoder = record(lambda *args: args,
+                     {'items': List(item), 'note': (Str, '')})
+
+    doc = {'items': [{'name': 'a', 'size': 1}, {'name': 'b', 'size': 'x'}]}
+    try:
+        parse_json(json.dumps(doc), decoder, max_errors=None)
+        assert False
+    except DecodeError as e:
+        assert [s.path() for s in e.errors] == [['items', 1, 'size']]
+    assert calls == ['name', 'name']
+
+    doc['items'][1]['size'] = 2
+    assert parse_json(json.dumps(doc), decoder, max_errors=5) == \
+        parse_json(json.dumps(doc), decoder) == ([('a', 1), ('b', 2)], '')